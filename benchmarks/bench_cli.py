@@ -0,0 +1,15 @@
+"""The complete chain from the log file to the processed dataset, as run by the CLI."""
+
+from click.testing import CliRunner
+
+from oceanpack.app.cli import main
+
+
+def test_run(measure, analyzer_file, tmp_path):
+    output = tmp_path / "processed.nc"
+
+    def run():
+        result = CliRunner().invoke(main, ["run", str(analyzer_file), "-t", "Analyzer", "-o", str(output)])
+        assert result.exit_code == 0, result.output
+
+    measure(run)
@@ -0,0 +1,36 @@
+"""Merging and the physical computations."""
+
+import numpy as np
+import xarray as xr
+
+from oceanpack.app.models.data_processor import DataMerger
+from oceanpack.utils.helpers import fugacity, ppm2uatm, set_nonoperating_to_nan
+
+
+def test_merge(measure, analyzer_dataset):
+    # a second source (e.g. the ship's thermosalinograph) with time stamps offset by 3 s
+    time = analyzer_dataset["time"].values + np.timedelta64(3, "s")
+    other = xr.Dataset({"SST": ("time", np.full(len(time), 10.0))}, coords={"time": time})
+    measure(lambda: DataMerger().merge([analyzer_dataset, other]))
+
+
+def test_set_nonoperating_to_nan(measure, analyzer_dataset):
+    frame = analyzer_dataset[["CO2", "STATUS"]].to_pandas()
+    measure(
+        lambda df: set_nonoperating_to_nan(df, col="CO2", status_var="STATUS", buffer="20min"),
+        setup=lambda: (frame.copy(),),
+    )
+
+
+def test_ppm2uatm(measure, analyzer_dataset):
+    co2 = analyzer_dataset["CO2"].values
+    pressure = analyzer_dataset["CellPress"].values
+    measure(lambda: ppm2uatm(co2, pressure))
+
+
+def test_fugacity(measure, analyzer_dataset):
+    co2 = analyzer_dataset["CO2"].values
+    pressure = analyzer_dataset["CellPress"].values
+    pco2 = ppm2uatm(co2, pressure)
+    temperature = analyzer_dataset["waterTemp"].values
+    measure(lambda: fugacity(pco2, pressure, temperature, xCO2=co2))
@@ -0,0 +1,11 @@
+"""Reading of the log files."""
+
+from oceanpack.app.models.filehandler import InternalFileHandler, StreamFileHandler
+
+
+def test_internal_read_file(measure, analyzer_file):
+    measure(lambda: InternalFileHandler.read_file(analyzer_file))
+
+
+def test_stream_read_file(measure, stream_file):
+    measure(lambda: StreamFileHandler.read_file(stream_file))
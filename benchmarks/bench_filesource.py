@@ -0,0 +1,16 @@
+"""Cleaning and conversion of the records in :class:`FileSourceModel`."""
+
+from data import copy_model
+
+
+def test_clean_data(measure, loaded_model):
+    measure(lambda model: model.clean_data(), setup=lambda: (copy_model(loaded_model),))
+
+
+def test_process_data(measure, loaded_model):
+    def setup():
+        model = copy_model(loaded_model)
+        model.clean_data()
+        return (model,)
+
+    measure(lambda model: model.process_data(), setup=setup)
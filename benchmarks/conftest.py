@@ -0,0 +1,92 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from data import analyzer_log, copy_model, stream_log
+
+#: Numbers of records the benchmarks run with, unless --scales is given
+DEFAULT_SCALES = "1e4,1e5"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--scales",
+        default=os.environ.get("OCEANPACK_BENCH_SCALES", DEFAULT_SCALES),
+        help="Comma-separated numbers of records, e.g. 1e4,1e6,1e8 (default: %(default)s).",
+    )
+    parser.addoption(
+        "--data-dir",
+        default=os.environ.get("OCEANPACK_BENCH_DATA"),
+        help="Directory in which the generated log files are kept between runs.",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "rows" in metafunc.fixturenames:
+        scales = [int(float(scale)) for scale in metafunc.config.getoption("scales").split(",")]
+        metafunc.parametrize("rows", scales, ids=[f"{rows:.0e}" for rows in scales], scope="session")
+
+
+@pytest.fixture(scope="session")
+def data_dir(request, tmp_path_factory):
+    path = request.config.getoption("data_dir")
+    if path is None:
+        return tmp_path_factory.mktemp("data")
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@pytest.fixture(scope="session")
+def analyzer_file(data_dir, rows):
+    path = data_dir / f"analyzer_{rows}.log"
+    if not path.exists():
+        analyzer_log(path.with_suffix(".tmp"), rows).rename(path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def stream_file(data_dir, rows):
+    path = data_dir / f"stream_{rows}.log"
+    if not path.exists():
+        stream_log(path.with_suffix(".tmp"), rows).rename(path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def loaded_model(analyzer_file):
+    """A :class:`FileSourceModel` with the records of the Analyzer log loaded."""
+    from oceanpack.app.models.filesource import FileSourceModel
+
+    model = FileSourceModel("Analyzer")
+    model.load_data(analyzer_file)
+    return model
+
+
+@pytest.fixture(scope="session")
+def analyzer_dataset(loaded_model):
+    """The converted Analyzer dataset."""
+    model = copy_model(loaded_model)
+    model.clean_data()
+    model.process_data()
+    return model.ds
+
+
+
+@pytest.fixture
+def measure(benchmark, request):
+    """Return a function that benchmarks `func`, with fewer rounds for large numbers of rows.
+
+    `setup` is called before each round (not measured) and returns the arguments of `func`.
+    """
+    rows = request.getfixturevalue("rows") if "rows" in request.fixturenames else 0
+    rounds = 5 if rows <= 100_000 else 1
+
+    def run(func, setup=None):
+        def arguments():
+            return (setup() if setup else ()), {}
+
+        return benchmark.pedantic(func, setup=arguments, rounds=rounds, iterations=1)
+
+    return run
@@ -0,0 +1,73 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+"""Generation of the log files of a given size, and other helpers of the benchmarks."""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+EXAMPLE_LOG = Path(__file__).parents[1] / "tests" / "example_op.log"
+
+#: Number of records written at once
+CHUNK_SIZE = 100_000
+
+
+def analyzer_log(path, rows: int, start="2020-01-01"):
+    """Write an Analyzer log file with `rows` records at `path`.
+
+    The header and the records of ``tests/example_op.log`` are repeated, with the time
+    stamps continued at 10 s intervals.
+    """
+    lines = EXAMPLE_LOG.read_bytes().decode("iso-8859-1").splitlines(keepends=True)
+    header = [line for line in lines if not line.startswith("@DATA")]
+    # everything after "@DATA,DATE,TIME,"
+    records = np.array([line.split(",", 3)[3] for line in lines if line.startswith("@DATA")], dtype=object)
+
+    with open(path, "w", encoding="iso-8859-1") as f:
+        f.writelines(header)
+        for first in range(0, rows, CHUNK_SIZE):
+            n = min(CHUNK_SIZE, rows - first)
+            time = pd.date_range(start, periods=n, freq="10s") + pd.Timedelta(seconds=10 * first)
+            stamps = time.strftime("@DATA,%Y-%m-%d,%H:%M:%S,").to_numpy(dtype=object)
+            f.writelines(stamps + records[np.arange(first, first + n) % len(records)])
+    return Path(path)
+
+
+def stream_log(path, rows: int, start="2020-01-01", seed=0):
+    """Write an OceanView stream log file (``$PSDS0`` records) with `rows` records at `path`.
+
+    A pool of random records is formatted once and repeated, with the time stamps
+    continued at 1 s intervals.
+    """
+    from oceanpack.app.models.filehandler import StreamFileHandler
+
+    names = StreamFileHandler.read_oceanview_variables()["name"].tolist()
+    n_values = len(names) - names.index("time") - 1
+    rng = np.random.default_rng(seed)
+    pool = pd.DataFrame(rng.normal(10, 1, (10_000, n_values - 1)))
+    pool.insert(2, "sensor_state", 5)  # after msec and runtime
+    records = pool.to_csv(header=False, index=False, float_format="%.3f", lineterminator="\n")
+    records = np.array(records.splitlines(keepends=True), dtype=object)
+
+    with open(path, "w", encoding="iso-8859-1") as f:
+        for first in range(0, rows, CHUNK_SIZE):
+            n = min(CHUNK_SIZE, rows - first)
+            time = pd.date_range(start, periods=n, freq="1s") + pd.Timedelta(seconds=first)
+            stamps = time.strftime("$PSDS0,0,0,D,0,0,%Y-%m-%d,%H:%M:%S,").to_numpy(dtype=object)
+            f.writelines(stamps + records[np.arange(first, first + n) % len(records)])
+    return Path(path)
+
+
+def copy_model(model):
+    """Return a copy of the :class:`FileSourceModel` `model` that can be modified."""
+    from oceanpack.app.models.filesource import FileSourceModel
+
+    copy = FileSourceModel(model.source_type.value)
+    copy._metadata = model._metadata
+    copy.df = model.df.copy()
+    return copy
@@ -7,3 +7,40 @@
 """OceanPack — tools for reading, processing, and exporting OceanPack instrument log files."""
 
 __version__ = "0.1.0"
+
+
+def open_dataset(start=None, end=None, variables=None, path=".", **filters):
+    """Open the converted netCDF files below `path` within a time window as one (lazy) dataset.
+
+    The files are looked up in the catalog of `path`, which is updated first, so only the
+    files that cover the window are opened (see :meth:`~oceanpack.app.models.archive.Archive.sel`
+    for the parameters). To look at several windows, use :func:`open_archive`, which
+    keeps the open files and the read data in a cache.
+
+    The dataset holds the files and the catalog open until it is closed, either with
+    ``ds.close()`` or by using it as context manager.
+
+    Example
+    -------
+    >>> import oceanpack
+    >>> with oceanpack.open_dataset(
+    ...     "2024-06-01", "2024-06-02", ["CO2", "SBE45Temp"], path="converted/"
+    ... ) as ds:  # doctest: +SKIP
+    ...     co2 = ds["CO2"].load()
+    """
+    archive = open_archive(path)
+    ds = archive.sel(slice(start, end), variables, **filters)
+    ds.set_close(archive.close)
+    return ds
+
+
+def open_archive(source, max_open_files: int = 32, cache_size="256MB", chunk_size: int = 8640):
+    """Open an archive of netCDF files (a directory or a catalog) for lazy time and variable windows.
+
+    See :func:`oceanpack.app.models.archive.open_archive`.
+    """
+    from oceanpack.app.models.archive import open_archive
+
+    return open_archive(
+        source, max_open_files=max_open_files, cache_size=cache_size, chunk_size=chunk_size
+    )
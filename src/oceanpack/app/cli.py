@@ -7,15 +7,11 @@
 """Command-line interface for OceanPack, providing commands to convert, process, and merge instrument log files."""
 
 import click
-from colorama import Fore
 
-from oceanpack.app.controllers.data_controller import (
-    DataConversionController,
-    DataMergeController,
-    DataProcessingController,
-)
+# The scientific stack (numpy, pandas, xarray) is only imported inside the commands,
+# so that `oceanpack --help` and shell completion start quickly.
 
-welcome_msg = Fore.BLUE + r"""
+welcome_msg = r"""
                                                 __  
   ____  ________  ____ _____  ____  ____ ______/ /__
  / __ \/ ___/ _ \/ __ `/ __ \/ __ \/ __ `/ ___/ //_/
@@ -25,30 +21,117 @@ welcome_msg = Fore.BLUE + r"""
 
     A command line interface for working with data 
           from the OceanPack™ by SubCtech©.
-""" + Fore.RESET
+"""
 
 
 @click.group(invoke_without_command=True)
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    help="Record wall/CPU time, rows, bytes read/written and peak memory of each processing stage "
+    "and write a JSON report to PROFILE_DIR.",
+)
+@click.option(
+    "--profile-dir",
+    type=click.Path(file_okay=False),
+    default="logs",
+    show_default=True,
+    help="Directory for the profiling report.",
+)
+@click.option(
+    "--cprofile",
+    is_flag=True,
+    default=False,
+    help="With --profile, also dump cProfile statistics (e.g. for snakeviz or flameprof).",
+)
+@click.option(
+    "--max-memory",
+    type=str,
+    default=None,
+    help='Memory budget (e.g. "2GB"). Log files are then read in batches and large datasets '
+    "are processed in chunks to stay within the budget.",
+)
 @click.pass_context
-def main(ctx):
+def main(ctx, profile, profile_dir, cprofile, max_memory):
+    if max_memory is not None and ctx.invoked_subcommand is not None:
+        from oceanpack.utils.memory import memory_budget
+
+        try:
+            budget = ctx.with_resource(memory_budget(max_memory))
+        except ValueError as error:
+            raise click.BadParameter(str(error), param_hint="--max-memory") from error
+        ctx.call_on_close(lambda: click.echo(budget.report(), err=True))
+    if profile and ctx.invoked_subcommand is not None:
+        from oceanpack.utils.profiling import profiling
+
+        # the callback is registered first, so it runs after the report has been written
+        ctx.call_on_close(
+            lambda: click.echo(f"Profile written to {profiler.report_path}", err=True)
+        )
+        profiler = ctx.with_resource(
+            profiling(profile_dir, name=ctx.invoked_subcommand, cprofile=cprofile)
+        )
     if ctx.invoked_subcommand is None:
-        click.echo(welcome_msg)
+        from colorama import Fore
+
+        click.echo(Fore.BLUE + welcome_msg + Fore.RESET)
         click.echo(ctx.get_help())
 
 
+def _output_format_options(command):
+    """Add the options --format and --cruise to a command that writes a dataset."""
+    command = click.option(
+        "--cruise",
+        default=None,
+        help="With --format parquet, partition the files by this cruise as well.",
+    )(command)
+    return click.option(
+        "--format",
+        "output_format",
+        type=click.Choice(["netcdf", "parquet"]),
+        default="netcdf",
+        show_default=True,
+        help="Write a netCDF file, or a directory of Parquet files partitioned by day.",
+    )(command)
+
+
+def _precision_option(command):
+    """Add the option --precision to a command that processes a dataset."""
+    return click.option(
+        "--precision",
+        type=click.Choice(["float64", "float32"]),
+        default="float64",
+        show_default=True,
+        help="Floating-point precision of the pCO2 and fCO2 computation. "
+        "float32 halves memory and deviates by less than 0.001 µatm.",
+    )(command)
+
+
 @main.command
 @click.argument("path", type=click.Path(exists=True))
 @click.option("--source-type", "-t", type=click.Choice(["Analyzer", "NetDI", "Stream"]))
 @click.argument("output_file", type=click.Path())
-def convert_data(path, source_type, output_file):
+@click.option(
+    "--compact",
+    is_flag=True,
+    default=False,
+    help="Store the data in compact types (float32, uint8 states, packed valves) to save memory.",
+)
+@_output_format_options
+def convert_data(path, source_type, output_file, compact, output_format, cruise):
     """
     Process OceanPack log file(s) from PATH, clean the data, and export to OUTPUT_FILE.
     Please process files from different source types separately.
     """
-    controller = DataConversionController(source_type)  # DataController(source_model)
+    from oceanpack.app.controllers.data_controller import DataConversionController
+
+    controller = DataConversionController(
+        source_type, compact=compact
+    )  # DataController(source_model)
     controller.load_data(path)
     controller.display()
-    controller.generate_output(output_file)
+    controller.generate_output(output_file, output_format=output_format, cruise=cruise)
     click.echo(
         "As a next step, run `merge-data` to merge the converted files into a single dataset. "
         "Consider providing a netCDF file with additional variables such as GPS coordinates"
@@ -58,41 +141,465 @@ def convert_data(path, source_type, output_file):
 
 
 @main.command
-@click.argument('files', type=click.Path(exists=True), nargs=-1)
-@click.option('--output-file', '-o', type=click.Path(), help='Path for the merged netCDF output file.')
-@click.option('--tolerance', '-t', type=str, default='2min', show_default=True,
-              help='Maximum time offset allowed when aligning timestamps across input files (pandas offset string, e.g. "2min", "30s").')
-@click.option('--keep-all', is_flag=True, default=False,
-              help='Retain all variables from the input files. By default only the scientifically relevant subset is kept.')
-def merge_data(files, output_file, tolerance, keep_all):
+@click.argument("files", type=click.Path(exists=True), nargs=-1)
+@click.option(
+    "--output-file", "-o", type=click.Path(), help="Path for the merged netCDF output file."
+)
+@click.option(
+    "--tolerance",
+    "-t",
+    type=str,
+    default="2min",
+    show_default=True,
+    help='Maximum time offset allowed when aligning timestamps across input files (pandas offset string, e.g. "2min", "30s").',
+)
+@click.option(
+    "--keep-all",
+    is_flag=True,
+    default=False,
+    help="Retain all variables from the input files. By default only the scientifically relevant subset is kept.",
+)
+@click.option(
+    "--start", default=None, help='Merge only records from this time on (e.g. "2024-06-01").'
+)
+@click.option(
+    "--end", default=None, help='Merge only records up to this time (e.g. "2024-06-02T12:00").'
+)
+@_output_format_options
+def merge_data(files, output_file, tolerance, keep_all, start, end, output_format, cruise):
     """
     Merge multiple netCDF FILES produced by the convert-data step into a single dataset.
     Timestamps are aligned across files using nearest-neighbour matching within TOLERANCE.
     Unless --keep-all is set, the output is trimmed to a curated set of scientifically
     relevant variables. The merged dataset is written to OUTPUT_FILE in netCDF format.
+
+    FILES may also be directories of converted files: they are indexed in a catalog
+    (oceanpack-catalog.sqlite in the directory), so only the files that cover the time
+    window from --start to --end are opened.
     """
+    from oceanpack.app.controllers.data_controller import DataMergeController
+
     kwargs = {"keep_all": keep_all}
     controller = DataMergeController()
-    controller.merge(files, tolerance=tolerance, **kwargs)
-    controller.generate_output(output_file)
+    controller.merge(files, tolerance=tolerance, start=start, end=end, **kwargs)
+    controller.generate_output(output_file, output_format=output_format, cruise=cruise)
 
 
 @main.command
 @click.argument("path", type=click.Path(exists=True))
-def process_data(path):
+@click.option(
+    "--drift-correction",
+    is_flag=True,
+    default=False,
+    help="Correct CO2 for the zero/span drift observed in the calibration phases.",
+)
+@click.option(
+    "--span-concentration",
+    type=float,
+    default=None,
+    help="CO2 concentration of the span gas (ppm). Enables the gain correction.",
+)
+@click.option(
+    "--coefficients",
+    type=click.Path(exists=True),
+    default=None,
+    help="CSV table of LI-840 coefficients per period. Recomputes CO2 from the raw counts.",
+)
+@click.option(
+    "--full",
+    is_flag=True,
+    default=False,
+    help="Reprocess the whole record, even if only new records were appended since the last run.",
+)
+@_precision_option
+def process_data(path, drift_correction, span_concentration, coefficients, full, precision):
     """
     Run the physical-variable processing pipeline on the merged netCDF file at PATH.
-    The pipeline performs four steps in order: (1) convert raw Latitude/Longitude to
-    decimal-degree coordinates, (2) mask CO2 readings during non-operating instrument
-    phases, (3) derive equilibrator pressure from cell pressure and internal differential
-    pressure, and (4) compute pCO2 in wet air at the equilibrator. The processed dataset
-    is written back to PATH, overwriting the input file in place.
+    The pipeline converts raw Latitude/Longitude to decimal-degree coordinates, masks
+    CO2 readings during non-operating instrument phases (CO2_corrected), runs the
+    automated quality control (<variable>_flag), derives the equilibrator pressure from
+    cell pressure and internal differential pressure, computes pCO2 and fCO2 in wet air
+    at the equilibrator, corrects the intake SST for its lag behind SBE45Temp
+    (SST_corrected), and computes pCO2 and fCO2 at SST.
+    With --drift-correction, CO2 is additionally corrected for the analyzer drift
+    between the zero (and span) calibrations. With --coefficients, CO2 is recomputed
+    from the raw LI-840 counts and stored as CO2_recomputed. The derived variables are
+    written back to PATH; the raw variables are left unchanged. If PATH was processed
+    before with the same options, only the records appended since then are processed,
+    unless --full is given.
     """
+    from oceanpack.app.controllers.data_controller import DataProcessingController
+
     controller = DataProcessingController()
     controller.load_data(path)
-    controller.process_data()
+    controller.process_data(
+        drift_correction=drift_correction,
+        span_concentration=span_concentration,
+        coefficients=coefficients,
+        incremental=not full,
+        precision=precision,
+    )
     controller.generate_output(path)
 
 
+@main.command
+@click.argument("paths", type=click.Path(exists=True), nargs=-1, required=True)
+@click.option(
+    "--output-file",
+    "-o",
+    type=click.Path(),
+    required=True,
+    help="Path for the processed netCDF output file.",
+)
+@click.option(
+    "--source-type",
+    "-t",
+    type=click.Choice(["Analyzer", "NetDI", "Stream"]),
+    multiple=True,
+    help="Source type of each PATH (in the same order). Inferred from the files if not given.",
+)
+@click.option(
+    "--tolerance",
+    type=str,
+    default="2min",
+    show_default=True,
+    help="Maximum time offset allowed when aligning timestamps across the sources.",
+)
+@click.option(
+    "--keep-all",
+    is_flag=True,
+    default=False,
+    help="Retain all variables. By default only the scientifically relevant subset is kept.",
+)
+@click.option(
+    "--checkpoint-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory to write the converted and merged intermediate datasets to.",
+)
+@click.option(
+    "--drift-correction",
+    is_flag=True,
+    default=False,
+    help="Correct CO2 for the zero/span drift observed in the calibration phases.",
+)
+@click.option(
+    "--span-concentration",
+    type=float,
+    default=None,
+    help="CO2 concentration of the span gas (ppm). Enables the gain correction.",
+)
+@click.option(
+    "--coefficients",
+    type=click.Path(exists=True),
+    default=None,
+    help="CSV table of LI-840 coefficients per period. Recomputes CO2 from the raw counts.",
+)
+@_precision_option
+@_output_format_options
+def run(
+    paths,
+    output_file,
+    source_type,
+    tolerance,
+    keep_all,
+    checkpoint_dir,
+    output_format,
+    cruise,
+    **processing_options,
+):
+    """
+    Run the complete chain of convert-data, merge-data and process-data on the log
+    files at PATHS (one file or directory per logging unit) and write the processed
+    dataset to OUTPUT_FILE. The data are handed from one step to the next in memory,
+    so only the final output is written (and, with --checkpoint-dir, the intermediate
+    datasets).
+    """
+    from oceanpack.app.controllers.data_controller import DataPipelineController
+
+    controller = DataPipelineController(checkpoint_dir=checkpoint_dir)
+    controller.run(
+        paths,
+        output_file=output_file,
+        source_types=list(source_type) or None,
+        tolerance=tolerance,
+        keep_all=keep_all,
+        output_format=output_format,
+        cruise=cruise,
+        **processing_options,
+    )
+
+
+@main.command
+@click.argument("manifest", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--jobs",
+    "-j",
+    type=int,
+    default=None,
+    help="Number of cruises processed in parallel. Defaults to the number of CPUs.",
+)
+@click.option(
+    "--database",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="SQLite database with the job states. Defaults to MANIFEST with the suffix '.jobs.sqlite'.",
+)
+@click.option(
+    "--force",
+    is_flag=True,
+    default=False,
+    help="Run all jobs, even those whose inputs and configuration are unchanged.",
+)
+def batch(manifest, jobs, database, force):
+    """
+    Process all cruises listed in the MANIFEST (TOML or YAML) in parallel. Each cruise
+    runs the complete chain of the `run` command. The job states are recorded in a
+    SQLite database, so an interrupted batch resumes, and cruises whose inputs and
+    configuration did not change since their last successful run are skipped.
+    """
+    from oceanpack.app.controllers.data_controller import BatchController
+
+    controller = BatchController(manifest, database=database, max_workers=jobs)
+    status = controller.run(force=force)
+    failed = [name for name, state in status.items() if state == "failed"]
+    click.echo(f"{len(status) - len(failed)} of {len(status)} jobs done.")
+    if failed:
+        raise click.ClickException(f"Failed jobs: {', '.join(failed)}")
+
+
+@main.command
+@click.argument("path", type=click.Path(exists=True))
+@click.argument("output_file", type=click.Path())
+@click.option(
+    "--freq",
+    "-f",
+    type=str,
+    default="1min",
+    show_default=True,
+    help='Length of the averaging windows (pandas offset string, e.g. "1min", "10min").',
+)
+@click.option(
+    "--stats",
+    "-s",
+    type=str,
+    default="mean,median,std,count",
+    show_default=True,
+    help="Comma-separated list of statistics to compute per window.",
+)
+@click.option(
+    "--block",
+    type=str,
+    default="1D",
+    show_default=True,
+    help="Length of the time blocks that are read and written at once. Must be a multiple of FREQ.",
+)
+def resample(path, output_file, freq, stats, block):
+    """
+    Average the processed netCDF file at PATH onto regular time windows of length FREQ
+    and write the result to OUTPUT_FILE. Only samples taken in operating state are
+    considered; non-operating phases plus a 20-minute buffer are excluded. The file is
+    read and written block by block, so memory usage is independent of the record length.
+    """
+    from oceanpack.app.controllers.data_controller import DataResamplingController
+
+    controller = DataResamplingController(freq=freq, stats=stats.split(","), block=block)
+    controller.resample(path, output_file)
+
+
+@main.command
+@click.argument("path", type=click.Path(exists=True, file_okay=False))
+@click.option(
+    "--output-file",
+    "-o",
+    type=click.Path(dir_okay=False),
+    required=True,
+    help="netCDF file to which the new records are appended. Created if it does not exist.",
+)
+@click.option(
+    "--source-type",
+    "-t",
+    type=click.Choice(["Analyzer", "NetDI", "Stream"]),
+    help="Source type of the log files. Inferred from the first file if not given.",
+)
+@click.option(
+    "--settle",
+    type=float,
+    default=30,
+    show_default=True,
+    help="Seconds the size of a file must be stable before it is converted.",
+)
+@click.option(
+    "--interval",
+    type=float,
+    default=5,
+    show_default=True,
+    help="Seconds between two checks for settled files.",
+)
+@click.option(
+    "--polling",
+    is_flag=True,
+    default=False,
+    help="Scan the directory every INTERVAL seconds instead of using inotify.",
+)
+def watch(path, output_file, source_type, settle, interval, polling):
+    """
+    Watch the directory PATH and convert new or changed log files as they are written.
+    Only the new records of each file are appended to OUTPUT_FILE, and files that were
+    converted before are skipped, also after a restart. Runs until interrupted (Ctrl+C).
+    """
+    from oceanpack.app.controllers.data_controller import WatchController
+
+    controller = WatchController(
+        path, output_file, source_type=source_type, settle=settle, polling=polling
+    )
+    try:
+        controller.run(interval=interval)
+    except KeyboardInterrupt:
+        click.echo("Stopped watching.", err=True)
+
+
+def _parse_address(ctx, param, values):
+    """Split the `host:port` values of the ``--tcp`` option."""
+    addresses = []
+    for value in values:
+        host, _, port = value.rpartition(":")
+        if not host or not port.isdigit():
+            raise click.BadParameter(
+                f"{value!r} is not of the form HOST:PORT.", ctx=ctx, param=param
+            )
+        addresses.append((host.strip("[]"), int(port)))
+    return addresses
+
+
+@main.command
+@click.option(
+    "--tcp",
+    multiple=True,
+    callback=_parse_address,
+    metavar="HOST:PORT",
+    help="TCP server of OceanView to read records from. Can be given multiple times.",
+)
+@click.option(
+    "--udp",
+    type=int,
+    multiple=True,
+    metavar="PORT",
+    help="UDP port to receive records on. Can be given multiple times.",
+)
+@click.option(
+    "--output-dir",
+    "-o",
+    type=click.Path(file_okay=False),
+    required=True,
+    help="Directory with one netCDF file per stream, to which the records are appended.",
+)
+@click.option(
+    "--flush-interval",
+    type=float,
+    default=10,
+    show_default=True,
+    help="Seconds after which the received records are written.",
+)
+@click.option(
+    "--flush-rows",
+    type=int,
+    default=1000,
+    show_default=True,
+    help="Number of received records after which they are written.",
+)
+@click.option(
+    "--max-pending",
+    type=int,
+    default=None,
+    help="Maximum number of records waiting to be written (default: 10 x FLUSH_ROWS). "
+    "Beyond that, TCP streams are held back and UDP records are dropped.",
+)
+def ingest(tcp, udp, output_dir, flush_interval, flush_rows, max_pending):
+    """
+    Ingest the live $PSDS0 records that OceanView sends over TCP or UDP.
+    All streams are read concurrently; the records of each stream are appended to their
+    own netCDF file in OUTPUT_DIR. Runs until interrupted (Ctrl+C).
+    """
+    if not tcp and not udp:
+        raise click.UsageError("Give at least one stream with --tcp or --udp.")
+
+    from oceanpack.app.controllers.data_controller import IngestController
+
+    controller = IngestController(
+        output_dir,
+        tcp=tcp,
+        udp=udp,
+        flush_rows=flush_rows,
+        flush_interval=flush_interval,
+        max_pending=max_pending,
+    )
+    try:
+        controller.run()
+    except KeyboardInterrupt:
+        pass
+    click.echo(
+        f"Received {controller.received} records, appended {controller.appended}, dropped {controller.dropped}.",
+        err=True,
+    )
+
+
+@main.command
+@click.argument("output_dir", type=click.Path(file_okay=False))
+@click.option(
+    "--size",
+    type=str,
+    default="100MB",
+    show_default=True,
+    help='Approximate total size of the generated files (e.g. "10GB").',
+)
+@click.option(
+    "--duration",
+    type=str,
+    default=None,
+    help='Length of the record (pandas offset string, e.g. "30D"). Overrides --size.',
+)
+@click.option(
+    "--source-type",
+    "-t",
+    type=click.Choice(["Analyzer", "NetDI", "Stream"]),
+    multiple=True,
+    help="Source types to generate. Can be given multiple times. Defaults to all.",
+)
+@click.option("--freq", type=str, default="10s", show_default=True, help="Sampling interval.")
+@click.option(
+    "--start", type=str, default="2020-01-01", show_default=True, help="Time of the first record."
+)
+@click.option(
+    "--file-size",
+    type=str,
+    default="100MB",
+    show_default=True,
+    help="Approximate size of each file.",
+)
+@click.option("--seed", type=int, default=0, show_default=True, help="Seed of the random numbers.")
+def synth(output_dir, size, duration, source_type, freq, start, file_size, seed):
+    """
+    Write synthetic OceanPack log files into OUTPUT_DIR, one subdirectory per source
+    type. The files contain realistic status cycles (calibrations, standby and wash
+    phases), a ship track, repeated headers, records overlapping between files and
+    truncated last lines. Meant for scale tests of the processing chain.
+    """
+    from oceanpack.utils.synth import SOURCE_TYPES, synthesize
+
+    files = synthesize(
+        output_dir,
+        size=size,
+        duration=duration,
+        source_types=list(source_type) or SOURCE_TYPES,
+        freq=freq,
+        start=start,
+        file_size=file_size,
+        seed=seed,
+    )
+    for source, paths in files.items():
+        click.echo(f"{source}: {len(paths)} files")
+
+
 if __name__ == "__main__":
     main()
@@ -6,11 +6,25 @@
 #
 """Controllers that coordinate loading, processing, and exporting of OceanPack sensor data."""
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import os
+from pathlib import Path
+import time
 
-from oceanpack.app.models.data_processor import DataMerger, DataProcessor
-from oceanpack.app.models.filesource import FileSourceModel
+import pandas as pd
+
+from oceanpack import __version__
+from oceanpack.app.models.archive import Archive
+from oceanpack.app.models.batch import JobTable, input_hash, load_manifest
+from oceanpack.app.models.data_processor import DataMerger, DataProcessor, DataResampler
+from oceanpack.app.models.filesource import FileSourceModel, collect_files
+from oceanpack.app.models.ingest import StreamWriter
+from oceanpack.app.models.store import CruiseStore
 from oceanpack.app.views.data_view import DataConversionView
+from oceanpack.utils.helpers import config_hash
+from oceanpack.utils.watch import Debouncer, open_watcher
 
 log = logging.getLogger(__name__)
 
@@ -20,8 +34,8 @@ class DataConversionController:
     netCDF format.
     """
 
-    def __init__(self, source_type: str | None = None):
-        self.model = FileSourceModel(source_type)
+    def __init__(self, source_type: str | None = None, compact: bool = False):
+        self.model = FileSourceModel(source_type, compact=compact)
         self.view = DataConversionView()
 
     def load_data(self, path: str):
@@ -34,9 +48,15 @@ class DataConversionController:
         """Render the current model using the view."""
         self.view.display(self.model)
 
-    def generate_output(self, path):
-        """Generate output file in netCDF format at `path`."""
-        self.model.to_netcdf(path)
+    def generate_output(self, path, output_format: str = "netcdf", cruise: str | None = None):
+        """Generate output file in netCDF format at `path`, or Parquet files partitioned by day below `path`.
+
+        `cruise` partitions the Parquet files by cruise as well.
+        """
+        if output_format == "parquet":
+            self.model.to_parquet(path, cruise=cruise)
+        else:
+            self.model.to_netcdf(path)
 
 
 class DataMergeController:
@@ -48,20 +68,37 @@ class DataMergeController:
     def __init__(self):
         self.model = DataMerger()
 
-    def merge(self, files, tolerance: str = "2min", **kwargs):
+    def merge(self, files, tolerance: str = "2min", start=None, end=None, **kwargs):
         """Merge multiple netCDF files into a single dataset.
         The `tolerance` parameter determines the maximum time difference allowed when aligning timestamps
         across input files. The `keep_all` parameter determines whether to keep all variables from the
         input files or to select only a subset of important variables after merging.
+
+        Directories in `files` are looked up in their catalog (see :class:`~oceanpack.app.models.archive.Archive`):
+        only the files that cover the time window from `start` to `end` are opened, and the files of
+        each source type are concatenated before they are merged.
         """
-        self.model.merge(files, tolerance=tolerance)
+        start, end = (None if t is None else pd.Timestamp(t) for t in (start, end))
+        inputs = []
+        for file in files:
+            if Path(file).is_dir():
+                inputs.extend(Archive(file).sources(slice(start, end)))
+            else:
+                inputs.append(file)
+        self.model.merge(inputs, tolerance=tolerance, start=start, end=end)
         if kwargs.pop("keep_all") is False:
             log.info("Remove variables that are not important for further analysis.")
             self.model.select_variables()
 
-    def generate_output(self, path):
-        """Generate output file in netCDF format at `path`."""
-        self.model.to_netcdf(path)
+    def generate_output(self, path, output_format: str = "netcdf", cruise: str | None = None):
+        """Generate output file in netCDF format at `path`, or Parquet files partitioned by day below `path`.
+
+        `cruise` partitions the Parquet files by cruise as well.
+        """
+        if output_format == "parquet":
+            self.model.to_parquet(path, cruise=cruise)
+        else:
+            self.model.to_netcdf(path)
 
 
 class DataProcessingController:
@@ -74,16 +111,526 @@ class DataProcessingController:
         """Load raw data from `path`."""
         self.model.load_data(path)
 
-    def process_data(self):
-        """Run the processing steps to compute additional variables such as fCO2 at SST, equilibrator pressure, etc."""
+    def process_data(
+        self,
+        drift_correction: bool = False,
+        span_concentration: float | None = None,
+        coefficients=None,
+        incremental: bool = True,
+        precision: str = "float64",
+    ):
+        """Run the processing steps to compute additional variables such as fCO2 at SST, equilibrator pressure, etc.
+        If `drift_correction` is set, CO2 is corrected for the zero (and, given the `span_concentration`, span)
+        drift observed in the calibration phases. If a table of LI-840 `coefficients` is given, CO2 is
+        additionally recomputed from the raw counts.
+        If `incremental` is set and the derived variables were already processed with the same configuration,
+        only the records appended since then (plus a halo) are processed.
+        `precision` ("float64" or "float32") is the floating-point precision of the pCO2 and fCO2 computation.
+        """
+        config = {
+            "drift_correction": drift_correction,
+            "span_concentration": span_concentration,
+            "coefficients": _file_hash(coefficients),
+        }
+        if (
+            precision != "float64"
+        ):  # the files processed in double precision keep their configuration hash
+            config["precision"] = precision
+        self.model.precision = precision
+        self.model.config_hash = config_hash(config)
+        if incremental:
+            processed_until = self.model.processed_until(self.model.config_hash)
+            if processed_until is not None:
+                if processed_until >= self.model.ds.indexes["time"][-1]:
+                    log.info(f"All records up to {processed_until} are processed already.")
+                    return
+                self.model.restrict_time(
+                    processed_until, halo=self.model.halo(), calibrations=drift_correction
+                )
+
         self.model.convert_coordinates()
         self.model.remove_non_operating_phases()
+        if drift_correction:
+            self.model.correct_drift(span_concentration=span_concentration)
+        if coefficients is not None:
+            self.model.recompute_co2(coefficients)
+        self.model.apply_quality_control()
         self.model.compute_equilibrator_pressure()
         self.model.compute_pCO2_wet_equ()
         self.model.compute_fCO2_wet_equ()
+        self.model.correct_intake_lag()
         self.model.compute_pCO2_wet_sst()
         self.model.compute_fCO2_wet_sst()
 
-    def generate_output(self, path):
-        """Generate output file in netCDF format at `path`."""
-        self.model.to_netcdf(path)
+    def generate_output(self, path, output_format: str = "netcdf", cruise: str | None = None):
+        """Generate output file in netCDF format at `path`, or Parquet files partitioned by day below `path`.
+
+        `cruise` partitions the Parquet files by cruise as well.
+        """
+        if output_format == "parquet":
+            self.model.to_parquet(path, cruise=cruise)
+        else:
+            self.model.to_netcdf(path)
+
+
+def _file_hash(path):
+    """Return the SHA-256 hash of the content of the file at `path` (None if no path is given)."""
+    if path is None:
+        return None
+    import hashlib
+
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+class DataResamplingController:
+    """A class that controls the temporal averaging of a processed netCDF file onto regular time windows."""
+
+    def __init__(
+        self, freq: str = "1min", stats=("mean", "median", "std", "count"), block: str = "1D"
+    ):
+        self.model = DataResampler(freq=freq, stats=stats, block=block)
+
+    def resample(self, path, output_file):
+        """Resample the dataset at `path` and write the result to `output_file` (replacing an existing file)."""
+        Path(output_file).unlink(missing_ok=True)
+        self.model.resample(path, output_file)
+
+
+class DataPipelineController:
+    """A class that controls the complete chain from raw log files to the processed dataset.
+
+    The conversion, merging and processing steps hand the :class:`xarray.Dataset` on in
+    memory, so the data are encoded only once, when the final output is written.
+    Optionally, the intermediate datasets are written to `checkpoint_dir` as well, with
+    the same content as the outputs of ``convert-data`` and ``merge-data``.
+    """
+
+    def __init__(self, checkpoint_dir=None):
+        self.checkpoint_dir = None if checkpoint_dir is None else Path(checkpoint_dir)
+        self.processing = DataProcessingController()
+
+    def run(
+        self,
+        paths,
+        output_file=None,
+        source_types=None,
+        tolerance: str = "2min",
+        keep_all: bool = False,
+        output_format: str = "netcdf",
+        cruise: str | None = None,
+        **processing_options,
+    ):
+        """Convert the log files at `paths`, merge and process them, and write `output_file`.
+
+        Parameters
+        ----------
+        paths : list of path-like
+            One file or directory of log files per logging unit (e.g. Analyzer and NetDI).
+        output_file : path-like, optional
+            Path of the processed netCDF file. If None, nothing is written.
+        source_types : list of str, optional
+            Source type of each path (see ``convert-data``). Inferred if not given.
+        tolerance, keep_all
+            Options of the merging step (see ``merge-data``).
+        output_format, cruise
+            Write `output_file` as netCDF file (default) or as Parquet files partitioned by
+            day (and `cruise`) below the directory `output_file`.
+        processing_options
+            Options of :meth:`DataProcessingController.process_data`.
+
+        Returns
+        -------
+        xr.Dataset
+            The processed dataset.
+        """
+        if source_types is None:
+            source_types = [None] * len(paths)
+        if len(source_types) != len(paths):
+            raise ValueError("Provide either no source type or one source type per path.")
+
+        # the models are kept, since they own the files of batches spooled under a memory budget
+        converted = []
+        for path, source_type in zip(paths, source_types):
+            log.info(f"Convert {path}")
+            model = FileSourceModel(source_type)
+            model.load_data(path)
+            model.clean_data()
+            model.process_data()
+            self._checkpoint(model, f"{Path(path).stem}_{model.source_type.value}.nc")
+            converted.append(model)
+
+        merger = DataMerger()
+        merger.merge([model.ds for model in converted], tolerance=tolerance)
+        if not keep_all:
+            merger.select_variables()
+        self._checkpoint(merger, "merged.nc")
+
+        self.processing.load_data(merger.merged)
+        self.processing.process_data(incremental=False, **processing_options)
+        if output_file is not None:
+            self.processing.generate_output(output_file, output_format=output_format, cruise=cruise)
+        return self.processing.model.ds
+
+    def _checkpoint(self, model, name):
+        """Write the dataset of `model` to the checkpoint directory (if any)."""
+        if self.checkpoint_dir is None:
+            return
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        log.info(f"Write checkpoint {self.checkpoint_dir / name}")
+        model.to_netcdf(self.checkpoint_dir / name)
+
+
+class BatchController:
+    """A class that controls the processing of many cruises, as described in a manifest, in parallel.
+
+    Each cruise is processed by :class:`DataPipelineController` in a separate process.
+    The state of the jobs is kept in a SQLite database (by default next to the
+    manifest), so an interrupted batch resumes where it stopped: jobs whose inputs,
+    configuration and package version did not change since they last succeeded are
+    skipped. An active memory budget (see :mod:`oceanpack.utils.memory`) is split
+    evenly between the worker processes.
+    """
+
+    def __init__(self, manifest, database=None, max_workers: int | None = None):
+        self.jobs = load_manifest(manifest)
+        self.table = JobTable(database or Path(manifest).with_suffix(".jobs.sqlite"))
+        self.max_workers = max_workers
+
+    def run(self, force: bool = False) -> dict[str, str]:
+        """Run all jobs that are not up to date (or all jobs, if `force` is set) and return their status."""
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        from tqdm.auto import tqdm
+
+        from oceanpack.utils import memory
+
+        pending = []
+        for job in self.jobs:
+            hashes = (input_hash(job["inputs"]), self._config_hash(job))
+            if not force and self.table.is_done(job["name"], *hashes, job["output"]):
+                log.info(f"Skip {job['name']}: inputs and configuration unchanged.")
+                continue
+            pending.append((job, hashes))
+        log.info(f"Run {len(pending)} of {len(self.jobs)} jobs")
+
+        max_workers = self.max_workers or os.cpu_count() or 1
+        budget = memory.active()
+        max_memory = None if budget is None else budget.limit // max_workers
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for job, hashes in pending:
+                self.table.start(job["name"], job["output"], *hashes)
+                futures[executor.submit(_run_batch_job, job, max_memory)] = job
+            for future in tqdm(as_completed(futures), total=len(futures), unit="job"):
+                job = futures[future]
+                error = future.exception()
+                if error is not None:
+                    log.error(f"Job {job['name']} failed: {error!r}")
+                self.table.finish(job["name"], error=None if error is None else repr(error))
+        status = self.table.status()
+        return {job["name"]: status.get(job["name"]) for job in self.jobs}
+
+    @staticmethod
+    def _config_hash(job):
+        options = dict(job["options"], coefficients=_file_hash(job["options"].get("coefficients")))
+        return config_hash({"options": options, "output": job["output"], "version": __version__})
+
+
+def _run_batch_job(job, max_memory=None):
+    """Run the pipeline of a single batch job (executed in a worker process) within `max_memory`."""
+    from contextlib import nullcontext
+
+    from oceanpack.utils.memory import memory_budget
+
+    Path(job["output"]).parent.mkdir(parents=True, exist_ok=True)
+    with nullcontext() if max_memory is None else memory_budget(max_memory):
+        DataPipelineController().run(job["inputs"], job["output"], **job["options"])
+
+
+class WatchController:
+    """A class that controls the incremental conversion of the log files in a directory while they are written.
+
+    New and changed log files below `path` are detected by inotify (or by polling, see
+    :func:`~oceanpack.utils.watch.open_watcher`) and converted once their size did not
+    change for `settle` seconds. Only their new records are appended to the
+    :class:`~oceanpack.app.models.store.CruiseStore` at `output_file`. At the start, all
+    files that were not converted before are converted.
+    """
+
+    def __init__(
+        self,
+        path,
+        output_file,
+        source_type: str | None = None,
+        settle: float = 30.0,
+        polling: bool = False,
+    ):
+        self.path = Path(path)
+        self.source_type = source_type
+        self.polling = polling
+        self.store = CruiseStore(output_file)
+        self.debouncer = Debouncer(settle)
+
+    def run(self, interval: float = 5.0, duration: float | None = None):
+        """Watch the directory and convert the settled files every `interval` seconds.
+
+        Runs for `duration` seconds, or until it is interrupted if `duration` is None.
+        """
+        watcher = open_watcher(self.path, polling=self.polling)
+        pending = [file for file in collect_files(self.path) if not self.store.is_converted(file)]
+        log.info(f"Watch {self.path} ({type(watcher).__name__}), {len(pending)} files to convert")
+        self.debouncer.add(pending)
+        start = time.monotonic()
+        try:
+            while duration is None or time.monotonic() - start < duration:
+                self.debouncer.add(watcher.wait(interval))
+                settled = self.debouncer.pop_settled()
+                if settled:
+                    self.convert(settled)
+        finally:
+            watcher.close()
+            self.store.close()
+
+    def convert(self, files) -> int:
+        """Convert the log `files` and append their new records to the store.
+
+        A last line without line break is taken as still being written and left for the
+        next conversion of the file. Files that cannot be converted are logged and
+        skipped. Returns the number of appended records.
+        """
+        files = sorted(Path(file) for file in files)
+        start = time.perf_counter()
+        appended = 0
+        for file in files:
+            try:
+                stat = file.stat()
+                model = FileSourceModel(self.source_type)
+                model.load_data(file)
+                model.clean_data()
+                model.process_data()
+                self.source_type = model.source_type.value
+                complete = _ends_with_newline(file)
+                ds = model.ds if complete else model.ds.isel(time=slice(None, -1))
+                appended += self.store.append(ds)
+            except Exception as error:
+                log.error(f"Cannot convert {file}: {error!r}")
+                continue
+            if complete:
+                self.store.mark_converted(file, stat)
+
+        elapsed = time.perf_counter() - start
+        message = (
+            f"Appended {appended} records from {len(files)} files in {elapsed:.1f} s "
+            f"({appended / elapsed:.0f} records/s)"
+        )
+        last_change = _last_change(files)
+        if last_change is not None:
+            message += f", {time.time() - last_change:.0f} s after the last change"
+        if self.store.last_time is not None:
+            lag = pd.Timestamp.now(tz="UTC").tz_localize(None) - self.store.last_time
+            message += f"; the latest record is {lag.round('1s')} old"
+        log.info(message)
+        return appended
+
+
+def _last_change(files) -> float | None:
+    """Return the latest modification time of the `files` that still exist, or None."""
+    mtimes = []
+    for file in files:
+        try:
+            mtimes.append(os.path.getmtime(file))
+        except FileNotFoundError:
+            continue
+    return max(mtimes, default=None)
+
+
+def _ends_with_newline(file) -> bool:
+    """Return whether the file is empty or ends with a line break."""
+    with open(file, "rb") as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class IngestController:
+    """A class that controls the ingestion of live ``$PSDS0`` records sent by OceanView over the network.
+
+    The controller connects to each TCP server in `tcp` (``(host, port)``, reconnecting
+    every `retry` seconds if the connection fails) and listens on each UDP port in
+    `udp`, all concurrently. The received records are collected per stream (a TCP
+    connection, or a sender on a UDP port) and, every `flush_interval` seconds or
+    whenever `flush_rows` records are pending, converted and appended to the stores in
+    `output_dir` (see :class:`~oceanpack.app.models.ingest.StreamWriter`).
+
+    At most `max_pending` records are queued for conversion. If the queue is full, the
+    TCP connections are not read any further, so the senders are slowed down by TCP
+    flow control; UDP datagrams cannot be held back and are dropped (and counted in
+    :attr:`dropped`). :attr:`listening` tells whether the UDP ports are open.
+    """
+
+    def __init__(
+        self,
+        output_dir,
+        tcp=(),
+        udp=(),
+        flush_rows: int = 1000,
+        flush_interval: float = 10.0,
+        max_pending: int | None = None,
+        retry: float = 5.0,
+    ):
+        self.output_dir = Path(output_dir)
+        self.tcp = list(tcp)
+        self.udp = list(udp)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending or 10 * flush_rows
+        self.retry = retry
+        self.received = 0
+        self.dropped = 0
+        self.appended = 0
+        self.listening = False
+        self._batches = {}
+        self._pending = 0
+
+    def run(self, duration: float | None = None):
+        """Ingest the streams for `duration` seconds, or until interrupted if `duration` is None."""
+        asyncio.run(self.serve(duration))
+
+    async def serve(self, duration: float | None = None):
+        """Ingest the streams for `duration` seconds, or until cancelled if `duration` is None.
+
+        At the end, the pending records are converted and appended as well.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.max_pending)
+        # the stores of the writer may only be used from the thread that created them
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="oceanpack-ingest")
+        writer = None
+        transports = []
+        readers = [
+            asyncio.create_task(self._read_tcp(host, port, queue)) for host, port in self.tcp
+        ]
+        try:
+            writer = await loop.run_in_executor(executor, StreamWriter, self.output_dir)
+            for port in self.udp:
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda port=port: _DatagramProtocol(self, port, queue),
+                    local_addr=("0.0.0.0", port),
+                )
+                transports.append(transport)
+                log.info(f"Listen on UDP port {port}")
+            readers.append(asyncio.create_task(self._consume(queue, writer, executor)))
+            self.listening = True
+            if duration is None:
+                await asyncio.Event().wait()
+            else:
+                await asyncio.sleep(duration)
+        finally:
+            self.listening = False
+            for task in readers:
+                task.cancel()
+            for transport in transports:
+                transport.close()
+            await asyncio.gather(*readers, return_exceptions=True)
+            if writer is not None:
+                while not queue.empty():
+                    self._collect(queue.get_nowait())
+                await loop.run_in_executor(executor, self._flush, writer, self._take(), 0)
+                await loop.run_in_executor(executor, writer.close)
+            executor.shutdown()
+
+    async def _read_tcp(self, host: str, port: int, queue: asyncio.Queue):
+        """Read the records from the TCP server at `host`:`port` into `queue`, reconnecting if needed."""
+        stream = f"{host}:{port}"
+        while True:
+            try:
+                reader, connection = await asyncio.open_connection(host, port)
+            except OSError as error:
+                log.warning(f"⚠️  Cannot connect to {stream}: {error}. Retry in {self.retry:g} s.")
+                await asyncio.sleep(self.retry)
+                continue
+            log.info(f"Connected to {stream}")
+            try:
+                while line := await reader.readline():
+                    if line.startswith(b"$PSDS0") and line.endswith(b"\n"):
+                        self.received += 1
+                        # waits while the queue is full, which holds back the sender
+                        await queue.put((stream, line))
+            except (OSError, ValueError) as error:
+                log.warning(f"⚠️  Lost connection to {stream}: {error}")
+            finally:
+                connection.close()
+            log.warning(f"⚠️  Connection to {stream} closed. Reconnect in {self.retry:g} s.")
+            await asyncio.sleep(self.retry)
+
+    async def _consume(self, queue: asyncio.Queue, writer: StreamWriter, executor):
+        """Collect the records from `queue` and flush them after `flush_interval` seconds or `flush_rows` records."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:  # noqa: UP041 (Python 3.10)
+                item = None
+            while item is not None:
+                self._collect(item)
+                item = (
+                    queue.get_nowait()
+                    if self._pending < self.flush_rows and not queue.empty()
+                    else None
+                )
+            if self._pending >= self.flush_rows or loop.time() >= deadline:
+                # the queue keeps filling meanwhile, up to `max_pending` records; the flush is
+                # shielded, so the taken batches are written even if the ingestion is cancelled
+                # (before the final flush of `serve`, which the executor runs afterwards)
+                flush = loop.run_in_executor(
+                    executor, self._flush, writer, self._take(), queue.qsize()
+                )
+                await asyncio.shield(flush)
+                deadline = loop.time() + self.flush_interval
+
+    def _collect(self, item: tuple[str, bytes]):
+        """Add a (stream, record) `item` to the pending batches."""
+        stream, line = item
+        self._batches.setdefault(stream, []).append(line)
+        self._pending += 1
+
+    def _take(self) -> dict[str, list[bytes]]:
+        """Return the pending batches and start new ones."""
+        batches, self._batches, self._pending = self._batches, {}, 0
+        return batches
+
+    def _flush(self, writer: StreamWriter, batches: dict, queued: int):
+        """Append the `batches` of records to the stores and log the throughput."""
+        if not batches:
+            return
+        start = time.perf_counter()
+        appended = sum(writer.write(stream, lines) for stream, lines in batches.items())
+        self.appended += appended
+        elapsed = time.perf_counter() - start
+        log.info(
+            f"Appended {appended} records from {len(batches)} streams in {elapsed:.2f} s "
+            f"({appended / elapsed:.0f} records/s); {queued} records queued, {self.dropped} dropped"
+        )
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    """Put the ``$PSDS0`` records of the datagrams received on `port` into the queue of `controller`."""
+
+    def __init__(self, controller: IngestController, port: int, queue: asyncio.Queue):
+        self.controller = controller
+        self.port = port
+        self.queue = queue
+
+    def datagram_received(self, data: bytes, addr):
+        """Queue the records of the datagram, or drop them if the queue is full."""
+        stream = f"{addr[0]}:{self.port}"
+        for line in data.splitlines():
+            if not line.startswith(b"$PSDS0"):
+                continue
+            self.controller.received += 1
+            try:
+                self.queue.put_nowait((stream, line + b"\n"))
+            except asyncio.QueueFull:
+                self.controller.dropped += 1
@@ -0,0 +1,271 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+"""Lazy access to time and variable windows of an archive of netCDF files.
+
+:func:`open_archive` returns an :class:`Archive`, whose :meth:`~Archive.sel` finds the
+files of a time window in the :class:`~oceanpack.app.models.catalog.Catalog` and
+returns a lazy :class:`xarray.Dataset` backed by dask. Only the chunks that are
+computed are read, and the open files and the decoded chunks are kept in LRU caches,
+so looking at neighbouring or the same windows again, as in a notebook, does not read
+the files again.
+"""
+
+from collections import OrderedDict
+import logging
+import os
+from pathlib import Path
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .catalog import CATALOG_NAME, Catalog
+
+log = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """A thread-safe cache of at most `maxsize` (e.g. bytes, see `sizeof`) of the most recently used values.
+
+    Example
+    -------
+    >>> cache = LRUCache(2)
+    >>> cache.get("a", lambda: 1), cache.get("b", lambda: 2), cache.get("a", lambda: 0)
+    (1, 2, 1)
+    >>> cache.get("c", lambda: 3), list(cache)
+    (3, ['a', 'c'])
+    """
+
+    def __init__(self, maxsize: int, sizeof=None, on_evict=None):
+        self.maxsize = maxsize
+        self.sizeof = sizeof or (lambda value: 1)
+        self.on_evict = on_evict
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        """Iterate over the keys, from the least to the most recently used."""
+        with self._lock:
+            return iter(list(self._values))
+
+    def __len__(self):
+        """Return the number of cached values."""
+        return len(self._values)
+
+    def get(self, key, load):
+        """Return the value of `key`, which is computed by calling `load` if it is not in the cache.
+
+        Values larger than the whole cache are returned without caching them.
+        """
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                self.hits += 1
+                return self._values[key][0]
+            self.misses += 1
+        value = load()
+        size = self.sizeof(value)
+        evicted = []
+        with self._lock:
+            if size <= self.maxsize and key not in self._values:
+                self._values[key] = value, size
+                self.size += size
+                while self.size > self.maxsize:
+                    old_key, (old_value, old_size) = self._values.popitem(last=False)
+                    self.size -= old_size
+                    evicted.append((old_key, old_value))
+        if self.on_evict is not None:
+            for old_key, old_value in evicted:
+                self.on_evict(old_key, old_value)
+        return value
+
+    def clear(self):
+        """Remove all values."""
+        with self._lock:
+            values, self._values, self.size = list(self._values.items()), OrderedDict(), 0
+        for key, (value, _) in values:
+            if self.on_evict is not None:
+                self.on_evict(key, value)
+
+
+class _CachedChunks:
+    """An array-like view of a variable of an archive file, whose chunks are read through the chunk cache."""
+
+    def __init__(self, archive, key, name, variable):
+        self.archive = archive
+        self.key = key
+        self.name = name
+        self.shape = variable.shape
+        self.dtype = variable.dtype
+        self.ndim = variable.ndim
+
+    def __getitem__(self, index):
+        index = index if isinstance(index, tuple) else (index,)
+        bounds = tuple((s.start, s.stop, s.step) if isinstance(s, slice) else s for s in index)
+        return self.archive.chunks.get((*self.key, self.name, bounds), lambda: self._read(index))
+
+    def _read(self, index):
+        return np.asarray(self.archive._file(self.key)[self.name].variable[index].values)
+
+
+class Archive:
+    """Time and variable windows of the netCDF files in a catalog, as lazy datasets.
+
+    Parameters
+    ----------
+    source : path-like or Catalog
+        A directory of netCDF files (whose catalog :data:`~.catalog.CATALOG_NAME` is
+        updated first), the file of a catalog, or a :class:`~.catalog.Catalog`.
+    max_open_files : int
+        Number of files that are kept open.
+    cache_size : int or str
+        Size of the cache of decoded chunks, e.g. ``"256MB"``.
+    chunk_size : int
+        Number of records per chunk along time.
+    """
+
+    def __init__(
+        self, source, max_open_files: int = 32, cache_size="256MB", chunk_size: int = 8640
+    ):
+        from oceanpack.utils.memory import parse_size
+
+        if isinstance(source, Catalog):
+            self.catalog = source
+        elif Path(source).is_dir():
+            self.catalog = Catalog(Path(source) / CATALOG_NAME)
+            self.catalog.update(source)
+        else:
+            self.catalog = Catalog(source)
+        self.chunk_size = chunk_size
+        self.files = LRUCache(max_open_files, on_evict=lambda key, ds: ds.close())
+        self.chunks = LRUCache(parse_size(cache_size), sizeof=lambda array: array.nbytes)
+        self._datasets = {}
+
+    def sel(self, time=None, variables=None, tolerance: str = "2min", **filters):
+        """Return the records in the `time` window (a slice) with `variables` (all by default) as lazy dataset.
+
+        The datasets of several source types (e.g. Analyzer and NetDI) are aligned in
+        time as by ``merge-data`` (see :class:`~.data_processor.DataMerger`) within
+        `tolerance`. `filters` are passed to :meth:`~.catalog.Catalog.find`.
+
+        Returns
+        -------
+        xr.Dataset
+            Backed by dask arrays, which are computed with ``.load()``, ``.values`` etc.
+        """
+        import xarray as xr
+
+        datasets = self.sources(time, variables, **filters)
+        if not datasets:
+            log.warning(f"⚠️  No files in {self.catalog.path} cover the time window {time}.")
+            return xr.Dataset()
+        if len(datasets) == 1:
+            return datasets[0]
+        from .data_processor import DataMerger
+
+        merger = DataMerger()
+        merger.merge(datasets, tolerance=tolerance)
+        return merger.merged
+
+    def sources(self, time=None, variables=None, **filters) -> list:
+        """Return the records in the `time` window with `variables` as one lazy dataset per source type.
+
+        The files of each source type are concatenated along time (the first file wins
+        where files overlap), in the order of their first record.
+        """
+        import xarray as xr
+
+        time = (
+            time if isinstance(time, slice) else slice(None) if time is None else slice(time, time)
+        )
+        start, end = (None if t is None else pd.Timestamp(t) for t in (time.start, time.stop))
+        entries = self.catalog.find(start, end, variables, **filters)
+        log.info(f"Open {len(entries)} files of {self.catalog.path}")
+
+        groups = {}
+        for entry in entries:
+            ds = self._lazy(entry.path)
+            if variables is not None:
+                ds = ds[[var for var in variables if var in ds.data_vars]]
+            groups.setdefault(entry.source_type, []).append(ds.sel(time=slice(start, end)))
+        combined = []
+        for datasets in groups.values():
+            ds = datasets[0] if len(datasets) == 1 else xr.concat(
+                datasets, dim="time", data_vars="minimal", coords="minimal", compat="override", join="outer",
+                combine_attrs="drop_conflicts",
+            )  # fmt: skip
+            index = ds.indexes["time"]
+            if not index.is_unique or not index.is_monotonic_increasing:
+                ds = ds.isel(time=np.sort(np.unique(index, return_index=True)[1])).sortby("time")
+            combined.append(ds)
+        return combined
+
+    def close(self):
+        """Close the open files, empty the caches and close the catalog."""
+        self.files.clear()
+        self.chunks.clear()
+        self._datasets = {}
+        self.catalog.close()
+
+    def _file(self, key):
+        """Return the open file of `key` (its path and modification time)."""
+        import xarray as xr
+
+        return self.files.get(key, lambda: xr.open_dataset(key[0]))
+
+    def _lazy(self, path):
+        """Return the file at `path` as dataset whose variables along time are dask arrays reading through the caches."""
+        import dask.array as da
+        from dask.base import tokenize
+        import xarray as xr
+
+        key = (str(path), os.stat(path).st_mtime_ns)
+        if self._datasets.get(key[0], (None,))[0] == key:
+            return self._datasets[key[0]][1]
+        ds = self._file(key)
+        variables = {}
+        for name, variable in ds.variables.items():
+            if "time" not in variable.dims or name == "time":
+                variables[name] = variable.load().copy()
+                continue
+            chunks = tuple(self.chunk_size if dim == "time" else -1 for dim in variable.dims)
+            array = da.from_array(
+                _CachedChunks(self, key, name, variable),
+                chunks=chunks,
+                name=f"archive-{name}-{tokenize(key, name)}",
+                meta=np.empty((0,) * variable.ndim, variable.dtype),
+                asarray=False,
+            )
+            variables[name] = xr.Variable(variable.dims, array, variable.attrs)
+        lazy = xr.Dataset(
+            {name: v for name, v in variables.items() if name not in ds.coords},
+            coords={name: v for name, v in variables.items() if name in ds.coords},
+            attrs=ds.attrs,
+        )
+        self._datasets[key[0]] = key, lazy
+        return lazy
+
+
+def open_archive(
+    source, max_open_files: int = 32, cache_size="256MB", chunk_size: int = 8640
+) -> Archive:
+    """Open the archive of netCDF files at `source` (see :class:`Archive` for the parameters).
+
+    Example
+    -------
+    >>> import oceanpack
+    >>> archive = oceanpack.open_archive("processed/")  # doctest: +SKIP
+    >>> ds = archive.sel(
+    ...     time=slice("2024-06-01", "2024-06-02"), variables=["fCO2_wet_sst"]
+    ... )  # doctest: +SKIP
+    """
+    return Archive(
+        source, max_open_files=max_open_files, cache_size=cache_size, chunk_size=chunk_size
+    )
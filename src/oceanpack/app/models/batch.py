@@ -0,0 +1,167 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+"""Batch processing of many cruises: the manifest describing the jobs and the SQLite job table."""
+
+from datetime import datetime, timezone
+import hashlib
+import logging
+import os
+from pathlib import Path
+import sqlite3
+
+log = logging.getLogger(__name__)
+
+#: Options of a cruise that are passed on to :meth:`DataPipelineController.run`
+JOB_OPTIONS = (
+    "source_types",
+    "tolerance",
+    "keep_all",
+    "drift_correction",
+    "span_concentration",
+    "coefficients",
+    "precision",
+)
+
+
+def load_manifest(path) -> list[dict]:
+    """Read the batch manifest at `path` (TOML or YAML) and return one job per cruise.
+
+    The manifest contains a list ``cruise`` of tables with the keys ``name``,
+    ``inputs`` (paths of the logging units) and ``output``, and optionally any of
+    :data:`JOB_OPTIONS`. A table ``defaults`` sets options for all cruises. Relative
+    paths are resolved against the directory of the manifest.
+
+    Example manifest (TOML)::
+
+        [defaults]
+        drift_correction = true
+
+        [[cruise]]
+        name = "MSM123"
+        inputs = ["MSM123/Analyzer", "MSM123/NetDI"]
+        output = "processed/MSM123.nc"
+    """
+    path = Path(path)
+    if path.suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as error:
+            raise ImportError(
+                "Reading YAML manifests requires PyYAML. Use a TOML manifest instead."
+            ) from error
+        manifest = yaml.safe_load(path.read_text())
+    else:
+        try:
+            import tomllib
+        except ImportError:  # Python 3.10
+            try:
+                import tomli as tomllib
+            except ImportError as error:
+                raise ImportError(
+                    "Reading TOML manifests requires tomli on Python < 3.11."
+                ) from error
+        manifest = tomllib.loads(path.read_text())
+
+    defaults = manifest.get("defaults", {})
+    jobs = []
+    for cruise in manifest.get("cruise", []):
+        missing = [key for key in ("name", "inputs", "output") if key not in cruise]
+        if missing:
+            raise ValueError(f"Cruise {cruise.get('name', len(jobs))} in {path} lacks {missing}.")
+        options = {**defaults, **cruise}
+        unknown = set(options) - {"name", "inputs", "output", *JOB_OPTIONS}
+        if unknown:
+            raise ValueError(f"Unknown options {sorted(unknown)} for cruise {cruise['name']}.")
+        job = {
+            "name": cruise["name"],
+            "inputs": [str(path.parent / p) for p in cruise["inputs"]],
+            "output": str(path.parent / cruise["output"]),
+            "options": {key: options[key] for key in JOB_OPTIONS if key in options},
+        }
+        if job["options"].get("coefficients") is not None:
+            job["options"]["coefficients"] = str(path.parent / job["options"]["coefficients"])
+        jobs.append(job)
+    if len({job["name"] for job in jobs}) != len(jobs):
+        raise ValueError(f"The cruise names in {path} are not unique.")
+    return jobs
+
+
+def input_hash(paths) -> str:
+    """Return a hash of the names, sizes and modification times of all files below `paths`.
+
+    Only the file metadata are read, so checking a whole archive is fast.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(Path(p) for p in paths):
+        files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+        for file in files:
+            stat = file.stat()
+            digest.update(f"{file}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+class JobTable:
+    """The state of the batch jobs in a SQLite database.
+
+    Each job is identified by its name and stores the hashes of its inputs and its
+    configuration, its status (``running``, ``done`` or ``failed``) and timestamps.
+    Jobs that were interrupted remain ``running`` and are therefore run again.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._connection = sqlite3.connect(self.path)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                name TEXT PRIMARY KEY,
+                output TEXT,
+                input_hash TEXT,
+                config_hash TEXT,
+                status TEXT,
+                started TEXT,
+                finished TEXT,
+                error TEXT
+            )
+            """
+        )
+        self._connection.commit()
+
+    def is_done(self, name, input_hash, config_hash, output) -> bool:
+        """Return whether job `name` finished with the same hashes and its output still exists."""
+        row = self._connection.execute(
+            "SELECT input_hash, config_hash, status FROM jobs WHERE name = ?", (name,)
+        ).fetchone()
+        return row == (input_hash, config_hash, "done") and os.path.exists(output)
+
+    def start(self, name, output, input_hash, config_hash):
+        """Mark job `name` as running."""
+        self._connection.execute(
+            "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, 'running', ?, NULL, NULL)",
+            (name, output, input_hash, config_hash, _now()),
+        )
+        self._connection.commit()
+
+    def finish(self, name, error: str | None = None):
+        """Mark job `name` as done, or as failed if an `error` is given."""
+        self._connection.execute(
+            "UPDATE jobs SET status = ?, finished = ?, error = ? WHERE name = ?",
+            ("failed" if error else "done", _now(), error, name),
+        )
+        self._connection.commit()
+
+    def status(self) -> dict[str, str]:
+        """Return the status of all jobs by name."""
+        return dict(self._connection.execute("SELECT name, status FROM jobs ORDER BY name"))
+
+    def close(self):
+        """Close the database connection."""
+        self._connection.close()
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")  # noqa: UP017 (Python 3.10)
@@ -0,0 +1,226 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+"""The catalog: an index of converted netCDF files by time extent, variables, source type, cruise and position."""
+
+from dataclasses import dataclass
+import logging
+from pathlib import Path
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+#: File name of the catalog of a directory
+CATALOG_NAME = "oceanpack-catalog.sqlite"
+
+
+@dataclass
+class Entry:
+    """A netCDF file in the :class:`Catalog`."""
+
+    path: Path
+    start: pd.Timestamp
+    end: pd.Timestamp
+    n_times: int
+    source_type: str | None
+    cruise: str | None
+    variables: list[str]
+    #: (lon_min, lat_min, lon_max, lat_max) in decimal degrees, or None without positions
+    bbox: tuple[float, float, float, float] | None
+
+
+class Catalog:
+    """An index of the netCDF files below a directory in a SQLite database.
+
+    For each file, the catalog records the time extent, the data variables, the source
+    type (``source_type`` attribute), the cruise (``cruise`` attribute) and the bounding
+    box of the positions, so the files that cover a time window can be found without
+    opening every file. :meth:`update` indexes only files that are new or changed since
+    they were indexed (by size and modification time).
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._connection = sqlite3.connect(self.path)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS datasets (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                start INTEGER,
+                end INTEGER,
+                n_times INTEGER,
+                source_type TEXT,
+                cruise TEXT,
+                variables TEXT,
+                lon_min REAL,
+                lat_min REAL,
+                lon_max REAL,
+                lat_max REAL
+            )
+            """
+        )
+        self._connection.commit()
+
+    def update(self, directory) -> int:
+        """Index the new and changed netCDF files below `directory` and forget the removed ones.
+
+        Returns the number of (re-)indexed files.
+        """
+        directory = Path(directory).resolve()
+        files = {str(file): file.stat() for file in sorted(directory.rglob("*.nc"))}
+        known = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self._connection.execute(
+                "SELECT path, size, mtime_ns FROM datasets"
+            )
+            if Path(path).is_relative_to(directory)
+        }
+        removed = [(path,) for path in known if path not in files]
+        self._connection.executemany("DELETE FROM datasets WHERE path = ?", removed)
+        indexed = 0
+        for path, stat in files.items():
+            if known.get(path) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            self._connection.execute(
+                "INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, *_describe(path)),
+            )
+            indexed += 1
+        self._connection.commit()
+        if indexed or removed:
+            log.info(f"Indexed {indexed} and removed {len(removed)} files in {self.path}")
+        return indexed
+
+    def find(
+        self,
+        start=None,
+        end=None,
+        variables=None,
+        source_type: str | None = None,
+        cruise: str | None = None,
+        bbox=None,
+    ) -> list[Entry]:
+        """Return the files that overlap the time window and match the filters, sorted by time.
+
+        Parameters
+        ----------
+        start, end : datetime-like, optional
+            The time window (both ends included). Open on a side if not given.
+        variables : list[str], optional
+            Only files that contain at least one of these variables.
+        source_type, cruise : str, optional
+            Only files of this source type (e.g. ``"Analyzer"``) or cruise.
+        bbox : tuple[float, float, float, float], optional
+            Only files with positions in (lon_min, lat_min, lon_max, lat_max).
+        """
+        query = "SELECT * FROM datasets WHERE n_times > 0"
+        parameters = []
+        if start is not None:
+            query += " AND end >= ?"
+            parameters.append(pd.Timestamp(start).value)
+        if end is not None:
+            query += " AND start <= ?"
+            parameters.append(pd.Timestamp(end).value)
+        for column, value in (("source_type", source_type), ("cruise", cruise)):
+            if value is not None:
+                query += f" AND {column} = ?"
+                parameters.append(value)
+        if bbox is not None:
+            query += " AND lon_max >= ? AND lat_max >= ? AND lon_min <= ? AND lat_min <= ?"
+            parameters.extend(bbox)
+        entries = [
+            _entry(row)
+            for row in self._connection.execute(query + " ORDER BY start, path", parameters)
+        ]
+        if variables is not None:
+            entries = [entry for entry in entries if set(variables) & set(entry.variables)]
+        return entries
+
+    def close(self):
+        """Close the database connection."""
+        self._connection.close()
+
+
+def _describe(path) -> tuple:
+    """Return the catalog columns after size and modification time for the netCDF file at `path`."""
+    import xarray as xr
+
+    try:
+        with xr.open_dataset(path) as ds:
+            if "time" not in ds.indexes or not ds.sizes["time"]:
+                return (
+                    None,
+                    None,
+                    0,
+                    ds.attrs.get("source_type"),
+                    ds.attrs.get("cruise"),
+                    "",
+                    *[None] * 4,
+                )
+            times = ds.indexes["time"]
+            bbox = _bbox(ds)
+            return (
+                times.min().value,
+                times.max().value,
+                len(times),
+                ds.attrs.get("source_type"),
+                ds.attrs.get("cruise"),
+                ",".join(str(var) for var in ds.data_vars),
+                *(bbox or [None] * 4),
+            )
+    except Exception as error:
+        log.warning(f"⚠️  Cannot index {path}: {error!r}")
+        return (None, None, 0, None, None, "", *[None] * 4)
+
+
+def _bbox(ds):
+    """Return (lon_min, lat_min, lon_max, lat_max) of the positions in `ds` in decimal degrees, or None.
+
+    The raw GPS variables ``Latitude``/``Longitude`` (and ``lat``/``lon`` of the stream
+    files) are in the ``dddmm.mmmm`` format; ``lat``/``lon`` of processed files are in
+    decimal degrees already.
+    """
+    from oceanpack.utils.helpers import convert_coordinates
+
+    if "Latitude" in ds and "Longitude" in ds:
+        lat, lon = (
+            convert_coordinates(ds["Latitude"].values),
+            convert_coordinates(ds["Longitude"].values),
+        )
+    elif "lat" in ds and "lon" in ds:
+        lat, lon = ds["lat"].values, ds["lon"].values
+        if ds.attrs.get("source_type") == "Stream":
+            lat, lon = convert_coordinates(lat), convert_coordinates(lon)
+    else:
+        return None
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    if not valid.any():
+        return None
+    return (
+        float(lon[valid].min()),
+        float(lat[valid].min()),
+        float(lon[valid].max()),
+        float(lat[valid].max()),
+    )
+
+
+def _entry(row) -> Entry:
+    path, _, _, start, end, n_times, source_type, cruise, variables, *bbox = row
+    return Entry(
+        path=Path(path),
+        start=pd.Timestamp(start),
+        end=pd.Timestamp(end),
+        n_times=n_times,
+        source_type=source_type,
+        cruise=cruise,
+        variables=variables.split(",") if variables else [],
+        bbox=None if bbox[0] is None else tuple(bbox),
+    )
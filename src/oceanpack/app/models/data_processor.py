@@ -8,9 +8,72 @@
 
 import logging
 
+from oceanpack.utils.profiling import profiled
+
 log = logging.getLogger(__name__)
 
 
+#: Raw readings and coefficients of the CO2 analyzer, which are not masked in non-operating phases
+RAW_ANALYZER_VARIABLES = ("CO2abs", "CO2raw", "CO2ref", "CO2kzero", "CO2kspan1", "CO2kspan2")
+
+#: Variables with error codes or switch states (besides the system states and valves of
+#: :mod:`oceanpack.utils.compact`), which are reduced to their most common value by the resampler
+STATE_VARIABLES = ("Error",)
+
+
+def _n_records(model):
+    """Return the number of records of the dataset of `model` (for the profiling report)."""
+    ds = getattr(model, "ds", None)
+    if ds is None:
+        ds = getattr(model, "merged", None)
+    return None if ds is None else ds.sizes.get("time")
+
+
+def _chunk_to_budget(ds, max_memory=None):
+    """Return `ds` in dask chunks if it does not fit into the memory budget as a whole.
+
+    The chunks along time are sized with :meth:`~oceanpack.utils.memory.MemoryBudget.rows`.
+    Without a budget (see :mod:`oceanpack.utils.memory`), `ds` is returned unchanged.
+    """
+    from oceanpack.utils import memory
+
+    budget = memory.active(max_memory)
+    if budget is None or "time" not in ds.dims:
+        return ds
+    bytes_per_row = memory.dataset_bytes_per_row(ds)
+    if budget.fits(bytes_per_row * ds.sizes["time"], copies=memory.PROCESSING_COPIES):
+        return ds
+    rows = budget.rows(bytes_per_row)
+    log.info(f"Process the dataset in chunks of {rows} records to stay within the memory budget.")
+    return ds.chunk({"time": rows})
+
+
+def _record_lag(sst, sbe45, dt: int, max_lag: int, min_correlation: float):
+    """Return the lag (in seconds) of `sbe45` behind `sst` over the whole record, or None if it cannot be estimated.
+
+    Both series are on a regular grid with the interval `dt` (in ns); `max_lag` is given
+    in samples.
+    """
+    import numpy as np
+
+    from oceanpack.utils.helpers import estimate_lag
+
+    lag, correlation = estimate_lag(sst, sbe45, max_lag=max_lag)
+    if not np.isfinite(lag):
+        log.warning("⚠️  Lag analysis skipped. Not enough valid SST and SBE45Temp data.")
+        return None
+    if correlation < min_correlation:
+        log.warning(
+            f"⚠️  Lag analysis skipped. The correlation of SST and SBE45Temp (r = {correlation:.2f}) "
+            f"is below {min_correlation}."
+        )
+        return None
+    log.info(
+        f"Lag of SBE45Temp behind SST: {lag * dt / 1e9:.1f} s (r = {correlation:.2f}) for the whole record"
+    )
+    return lag * dt / 1e9
+
+
 class DataProcessor:
     """A class the processes the data from the Analyzer or the NetDI unit.
     This includes:
@@ -18,17 +81,52 @@ class DataProcessor:
         - Compute pCO2
         - Compute fugacity
         - ...
+
+    If `max_memory` is given (bytes or e.g. ``"2GB"``), or a memory budget is active
+    (see :mod:`oceanpack.utils.memory`), datasets that do not fit into memory are
+    processed in dask chunks and written block by block.
+
+    With ``precision="float32"``, the pressures, pCO2 and fCO2 are computed (and stored)
+    in single precision, which halves their memory and bandwidth; they deviate by less
+    than 0.001 µatm from the double-precision results (see
+    :func:`~oceanpack.utils.helpers.fugacity`).
     """
 
-    def __init__(self):
-        self.ds = None
+    def __init__(self, max_memory=None, precision: str = "float64"):
+        from oceanpack.utils.helpers import PRECISIONS
 
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision '{precision}'. Expected one of {PRECISIONS}.")
+        self.ds = None
+        self.max_memory = max_memory
+        self.precision = precision
+        self.source = None
+        self.config_hash = None
+        self._opened = None
+        self._modified = set()
+        self._write_from = None
+        self._record_start = None
+
+    @profiled(rows=_n_records)
     def load_data(self, file):
-        """Load raw data from `file`."""
+        """Load raw data from `file` (a netCDF file or an in-memory :class:`xarray.Dataset`)."""
         import xarray as xr
 
+        self.source = None
+        self._opened = None
+        self._modified = set()
+        self._write_from = None
+        self._record_start = None
+        if isinstance(file, xr.Dataset):
+            self.ds = file
+            return
         self.ds = xr.open_dataset(file)
+        self.source = file
+        # keep the opened dataset, derived datasets (e.g. chunked ones) cannot close the file
+        self._opened = self.ds
+        self.ds = _chunk_to_budget(self.ds, self.max_memory)
 
+    @profiled(rows=_n_records)
     def convert_coordinates(self):
         """Convert longitude and latitude from DDDMM.MMM format to decimal degrees."""
         from oceanpack.utils.helpers import convert_coordinates
@@ -38,24 +136,26 @@ class DataProcessor:
                 "Longitude and Latitude variables not found. Skipping coordinate conversion."
             )
             return
-        self.ds["lon"] = convert_coordinates(self.ds["Longitude"])
-        self.ds["lat"] = convert_coordinates(self.ds["Latitude"])
+        self._set("lon", convert_coordinates(self.ds["Longitude"]))
+        self._set("lat", convert_coordinates(self.ds["Latitude"]))
 
+    @profiled(rows=_n_records)
     def compute_equilibrator_pressure(self):
         """Obtain pressure at the equilibrator/membrane."""
         from oceanpack.utils.helpers import pressure2atm
 
         df = self.ds[["CellPress", "DPressInt"]].to_pandas()
         pressure_equ = df["CellPress"] - df["DPressInt"].rolling("2min").mean()  # in mBar
-        self.ds["PressEqu"] = pressure2atm(pressure_equ)  # in atm
+        self._set("PressEqu", pressure2atm(pressure_equ, precision=self.precision))  # in atm
         self.ds["PressEqu"].attrs["unit"] = "atm"
         self.ds["PressEqu"].attrs["long_name"] = "Pressure at equilibrator/membrane"
 
+    @profiled(rows=_n_records)
     def compute_pCO2_wet_equ(self):
-        """Compute pCO2 at the equilibrator in wet air."""
+        """Compute pCO2 at the equilibrator in wet air (from ``CO2_corrected`` if available)."""
         from oceanpack.utils.helpers import ppm2uatm
 
-        _required_variables = ["CO2", "PressEqu"]
+        _required_variables = [self._corrected("CO2"), "PressEqu"]
         if any(var not in self.ds.variables for var in _required_variables):
             log.warning(
                 "⚠️  pCO2 calculation skipped. The following variables were not found but are required for the pCO2 calculation:\n"
@@ -63,13 +163,18 @@ class DataProcessor:
             )
             return
 
-        self.ds["pCO2_wet_equ"] = ppm2uatm(
-            self.ds["CO2"], 
-            self.ds["PressEqu"]
+        self._set(
+            "pCO2_wet_equ",
+            ppm2uatm(
+                self.ds[self._corrected("CO2")],
+                self.ds["PressEqu"],
+                precision=self.precision,
+            ),
         )
         self.ds["pCO2_wet_equ"].attrs["unit"] = "µatm"
         self.ds["pCO2_wet_equ"].attrs["long_name"] = "pCO2 at equilibrator/membrane in wet air"
 
+    @profiled(rows=_n_records)
     def compute_fCO2_wet_equ(self):
         """Compute fugacity of CO2 at the equilibrator."""
         from oceanpack.utils.helpers import fugacity
@@ -82,19 +187,25 @@ class DataProcessor:
             )
             return
 
-        self.ds["fCO2_wet_equ"] = fugacity(
-            self.ds["pCO2_wet_equ"],
-            self.ds["PressEqu"],
-            self.ds["SBE45Temp"],
-            xCO2=self.ds["CO2"]
+        self._set(
+            "fCO2_wet_equ",
+            fugacity(
+                self.ds["pCO2_wet_equ"],
+                self.ds["PressEqu"],
+                self.ds["SBE45Temp"],
+                xCO2=self.ds[self._corrected("CO2")],
+                precision=self.precision,
+            ),
         )
         self.ds["fCO2_wet_equ"].attrs["unit"] = "µatm"
         self.ds["fCO2_wet_equ"].attrs["long_name"] = "fCO2 at equilibrator/membrane in wet air"
 
+    @profiled(rows=_n_records)
     def compute_pCO2_wet_sst(self):
         """Compute pCO2 at in-situ sea surface temperature (SST) in wet air."""
         self._apply_temperature_correction("pCO2_wet_equ")
     
+    @profiled(rows=_n_records)
     def compute_fCO2_wet_sst(self):
         """Compute fugacity of CO2 at in-situ sea surface temperature (SST) in wet air."""
         self._apply_temperature_correction("fCO2_wet_equ")
@@ -106,10 +217,10 @@ class DataProcessor:
         T_equ is approximated by waterTemp (internal SBE45 temperature).
 
         .. note::
-            If measurements were taken on a ship, the water intake path may introduce a
-            lag between the actual SST and the registered ``SBE45Temp``. A lag analysis
-            and time-series correction of the intake temperature should be considered
-            before applying this correction in such cases.
+            If measurements were taken on a ship, the water intake path introduces a lag
+            between the actual SST and the registered ``SBE45Temp``. This lag is
+            estimated by :meth:`estimate_intake_lag` and removed by
+            :meth:`correct_intake_lag`, whose ``SST_corrected`` is used here if present.
 
         References
         ----------
@@ -119,8 +230,8 @@ class DataProcessor:
 
         # xCO2_var ∈ {"pCO2_wet_equ" or "fCO2_wet_equ"}
         T_equ_var = "SBE45Temp"  # equilibrator temperature (approximated by internal SBE45)
-        T_target_var = "SST"  # in-situ sea surface temperature (SST)
-        _required_variables = [xCO2_var, "SBE45Temp", "SST"]
+        T_target_var = self._corrected("SST")  # in-situ sea surface temperature (SST)
+        _required_variables = [xCO2_var, "SBE45Temp", T_target_var]
         if any(var not in self.ds.variables for var in _required_variables):
             log.warning(
                 "⚠️  Temperature correction skipped. The following variables were not found but are required for the temperature correction:\n"
@@ -128,57 +239,434 @@ class DataProcessor:
             )
             return
         xCO2_target_var = xCO2_var.replace("equ", "sst")
-        self.ds[xCO2_target_var] = temperature_correction(
-            CO2=self.ds[xCO2_var], 
-            T_out=self.ds[T_target_var], 
-            T_in=self.ds[T_equ_var], 
-            method="Takahashi2009"
+        self._set(
+            xCO2_target_var,
+            temperature_correction(
+                CO2=self.ds[xCO2_var],
+                T_out=self.ds[T_target_var],
+                T_in=self.ds[T_equ_var],
+                method="Takahashi2009",
+                precision=self.precision,
+            ),
         )
         self.ds[xCO2_target_var].attrs["unit"] = "µatm"
         self.ds[xCO2_target_var].attrs["long_name"] = (
             f"{xCO2_target_var} at SST in wet air (temperature-corrected)"
         )
 
+    @profiled(rows=_n_records)
+    def estimate_intake_lag(
+        self,
+        window: str = "6h",
+        step: str = "1h",
+        max_lag: str = "10min",
+        min_correlation: float = 0.5,
+    ):
+        """Estimate the time lag of the internal ``SBE45Temp`` behind the intake ``SST``.
+
+        Both temperatures are put on a regular time grid (with the median sampling interval)
+        and cross-correlated via FFT, once for the whole record and in sliding windows of
+        length `window`, since the lag varies with the flow rate. The lag (in seconds) is
+        stored as ``SST_lag``, interpolated between the window centres. Windows without
+        enough valid data fall back to the lag of the whole record. If the correlation
+        of the whole record is below `min_correlation`, no lag is stored.
+
+        After :meth:`restrict_time`, only the loaded records are cross-correlated, in the
+        same windows as in a full run (the window grid starts at the beginning of the
+        record). The lag of the whole record is then taken from the attribute
+        ``global_lag`` of the ``SST_lag`` of the earlier run.
+        """
+        import numpy as np
+        import pandas as pd
+
+        from oceanpack.utils.helpers import sliding_lag
+
+        _required_variables = ["SST", "SBE45Temp"]
+        if any(var not in self.ds.variables for var in _required_variables):
+            log.warning(
+                "⚠️  Lag analysis skipped. The following variables were not found but are required for the lag analysis:\n"
+                f"\t{', '.join([var for var in _required_variables if var not in self.ds.variables])}"
+            )
+            return
+
+        time = self.ds["time"].values.astype("datetime64[ns]").astype(np.int64)
+        if len(time) < 2:
+            log.warning("⚠️  Lag analysis skipped. At least two records are required.")
+            return
+        dt = int(np.median(np.diff(time)))
+        if dt <= 0:
+            log.warning(
+                "⚠️  Lag analysis skipped. The time axis is not increasing (e.g. duplicate timestamps)."
+            )
+            return
+        origin = time[0] if self._record_start is None else pd.Timestamp(self._record_start).value
+        position = np.rint((time - origin) / dt).astype(np.int64)
+        first, position = position[0], position - position[0]
+        sst = np.full(position[-1] + 1, np.nan)
+        sbe45 = np.full(position[-1] + 1, np.nan)
+        sst[position] = self.ds["SST"].values
+        sbe45[position] = self.ds["SBE45Temp"].values
+
+        def to_samples(offset):
+            return max(int(pd.to_timedelta(offset).value // dt), 1)
+
+        max_lag_samples = to_samples(max_lag)
+        if len(sst) < 4 * max_lag_samples:
+            log.warning("⚠️  Lag analysis skipped. The record is too short for the maximum lag.")
+            return
+        global_lag = None
+        if self._record_start is not None and "SST_lag" in self.ds.variables:
+            # estimated over the whole record by the earlier run
+            global_lag = self.ds["SST_lag"].attrs.get("global_lag")
+        if global_lag is None:
+            global_lag = _record_lag(sst, sbe45, dt, max_lag_samples, min_correlation)
+            if global_lag is None:
+                return
+        # the windows start at multiples of `step` after the beginning of the record
+        skip = -first % to_samples(step)
+        centers, lags, _ = sliding_lag(
+            sst[skip:],
+            sbe45[skip:],
+            window=to_samples(window),
+            step=to_samples(step),
+            max_lag=max_lag_samples,
+        )
+        valid = np.isfinite(lags)
+        if valid.any():
+            lag = np.interp(position, centers[valid] + skip, lags[valid]) * dt / 1e9
+        else:
+            lag = np.full(len(time), global_lag)
+
+        log.info(
+            f"Lag of SBE45Temp behind SST: {np.nanmin(lag):.1f} s to {np.nanmax(lag):.1f} s "
+            f"in {window} windows"
+        )
+        self._set("SST_lag", ("time", lag))
+        self.ds["SST_lag"].attrs["unit"] = "s"
+        self.ds["SST_lag"].attrs["long_name"] = "Time lag of SBE45Temp behind the intake SST"
+        self.ds["SST_lag"].attrs["global_lag"] = global_lag
+
+    @profiled(rows=_n_records)
+    def correct_intake_lag(self):
+        """Shift the intake ``SST`` by the estimated lag onto the time axis of ``SBE45Temp``.
+
+        The water measured at the equilibrator at time *t* passed the intake at *t − lag*,
+        so the SST is interpolated at these times and stored as ``SST_corrected``; the
+        intake ``SST`` is kept as it is.
+        """
+        import numpy as np
+
+        if "SST_lag" not in self._modified:
+            self.estimate_intake_lag()
+        if "SST_lag" not in self.ds.variables:
+            return
+
+        time = self.ds["time"].values.astype("datetime64[ns]").astype(np.int64)
+        source_time = time - self.ds["SST_lag"].values * 1e9
+        self._set(
+            "SST_corrected",
+            (
+                "time",
+                np.interp(source_time, time, self.ds["SST"].values, left=np.nan, right=np.nan),
+                self.ds["SST"].attrs,
+            ),
+        )
+
+    @profiled(rows=_n_records)
     def remove_non_operating_phases(self):
-        """Set CO2 values in non-operating phases to NaN"""
+        """Set CO2 values in non-operating phases to NaN, stored as ``<variable>_corrected``.
+
+        The measured variables are kept as they are, so the processing can be repeated.
+        """
         from oceanpack.utils.helpers import set_nonoperating_to_nan
 
-        for var in self.ds.variables:
-            if "CO2" in var and not var.endswith("original"):
-                if f"{var}_original" not in self.ds.variables:
-                    self.ds = self.ds.rename({var: f"{var}_original"})
-                df = self.ds[[f"{var}_original", "STATUS"]].to_pandas()
-                df = set_nonoperating_to_nan(
-                    df, status_var="STATUS", col=f"{var}_original", buffer="20min"
-                )
-                self.ds[var] = df[f"{var}_original"]
+        for var in list(self.ds.data_vars):
+            attrs = self.ds[var].attrs
+            if "CO2" not in var or "flag_values" in attrs or var in RAW_ANALYZER_VARIABLES:
+                continue
+            if var.endswith("_corrected") or "processed_until" in attrs or var in self._modified:
+                continue  # derived, gets recomputed from the masked CO2
+            df = self.ds[[var, "STATUS"]].to_pandas()
+            df = set_nonoperating_to_nan(df, status_var="STATUS", col=var, buffer="20min")
+            self._set(f"{var}_corrected", ("time", df[var].to_numpy(), attrs))
+
+    @profiled(rows=_n_records)
+    def correct_drift(self, span_concentration: float | None = None, settle: str = "1min"):
+        """Correct ``CO2`` for the analyzer drift observed in the zero (and span) calibrations.
+
+        The correction is computed from the readings (``CO2``) including the calibration
+        phases, see :func:`~oceanpack.utils.calibration.drift_correction`, and stored as
+        ``CO2_corrected`` with the non-operating phases masked. The applied offset and
+        gain are stored as ``zero_offset`` and ``span_gain``.
+        """
+        import numpy as np
+
+        from oceanpack.utils.calibration import drift_correction
+        from oceanpack.utils.helpers import nonoperating_mask
+
+        source = "CO2"
+        if source not in self.ds.variables or "STATUS" not in self.ds.variables:
+            log.warning("⚠️  Drift correction skipped. CO2 or STATUS not found in dataset.")
+            return
+
+        time = self.ds["time"].values
+        status = self.ds["STATUS"].values
+        corrected, offset, gain = drift_correction(
+            time,
+            self.ds[source].values,
+            status,
+            span_concentration=span_concentration,
+            settle=settle,
+        )
+        excluded = nonoperating_mask(time, status, buffer="20min")
+        self._set(
+            "CO2_corrected", ("time", np.where(excluded, np.nan, corrected), self.ds[source].attrs)
+        )
+        self._set("zero_offset", ("time", offset))
+        self.ds["zero_offset"].attrs["unit"] = self.ds[source].attrs.get("unit", "ppm")
+        self.ds["zero_offset"].attrs["long_name"] = "Zero offset subtracted from the CO2 reading"
+        self._set("span_gain", ("time", gain))
+        self.ds["span_gain"].attrs["long_name"] = (
+            "Span gain applied to the zero-corrected CO2 reading"
+        )
+
+    @profiled(rows=_n_records)
+    def recompute_co2(self, coefficients):
+        """Recompute CO2 from the raw LI-840 counts with the given coefficient table.
 
+        See :func:`~oceanpack.utils.calibration.recompute_co2` for the format of
+        `coefficients`. The result is stored as ``CO2_recomputed``, with the
+        non-operating phases masked.
+        """
+        import numpy as np
+
+        from oceanpack.utils.calibration import recompute_co2
+        from oceanpack.utils.helpers import nonoperating_mask
+
+        required = ["CO2raw", "CO2ref", "CellTemp", "CellPress", "STATUS"]
+        missing = [var for var in required if var not in self.ds.variables]
+        if missing:
+            log.warning(
+                f"⚠️  Recomputation of CO2 skipped. Variables {missing} not found in dataset."
+            )
+            return
+
+        co2 = recompute_co2(self.ds, coefficients)
+        excluded = nonoperating_mask(
+            self.ds["time"].values, self.ds["STATUS"].values, buffer="20min"
+        )
+        self._set("CO2_recomputed", ("time", np.where(excluded, np.nan, co2)))
+        self.ds["CO2_recomputed"].attrs["unit"] = "ppm"
+        self.ds["CO2_recomputed"].attrs["long_name"] = "CO2 recomputed from the raw LI-840 counts"
+
+    @profiled(rows=_n_records)
+    def apply_quality_control(self, config: dict | None = None):
+        """Run the automated quality control tests and add the flags as ``<variable>_flag``.
+
+        The flags follow the WOCE convention (2: good, 3: questionable, 4: bad,
+        9: missing). See :data:`oceanpack.utils.qc.QC_CONFIG` for the tests and the
+        default thresholds. The corrected values (``<variable>_corrected``) are tested in
+        place of the measured ones.
+        """
+        from oceanpack.utils.qc import quality_control
+
+        corrected = {
+            var: self.ds[f"{var}_corrected"]
+            for var in self.ds.data_vars
+            if f"{var}_corrected" in self.ds
+        }
+        flags = quality_control(self.ds.assign(corrected), config=config)
+        for var in flags.data_vars:
+            self._set(var, flags[var])
+
+    def processed_until(self, config_hash: str):
+        """Return the time up to which the derived variables were processed with `config_hash`.
+
+        Derived variables carry the attributes ``processed_until`` and ``config_hash``
+        (see :meth:`to_netcdf`). None is returned if there are no derived variables or
+        any of them was processed with a different configuration.
+        """
+        import pandas as pd
+
+        derived = [var for var in self.ds.data_vars if "processed_until" in self.ds[var].attrs]
+        if not derived or any(
+            self.ds[var].attrs.get("config_hash") != config_hash for var in derived
+        ):
+            return None
+        return min(pd.Timestamp(self.ds[var].attrs["processed_until"]) for var in derived)
+
+    def restrict_time(self, processed_until, halo="22min", calibrations: bool = False):
+        """Restrict the processing to the records after `processed_until`.
+
+        The records within `halo` before the new ones are recomputed as well, since
+        sliding windows and buffers reach from the new records into the old ones; another
+        `halo` before is loaded as context but not written. If `calibrations` is set, the
+        recomputed range starts at the latest calibration phase before `processed_until`
+        at the latest, since the drift correction interpolates between calibrations.
+        Only the recomputed range is written by :meth:`to_netcdf`.
+        """
+        import numpy as np
+        import pandas as pd
+
+        from oceanpack.utils.calibration import SPAN1_STATE, ZERO_STATE
+        from oceanpack.utils.helpers import status_segments
+
+        times = self.ds.indexes["time"]
+        write_from = pd.Timestamp(processed_until) - pd.to_timedelta(halo)
+        if calibrations and "STATUS" in self.ds.variables:
+            starts, _, states = status_segments(self.ds["STATUS"].values)
+            cal_starts = times[starts[np.isin(states, [ZERO_STATE, SPAN1_STATE])]]
+            cal_starts = cal_starts[cal_starts <= processed_until]
+            if len(cal_starts):
+                write_from = min(write_from, cal_starts[-1])
+        self._write_from = write_from
+        self._record_start = times[0]
+        self.ds = self.ds.sel(time=slice(write_from - pd.to_timedelta(halo), None))
+        log.info(
+            f"Process records from {write_from} on ({self.ds.sizes['time']} records incl. context)"
+        )
+
+    def halo(self):
+        """Return the time range by which records influence each other in the processing.
+
+        This covers the 2-minute rolling mean of ``DPressInt``, the 20-minute buffer after
+        non-operating phases, the windows of the quality control and, if the intake
+        temperature is lag-corrected, half the window and the step of the lag estimation
+        (the lags are interpolated between the window centres) plus the maximum lag.
+        """
+        import pandas as pd
+
+        from oceanpack.utils.qc import QC_CONFIG
+
+        halo = [pd.to_timedelta("2min") + pd.to_timedelta("20min")]
+        halo.append(pd.to_timedelta(QC_CONFIG["spike_window"]) / 2)
+        halo += [
+            pd.to_timedelta(opts["stuck"])
+            for opts in QC_CONFIG["variables"].values()
+            if "stuck" in opts
+        ]
+        if "SST" in self.ds.variables:
+            halo.append(
+                pd.to_timedelta("6h") / 2 + pd.to_timedelta("1h") + pd.to_timedelta("10min")
+            )
+        return max(halo)
+
+    @profiled(rows=_n_records)
     def to_netcdf(self, output_file):
-        """Write the processed dataset to a netCDF file at `output_file`."""
-        try:
-            self.ds.load()
-        finally:
-            self.ds.close()
-        self.ds.to_netcdf(output_file)
+        """Write the processed dataset to a netCDF file at `output_file`.
+
+        If `output_file` is the loaded file, only the derived variables are written into
+        it, so the raw data are neither read nor rewritten. After :meth:`restrict_time`,
+        only the recomputed records are written. The written variables are marked with
+        the attributes ``processed_until`` and ``config_hash``. If they do not fit into
+        the memory budget, they are computed into a temporary file first and copied
+        block by block.
+        Otherwise, the dataset is written to a temporary file that replaces `output_file`
+        once it is complete.
+        """
+        from pathlib import Path
+        from tempfile import TemporaryDirectory
+
+        import xarray as xr
+
+        from oceanpack.utils import memory
+        from oceanpack.utils.netcdf import atomic_to_netcdf, update_variables
+
+        if self.source is None or Path(output_file).resolve() != Path(self.source).resolve():
+            if self._write_from is not None:
+                raise ValueError(
+                    "A time-restricted dataset can only be written back to its source file."
+                )
+            atomic_to_netcdf(self.ds, output_file)
+            return
+
+        if not self._modified:
+            self._opened.close()
+            log.info("No variables were derived or modified. Nothing to write.")
+            return
+        budget = memory.active(self.max_memory)
+        rows = None
+        with TemporaryDirectory(prefix="oceanpack-") as spool:
+            try:
+                derived = self.ds[sorted(self._modified)]
+                start = 0
+                if self._write_from is not None:
+                    derived = derived.sel(time=slice(self._write_from, None))
+                    start = int(self._opened.indexes["time"].searchsorted(self._write_from))
+                bytes_per_row = memory.dataset_bytes_per_row(derived)
+                if budget is None or budget.fits(bytes_per_row * derived.sizes["time"]):
+                    derived = derived.load()
+                else:
+                    # the file cannot be written while it is read, so the results are spooled
+                    derived.to_netcdf(Path(spool) / "derived.nc")
+                    derived = xr.open_dataset(Path(spool) / "derived.nc")
+                    rows = budget.rows(bytes_per_row)
+            finally:
+                self._opened.close()
+            processed_until = str(derived.indexes["time"][-1])
+            for var in derived.data_vars.values():
+                var.attrs["processed_until"] = processed_until
+                if self.config_hash is not None:
+                    var.attrs["config_hash"] = self.config_hash
+            update_variables(derived, output_file, start=start, rows=rows)
+            derived.close()
+
+    @profiled(rows=_n_records)
+    def to_parquet(self, output_dir, cruise: str | None = None):
+        """Write the processed dataset to Parquet files partitioned by day below `output_dir`.
+
+        The dataset is written block by block (see :func:`~oceanpack.utils.parquet.write_parquet`),
+        so a dataset that is processed in dask chunks is not loaded as a whole.
+        """
+        from oceanpack.utils.parquet import write_parquet
+
+        if self._write_from is not None:
+            raise ValueError(
+                "A time-restricted dataset can only be written back to its source file."
+            )
+        write_parquet(self.ds, output_dir, cruise=cruise)
+
+    def _set(self, name, value):
+        """Assign `value` to the variable `name` and mark it for writing by :meth:`to_netcdf`."""
+        self.ds[name] = value
+        self._modified.add(name)
+
+    def _corrected(self, var):
+        """Return the name of the corrected values of `var` (``<var>_corrected``) if they exist, else `var`."""
+        return f"{var}_corrected" if f"{var}_corrected" in self.ds.variables else var
 
 
 class DataMerger:
     """A class that merges multiple netCDF files into a single dataset. This is useful
     when data from multiple sources (e.g., GPS coordinates, SST from a different sensor, etc.)
     should be merged into a single dataset for further processing.
+
+    With a memory budget (`max_memory` or :mod:`oceanpack.utils.memory`), files that do
+    not fit into memory are merged in dask chunks and written chunk by chunk.
     """
 
-    def __init__(self):
+    def __init__(self, max_memory=None):
         self.merged = None
+        self.max_memory = max_memory
+
+    @profiled(rows=_n_records)
+    def merge(self, files, tolerance: str = "2min", start=None, end=None):
+        """Merge multiple netCDF files (or in-memory :class:`xarray.Dataset` objects) into a single dataset.
 
-    def merge(self, files, tolerance: str = "2min"):
-        """Merge multiple netCDF files into a single dataset."""
+        If `start` or `end` are given, only the records within this time window are merged.
+        """
         from tqdm.auto import tqdm
         import xarray as xr
 
         all_ds = []
         for i, file in enumerate(tqdm(files)):
-            ds = xr.open_dataset(file)
+            ds = (
+                file
+                if isinstance(file, xr.Dataset)
+                else _chunk_to_budget(xr.open_dataset(file), self.max_memory)
+            )
+            if start is not None or end is not None:
+                ds = ds.sel(time=slice(start, end))
             if i > 0:
                 ds = ds.sel(time=all_ds[0].time, method="nearest", tolerance=tolerance)
                 # Remove duplicate variables
@@ -189,6 +677,7 @@ class DataMerger:
         log.info("Merge data sets")
         self.merged = xr.merge(all_ds, join="inner", combine_attrs="drop_conflicts")
 
+    @profiled(rows=_n_records)
     def select_variables(self):
         """Select the variables to be kept."""
         vars2keep = [
@@ -198,8 +687,17 @@ class DataMerger:
             "SBE45Cond",
             "SBE45Sal",
             "AIN0_mA_Waterflow",
+            "AIN3_mA_Waterflow",
+            "FLOWgas",
             "CellTemp",
             "CellPress",
+            "CO2raw",
+            "CO2ref",
+            "H2Oraw",
+            "H2Oref",
+            "CO2kzero",
+            "CO2kspan1",
+            "CO2kspan2",
             "DPressInt",
             "Latitude",
             "Longitude",
@@ -213,6 +711,160 @@ class DataMerger:
         log.info("Drop variables")
         self.merged = self.merged.drop_vars(vars2drop, errors="ignore")
 
+    @profiled(rows=_n_records)
     def to_netcdf(self, output_file):
         """Generate output file in netCDF format at `output_file`."""
-        self.merged.to_netcdf(output_file)
+        from oceanpack.utils.netcdf import atomic_to_netcdf
+
+        atomic_to_netcdf(self.merged, output_file)
+
+    @profiled(rows=_n_records)
+    def to_parquet(self, output_dir, cruise: str | None = None):
+        """Generate Parquet files partitioned by day below `output_dir` (see :func:`~oceanpack.utils.parquet.write_parquet`)."""
+        from oceanpack.utils.parquet import write_parquet
+
+        write_parquet(self.merged, output_dir, cruise=cruise)
+
+
+class DataResampler:
+    """A class that averages a processed dataset onto regular time windows.
+
+    The input file is read in blocks of `block` length, so memory usage does not depend
+    on the length of the record (apart from the time axis itself). Samples during
+    non-operating phases (including the `buffer` after each phase) are excluded from
+    all statistics. The reduced blocks are appended one after another to the output file.
+
+    Quality flags (``<variable>_flag``) are not averaged but reduced to the worst flag of
+    each window (``<variable>_max``). Other variables with flag attributes, system
+    states, error codes and valve or pump states are reduced to their most common value
+    (``<variable>_mode``).
+    """
+
+    def __init__(
+        self,
+        freq: str = "1min",
+        stats=("mean", "median", "std", "count"),
+        block: str = "1D",
+        buffer: str = "20min",
+        status_var: str = "STATUS",
+    ):
+        import pandas as pd
+
+        self.freq = pd.to_timedelta(freq)
+        self.block = pd.to_timedelta(block)
+        if self.block % self.freq:
+            raise ValueError(
+                f"The block length ({block}) must be a multiple of the window ({freq})."
+            )
+        self.stats = list(stats)
+        self.buffer = pd.to_timedelta(buffer)
+        self.status_var = status_var
+
+    @profiled()
+    def resample(self, input_file, output_file, variables=None):
+        """Resample the dataset in `input_file` block by block and write it to `output_file`."""
+        import numpy as np
+        import pandas as pd
+        from tqdm.auto import tqdm
+        import xarray as xr
+
+        from oceanpack.utils.netcdf import append_along_time
+
+        with xr.open_dataset(input_file) as ds:
+            if variables is None:
+                variables = [
+                    var
+                    for var in ds.data_vars
+                    if var != self.status_var
+                    and ds[var].dims == ("time",)
+                    and np.issubdtype(ds[var].dtype, np.number)
+                ]
+            times = ds.indexes["time"]
+            if not len(times):
+                log.warning("Empty dataset. Nothing to resample.")
+                return
+            block_starts = pd.date_range(times[0].floor(self.block), times[-1], freq=self.block)
+            for block_start in tqdm(block_starts, unit="block"):
+                reduced = self._resample_block(ds, times, block_start, variables)
+                if reduced is not None:
+                    append_along_time(reduced, output_file)
+
+    def _resample_block(self, ds, times, block_start, variables):
+        """Compute the window statistics of all records within one block."""
+        import numpy as np
+        import xarray as xr
+
+        from oceanpack.utils.gridding import BinnedStatistics
+        from oceanpack.utils.helpers import nonoperating_mask
+
+        start, stop = times.searchsorted([block_start, block_start + self.block])
+        if start == stop:
+            return None
+        halo = times.searchsorted(block_start - self.buffer)
+        block = ds[[*variables, self.status_var]].isel(time=slice(halo, stop)).load()
+        excluded = nonoperating_mask(
+            block["time"].values, block[self.status_var].values, buffer=self.buffer
+        )[start - halo :]
+        block = block.isel(time=slice(start - halo, None))
+
+        offsets = block["time"].values - block_start.to_datetime64()
+        window = (offsets // self.freq.to_timedelta64()).astype(np.int64)
+        nbins = int(self.block // self.freq)
+        occupied = np.unique(window)
+
+        reduced = xr.Dataset(coords={"time": block_start + occupied * self.freq})
+        for var in variables:
+            values = np.where(excluded, np.nan, block[var].values.astype(float))
+            if _is_categorical(block[var]):
+                # the worst quality flag, or the most common state
+                stat, method = ("max", "maximum") if var.endswith("_flag") else ("mode", "mode")
+                attrs = dict(block[var].attrs)
+                attrs["cell_methods"] = f"time: {method} (interval: {self.freq})"
+                result = _window_reduce(window, values, occupied, stat)
+                reduced[f"{var}_{stat}"] = ("time", result, attrs)
+                continue
+            acc = BinnedStatistics(nbins, self.stats)
+            acc.update(window, values)
+            for stat, result in acc.result().items():
+                attrs = {} if stat == "count" else dict(block[var].attrs)
+                attrs["cell_methods"] = f"time: {stat} (interval: {self.freq})"
+                reduced[f"{var}_{stat}"] = ("time", result[occupied], attrs)
+        return reduced
+
+
+def _is_categorical(var) -> bool:
+    """Return whether the variable `var` holds flags, states or switch states, whose mean has no meaning."""
+    from oceanpack.utils.compact import STATUS_VARIABLES, VALVE_BITS
+
+    if any(key in var.attrs for key in ("flag_values", "flag_meanings", "flag_masks")):
+        return True
+    return var.name in {*STATUS_VARIABLES, *VALVE_BITS, *STATE_VARIABLES, "VALVES", "valves"}
+
+
+def _window_reduce(window, values, occupied, stat: str):
+    """Return the maximum (`stat` "max") or most common value ("mode") of the valid `values` of each `occupied` window.
+
+    Ties of the most common value are resolved to the smallest value. Windows without
+    valid values get NaN.
+
+    Example
+    -------
+    >>> import numpy as np
+    >>> window = np.array([0, 0, 0, 1, 1, 2])
+    >>> values = np.array([2.0, 4.0, 4.0, 3.0, np.nan, np.nan])
+    >>> _window_reduce(window, values, np.array([0, 1, 2]), "mode")
+    array([ 4.,  3., nan])
+    """
+    import numpy as np
+
+    valid = ~np.isnan(values)
+    result = np.full(len(occupied), np.nan)
+    if not valid.any():
+        return result
+    pairs, counts = np.unique(np.stack([window[valid], values[valid]]), axis=1, return_counts=True)
+    windows, candidates = pairs
+    # per window, the pairs are sorted by value; put the chosen one first
+    order = np.lexsort((-candidates, windows)) if stat == "max" else np.lexsort((-counts, windows))
+    first = np.r_[True, np.diff(windows[order]) != 0]
+    result[np.searchsorted(occupied, windows[order][first])] = candidates[order][first]
+    return result
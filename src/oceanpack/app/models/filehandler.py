@@ -8,9 +8,12 @@
 
 from abc import ABC, abstractmethod
 import logging
+import os
 
 import pandas as pd
 
+from oceanpack.utils.profiling import stage
+
 log = logging.getLogger(__name__)
 
 
@@ -27,7 +30,7 @@ class FileHandlerInterface(ABC):
     def parse_header(cls, file_path):
         """Parse the header of the log file to extract metadata information such as variable names, units, and sensors."""
         header_dict = {"nrows": 0}
-        with open(file_path, encoding="Windows 1252") as f:
+        with stage("parse_header") as record, open(file_path, encoding="Windows 1252") as f:
             while True:
                 line = f.readline()
                 header_dict["nrows"] += 1
@@ -52,8 +55,31 @@ class FileHandlerInterface(ABC):
                 if header_dict["nrows"] > 15:
                     log.warning(f"Could not find header in file {file_path}. Skip file.")
                     return None
+            record["rows"] = header_dict["nrows"]
         return header_dict
 
+    @staticmethod
+    def estimate_memory(file_path, sample: int = 65536) -> int:
+        """Estimate the bytes that the records of the log file take in memory once read.
+
+        The number of records is extrapolated from the size of the file and the mean length
+        of the data lines (``@DATA`` or ``$PSDS0``) within its first `sample` bytes. Their
+        size in memory is estimated from the fields of these lines, see
+        :func:`~oceanpack.utils.memory.text_bytes_per_row`.
+        """
+        from oceanpack.utils.memory import text_bytes_per_row
+
+        with open(file_path, "rb") as f:
+            head = f.read(sample)
+        lines = head.decode("Windows 1252").splitlines(keepends=True)
+        if len(head) == sample:
+            lines = lines[:-1]
+        records = [line for line in lines if line.startswith(("@DATA", "$PSDS0"))]
+        if not records:
+            return 0
+        line_length = sum(len(line) for line in records) / len(records)
+        return int(os.path.getsize(file_path) / line_length * text_bytes_per_row(records))
+
 
 class InternalFileHandler(FileHandlerInterface):
     """File handler for log files created by OceanPack Analyzer or NetDI unit.
@@ -89,14 +115,16 @@ class InternalFileHandler(FileHandlerInterface):
         units = header["units"]
         sensors = header["sensors"]
 
-        data = pd.read_csv(
-            file_path,
-            sep=",",
-            skiprows=header["nrows"],
-            names=names,
-            encoding="iso-8859-1",
-            usecols=range(len(names)),
-        )
+        with stage("read_csv") as record:
+            data = pd.read_csv(
+                file_path,
+                sep=",",
+                skiprows=header["nrows"],
+                names=names,
+                encoding="iso-8859-1",
+                usecols=range(len(names)),
+            )
+            record["rows"] = len(data)
         data = data.where(data["@NAME"] == "@DATA")
         data.index = pd.to_datetime(data["DATE"] + " " + data["TIME"])
         data.index.name = "time"
@@ -125,6 +153,9 @@ class StreamFileHandler(FileHandlerInterface):
     read_file(file_path)
         Read a log file that was generated by the OceanView software.
 
+    read_records(lines, quarantine=None)
+        Read records that were received as lines, e.g. from a network stream.
+
     read_oceanview_variables
         Read the OceanView variables from a CSV file.
     """
@@ -134,6 +165,10 @@ class StreamFileHandler(FileHandlerInterface):
         """Read a log file that was generated by the OceanView software.
         These files usually do not have a header and each line starts with '$PSDS0'.
 
+        The records are parsed with :func:`~oceanpack.utils.nmea.parse_records`. Damaged
+        records (e.g. with a wrong checksum) are skipped and written to a quarantine file
+        next to the log file (suffix ``.quarantine``).
+
         Parameters
         ----------
         file_path : str
@@ -144,15 +179,54 @@ class StreamFileHandler(FileHandlerInterface):
         tuple[pd.DataFrame, pd.DataFrame]
             The log file data and metadata as pandas DataFrames.
         """
+        from pathlib import Path
+
+        with open(file_path, "rb") as f:
+            data = f.read()
+        quarantine = Path(f"{file_path}.quarantine")
+        quarantine.unlink(missing_ok=True)
+        return StreamFileHandler._parse(data, file_path, quarantine)
+
+    @staticmethod
+    def read_records(lines, quarantine=None) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Read ``$PSDS0`` records that were received as lines, e.g. from a network stream.
+
+        Parameters
+        ----------
+        lines : list[bytes]
+            The records, each ending with a line break.
+        quarantine : str, optional
+            A file to which damaged records are appended.
+
+        Returns
+        -------
+        tuple[pd.DataFrame, pd.DataFrame]
+            The records and metadata as pandas DataFrames, as from :meth:`read_file`.
+        """
+        return StreamFileHandler._parse(b"".join(lines), "the received records", quarantine)
+
+    @staticmethod
+    def _parse(data: bytes, source, quarantine=None) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Parse the ``$PSDS0`` records in `data` and append the damaged ones to `quarantine`."""
+        from oceanpack.utils.nmea import parse_records
+
         metadata = StreamFileHandler.read_oceanview_variables()
-        data = pd.read_csv(
-            file_path,
-            names=metadata["name"],
-            encoding="iso-8859-1",
-            parse_dates={"datetime": ["date", "time"]},
-        )
-        data.set_index("datetime", inplace=True)
-        return data, metadata
+        with stage("parse_records") as record:
+            result = parse_records(data, metadata["name"])
+            record["rows"] = len(result.data)
+        if result.rejected:
+            rejected = sum(result.counts.values())
+            counts = ", ".join(f"{n} {reason}" for reason, n in result.counts.items())
+            message = f"⚠️  Skipped {rejected} of {rejected + len(result.data)} records of {source} ({counts})"
+            if quarantine is not None:
+                try:
+                    with open(quarantine, "ab") as f:
+                        f.writelines(line for lines in result.rejected.values() for line in lines)
+                    message += f", see {quarantine}"
+                except OSError as error:
+                    message += f"; cannot write them to {quarantine}: {error}"
+            log.warning(message)
+        return result.data, metadata
 
     @staticmethod
     def read_oceanview_variables():
@@ -165,6 +239,6 @@ class StreamFileHandler(FileHandlerInterface):
         """
         from pathlib import Path
 
-        this_dir = Path(__file__).resolve().parents[0]
-        file_path = this_dir / "oceanview_variables.csv"
+        package_dir = Path(__file__).resolve().parents[2]
+        file_path = package_dir / "oceanview_variables.csv"
         return pd.read_csv(file_path, index_col="ID")
@@ -13,8 +13,13 @@ from pathlib import Path
 import pandas as pd
 from tqdm.auto import tqdm
 
+from oceanpack.utils.profiling import stage
+
 log = logging.getLogger(__name__)
 
+#: Values of the columns of switch states (e.g. of the valves and the pump)
+SWITCH_STATES = {"ON": 1, "OFF": 0}
+
 
 class FileSourceType(Enum):
     """Enumeration class of supported data source types, each mapping to a dedicated file handler."""
@@ -95,12 +100,23 @@ class FileSourceModel:
     The source type can be set explicitly or inferred automatically from the file header.
     """
 
-    def __init__(self, source_type: FileSourceType = None) -> None:
-        """Initialize the model, optionally setting the source type and resolving the file handler."""
+    def __init__(
+        self, source_type: FileSourceType = None, max_memory=None, compact: bool = False
+    ) -> None:
+        """Initialize the model, optionally setting the source type and resolving the file handler.
+
+        If `max_memory` is given (bytes or e.g. ``"2GB"``), or a memory budget is active
+        (see :mod:`oceanpack.utils.memory`), files that do not fit into memory at once
+        are read in batches. With `compact`, :meth:`process_data` returns the dataset in
+        the compact layout of :func:`~oceanpack.utils.compact.compact`.
+        """
         self._filehandler = None
         self._source_type = None
         self.source_type = source_type
+        self.max_memory = max_memory
+        self.compact = compact
         self._metadata = None
+        self._spool = None
         self.df = None
         self.ds = None
         self.history = ""
@@ -127,8 +143,16 @@ class FileSourceModel:
             self._filehandler = self._source_type.get_filehandler()
 
     def load_data(self, path: str):
-        """Collect all log files at the given path and read them into a single DataFrame."""
-        all_files = collect_files(path)
+        """Collect all log files at the given path and read them into a single DataFrame.
+
+        If the records of all files do not fit into the memory budget, the files are read,
+        cleaned and converted in batches, which are spooled to temporary netCDF files. The
+        batches are then opened together as a dask-backed :class:`xarray.Dataset` (and
+        :attr:`df` remains None). The files are read in the order of their names.
+        """
+        from oceanpack.utils import memory
+
+        all_files = sorted(collect_files(path))
 
         if self._source_type is None:
             self._source_type = FileSourceType.from_header(all_files[0])
@@ -136,37 +160,128 @@ class FileSourceModel:
         if self._source_type:
             self._filehandler = self._source_type.get_filehandler()
 
+        budget = memory.active(self.max_memory)
+        batches = [all_files]
+        if budget is not None:
+            sizes = [self._filehandler.estimate_memory(file) for file in all_files]
+            batches = budget.batches(all_files, sizes, copies=memory.CONVERSION_COPIES)
+
+        if len(batches) == 1:
+            self.df = self._read_files(all_files)
+        else:
+            self._spool_batches(batches, budget)
+        self.history += f"{len(all_files)} files loaded; "
+
+    def load_records(self, lines, quarantine=None):
+        """Read records that were received as lines (e.g. from a network stream) into a DataFrame.
+
+        Only supported for the ``Stream`` source type, whose records are self-contained
+        lines. Damaged records are appended to the file `quarantine`, if given.
+        """
+        if self._source_type != FileSourceType.STREAM:
+            raise ValueError("Only records of the 'Stream' source type can be read from lines.")
+        self.df, self._metadata = self._filehandler.read_records(lines, quarantine=quarantine)
+        self.history += f"{len(self.df)} records loaded; "
+
+    def _read_files(self, files) -> pd.DataFrame:
+        """Read the log `files` into a single DataFrame."""
         df_list = []
-        for file in tqdm(all_files, unit="file"):
+        for file in tqdm(files, unit="file"):
             data_, metadata_ = self._filehandler.read_file(file)
             if self._metadata is None:
                 self._metadata = metadata_
             df_list.append(data_)
 
-        self.df = pd.concat(df_list)
-        self.history += f"{len(all_files)} files loaded; "
+        with stage("concat") as record:
+            df = pd.concat(df_list)
+            record["rows"] = len(df)
+        return df
+
+    def _spool_batches(self, batches, budget):
+        """Read, clean and convert the `batches` of files one after another and open the results as one dataset."""
+        from tempfile import TemporaryDirectory
+
+        import xarray as xr
+
+        from oceanpack.utils.memory import dataset_bytes_per_row
+
+        log.info(f"Read the files in {len(batches)} batches to stay within the memory budget.")
+        self._spool = TemporaryDirectory(prefix="oceanpack-")
+        paths = []
+        seen = pd.DatetimeIndex([])
+        for i, batch in enumerate(batches):
+            df = self._drop_duplicates(self._read_files(batch))
+            # records that an earlier batch contains already (e.g. overlaps between files)
+            df = df[~df.index.isin(seen)]
+            seen = seen.append(df.index)
+            df = self._to_numeric(df)
+            paths.append(Path(self._spool.name) / f"batch_{i:05d}.nc")
+            with stage("spool", rows=len(df)):
+                df.to_xarray().to_netcdf(paths[-1])
+        # the encodings of the batches may differ (e.g. integer vs. float columns)
+        ds = xr.open_mfdataset(
+            paths, combine="nested", concat_dim="time", chunks={}
+        ).drop_encoding()
+        self.ds = ds.chunk({"time": budget.rows(dataset_bytes_per_row(ds))})
 
     def clean_data(self):
         """Drops rows with a missing index value and removes duplicate timestamps, keeping the first occurrence."""
-        df = self.df
-        df = df.loc[df.index.dropna()]
-        self.df = df[~df.index.duplicated(keep="first")]
+        if self.df is not None:  # else, load_data cleaned the spooled batches already
+            with stage("clean_data", rows=len(self.df)):
+                self.df = self._drop_duplicates(self.df)
         self.history += "Removed duplicates; "
 
     def process_data(self):
         """Casts all columns to numeric, drops any that cannot be converted, sorts by index, and builds the xarray Dataset."""
-        df = self.df
-        for col in df.columns:
-            try:
-                df[col] = pd.to_numeric(df[col])
-            except Exception:
-                log.warning(f"Cannot convert {col} to numeric values. Variable will be dropped.")
-                df.drop(col, axis=1, inplace=True)
-        df.sort_index(axis=0, inplace=True, ascending=True)
-        self.history += "Converted data to numeric values; "
-        self.df = df
-        self._pandas_to_xarray()
-        self._add_metadata_to_xarray()
+        if self.df is None:
+            # batches spooled by load_data, which are converted already
+            if not self.ds.indexes["time"].is_monotonic_increasing:
+                self.ds = self.ds.sortby("time")
+            self.ds.attrs["source_type"] = self.source_type.value
+            self.history += (
+                "Converted data to numeric values; Converted pd.DataFrame to xr.Dataset; "
+            )
+            self._add_metadata_to_xarray()
+        else:
+            self.df = self._to_numeric(self.df)
+            self.history += "Converted data to numeric values; "
+            with stage("to_xarray", rows=len(self.df)):
+                self._pandas_to_xarray()
+                self._add_metadata_to_xarray()
+        if self.compact:
+            from oceanpack.utils.compact import compact
+
+            with stage("compact", rows=self.ds.sizes.get("time")):
+                self.ds = compact(self.ds)
+            self.history += "Converted to the compact layout; "
+
+    @staticmethod
+    def _drop_duplicates(df: pd.DataFrame) -> pd.DataFrame:
+        """Drop rows with a missing index value and duplicate timestamps, keeping the first occurrence."""
+        df = df.loc[df.index.dropna()]
+        return df[~df.index.duplicated(keep="first")]
+
+    @staticmethod
+    def _to_numeric(df: pd.DataFrame) -> pd.DataFrame:
+        """Cast all columns to numeric, drop any that cannot be converted, and sort by index.
+
+        Columns of switch states (``ON``/``OFF``, e.g. of the valves) are converted to 1/0.
+        """
+        with stage("to_numeric", rows=len(df)):
+            for col in df.columns:
+                try:
+                    df[col] = pd.to_numeric(df[col])
+                except Exception:
+                    states = df[col].str.strip().str.upper().map(SWITCH_STATES)
+                    if states.notna().sum() == df[col].notna().sum():
+                        df[col] = states
+                        continue
+                    log.warning(
+                        f"Cannot convert {col} to numeric values. Variable will be dropped."
+                    )
+                    df.drop(col, axis=1, inplace=True)
+            df.sort_index(axis=0, inplace=True, ascending=True)
+        return df
 
     def _pandas_to_xarray(self):
         """Converts the internal DataFrame to an xarray Dataset and stores it in ``self.ds``."""
@@ -186,7 +301,18 @@ class FileSourceModel:
 
     def to_netcdf(self, output_file):
         """Writes the xarray Dataset to a NetCDF file at the specified path."""
-        self.ds.to_netcdf(output_file)
+        with stage("to_netcdf", rows=self.ds.sizes.get("time")):
+            self.ds.to_netcdf(output_file)
+
+    def to_parquet(self, output_dir, cruise: str | None = None):
+        """Writes the xarray Dataset to Parquet files partitioned by day below `output_dir`.
+
+        See :func:`~oceanpack.utils.parquet.write_parquet`.
+        """
+        from oceanpack.utils.parquet import write_parquet
+
+        with stage("to_parquet", rows=self.ds.sizes.get("time")):
+            write_parquet(self.ds, output_dir, cruise=cruise)
 
 
 def collect_files(path: str, suffix="log") -> list[Path]:
@@ -0,0 +1,69 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+"""Conversion of ``$PSDS0`` records received over the network into one cruise store per stream."""
+
+import logging
+from pathlib import Path
+import re
+
+from .filesource import FileSourceModel
+from .store import CruiseStore
+
+log = logging.getLogger(__name__)
+
+
+class StreamWriter:
+    """Convert batches of ``$PSDS0`` records and append them to one store per stream.
+
+    The records of each stream (e.g. an instrument sending over TCP, or a sender on a
+    UDP port) are appended to the :class:`~oceanpack.app.models.store.CruiseStore`
+    ``<output_dir>/<stream>.nc``, so records that a stream repeats, e.g. after a
+    reconnect, are not stored twice. Damaged records are appended to
+    ``<output_dir>/<stream>.quarantine``.
+
+    The stores keep a SQLite connection, so all methods must be called from the same thread.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.stores = {}
+
+    def write(self, stream: str, lines) -> int:
+        """Convert the record `lines` (bytes) of `stream` and append them to its store.
+
+        Batches that cannot be converted are logged and dropped. Returns the number of
+        appended records.
+        """
+        try:
+            model = FileSourceModel("Stream")
+            model.load_records(
+                lines, quarantine=self.output_dir / f"{stream_name(stream)}.quarantine"
+            )
+            model.clean_data()
+            model.process_data()
+        except Exception as error:
+            log.error(f"Cannot convert {len(lines)} records of {stream}: {error!r}")
+            return 0
+        if stream not in self.stores:
+            self.stores[stream] = CruiseStore(self.output_dir / f"{stream_name(stream)}.nc")
+        return self.stores[stream].append(model.ds)
+
+    def close(self):
+        """Close the stores."""
+        for store in self.stores.values():
+            store.close()
+        self.stores = {}
+
+
+def stream_name(stream: str) -> str:
+    """Return `stream` with all characters that may not be safe in file names replaced.
+
+    >>> stream_name("192.168.0.10:4001")
+    '192.168.0.10_4001'
+    """
+    return re.sub(r"[^\w.-]", "_", stream)
@@ -0,0 +1,109 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+"""The cruise store: a netCDF file to which the records of new log files are appended."""
+
+from datetime import datetime, timezone
+import logging
+from pathlib import Path
+import sqlite3
+
+log = logging.getLogger(__name__)
+
+
+class CruiseStore:
+    """A netCDF file that grows along time with the records of the log files of a cruise.
+
+    Only records after the last record of the store are appended, so records repeated
+    at the beginning of the next log file, or a file that is converted again after it
+    grew, do not lead to duplicates. The converted files are recorded with their size
+    and modification time in a SQLite database next to the store (suffix
+    ``.files.sqlite``), so unchanged files are skipped after a restart.
+
+    The data variables of the store are fixed by the first records: integer variables
+    are stored as floats, so that later records with missing values can be appended,
+    and variables that only appear later are dropped.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.last_time = None
+        self.variables = None
+        if self.path.exists():
+            import xarray as xr
+
+            with xr.open_dataset(self.path) as ds:
+                self.variables = set(ds.data_vars)
+                if ds.sizes["time"]:
+                    self.last_time = ds.indexes["time"][-1]
+        self._database = None
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """The connection to the database of converted files, which is created on first use."""
+        if self._database is None:
+            self._database = sqlite3.connect(self.path.with_suffix(".files.sqlite"))
+            self._database.execute(
+                "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, converted TEXT)"
+            )
+            self._database.commit()
+        return self._database
+
+    def is_converted(self, file) -> bool:
+        """Return whether `file` was converted with its current size and modification time."""
+        stat = Path(file).stat()
+        row = self._connection.execute(
+            "SELECT size, mtime_ns FROM files WHERE path = ?", (str(Path(file).resolve()),)
+        ).fetchone()
+        return row == (stat.st_size, stat.st_mtime_ns)
+
+    def append(self, ds) -> int:
+        """Append the records of `ds` after the last record of the store and return their number."""
+        from oceanpack.utils.netcdf import append_along_time
+
+        if self.last_time is not None:
+            ds = ds.isel(time=ds.indexes["time"] > self.last_time)
+        if self.variables is None:
+            ds = ds.copy()
+            for name in list(ds.data_vars):
+                if ds[name].dtype.kind in "iub":
+                    ds[name] = ds[name].astype("float64")
+        else:
+            unknown = [var for var in ds.data_vars if var not in self.variables]
+            if unknown:
+                log.warning(f"⚠️  Variables {unknown} are not in {self.path} and are dropped.")
+                ds = ds.drop_vars(unknown)
+        if not ds.sizes["time"]:
+            return 0
+        append_along_time(ds, self.path)
+        self.last_time = ds.indexes["time"][-1]
+        if self.variables is None:
+            self.variables = set(ds.data_vars)
+        return ds.sizes["time"]
+
+    def mark_converted(self, file, stat=None):
+        """Record that `file` was converted with the size and modification time of `stat`.
+
+        `stat` should be taken before the file is read, since it may grow meanwhile. By
+        default, the current state of the file is recorded.
+        """
+        stat = stat or Path(file).stat()
+        self._connection.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+            (
+                str(Path(file).resolve()),
+                stat.st_size,
+                stat.st_mtime_ns,
+                datetime.now(timezone.utc).isoformat(timespec="seconds"),  # noqa: UP017 (Python 3.10)
+            ),
+        )
+        self._connection.commit()
+
+    def close(self):
+        """Close the database connection."""
+        if self._database is not None:
+            self._database.close()
+            self._database = None
@@ -0,0 +1,254 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+"""Calibration of the CO2 analyzer: drift correction based on the zero and span calibration
+phases, and recomputation of CO2 from the raw LI-840 detector counts.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from oceanpack.utils.helpers import status_segments
+
+log = logging.getLogger(__name__)
+
+SPAN1_STATE = 1
+ZERO_STATE = 2
+
+
+def calibration_means(time, values, status, state, settle="1min"):
+    """Return the time and mean reading of each calibration phase with the given `state`.
+
+    The phases are found by run-length encoding of `status`. The first `settle` of each
+    phase is skipped, so the reading has time to adjust to the reference gas. All phases
+    are reduced at once with :func:`numpy.bincount`.
+
+    Returns
+    -------
+    times : numpy.ndarray
+        Centre time of each calibration phase (datetime64[ns]).
+    means : numpy.ndarray
+        Mean reading of each phase. Phases without valid readings are dropped.
+
+    Example
+    -------
+    >>> time = pd.date_range("2020-01-01", periods=8, freq="1min")
+    >>> status = [5, 2, 2, 2, 5, 5, 2, 2]
+    >>> values = [400.0, 9.0, 1.0, 2.0, 400.0, 400.0, 9.0, 3.0]
+    >>> calibration_means(time, values, status, state=2, settle="1min")[1]
+    array([1.5, 3. ])
+    """
+    time = np.asarray(time, dtype="datetime64[ns]")
+    values = np.asarray(values, dtype=float)
+    starts, stops, states = status_segments(np.asarray(status))
+    segment = np.repeat(np.arange(len(starts)), stops - starts)
+
+    settled = time >= time[starts][segment] + pd.to_timedelta(settle).to_timedelta64()
+    use = (states[segment] == state) & settled & np.isfinite(values)
+    counts = np.bincount(segment[use], minlength=len(starts))
+    sums = np.bincount(segment[use], weights=values[use], minlength=len(starts))
+
+    keep = counts > 0
+    centers = time[starts] + (time[stops - 1] - time[starts]) / 2
+    return centers[keep], sums[keep] / counts[keep]
+
+
+def drift_correction(
+    time,
+    co2,
+    status,
+    span_concentration: float | None = None,
+    settle: str = "1min",
+    zero_state: int = ZERO_STATE,
+    span_state: int = SPAN1_STATE,
+):
+    """Correct `co2` for the zero (and span) drift observed in the calibration phases.
+
+    The zero offset is the mean reading during each zero calibration. It is linearly
+    interpolated in time between the calibrations (and held constant before the first
+    and after the last one) and subtracted from `co2`. If the concentration of the span
+    gas is given, the gain ``span_concentration / (span reading - zero offset)`` of each
+    span calibration is interpolated the same way and applied.
+
+    Parameters
+    ----------
+    time : array-like
+        Time stamps, sorted in ascending order.
+    co2 : array-like
+        Uncorrected CO2 readings, including the calibration phases.
+    status : array-like
+        Status of the system (see ``system_states.csv``).
+    span_concentration : float, optional
+        CO2 concentration of the span gas in the units of `co2`. If None, only the
+        zero offset is corrected.
+    settle : str
+        Time to skip at the beginning of each calibration phase.
+    zero_state, span_state : int
+        Status values of the zero and the span calibration.
+
+    Returns
+    -------
+    corrected, offset, gain : numpy.ndarray
+        Corrected CO2, and the zero offset and gain applied to each sample.
+    """
+    time = np.asarray(time, dtype="datetime64[ns]")
+    co2 = np.asarray(co2, dtype=float)
+    t = time.astype(np.int64)
+
+    t_zero, zero = calibration_means(time, co2, status, zero_state, settle=settle)
+    log.info(f"Found {len(zero)} zero calibrations")
+    if len(zero):
+        offset = np.interp(t, t_zero.astype(np.int64), zero)
+    else:
+        log.warning("⚠️  No zero calibration found. Offset correction skipped.")
+        offset = np.zeros_like(co2)
+
+    gain = np.ones_like(co2)
+    if span_concentration is not None:
+        t_span, span = calibration_means(time, co2, status, span_state, settle=settle)
+        log.info(f"Found {len(span)} span calibrations")
+        if len(span):
+            t_span = t_span.astype(np.int64)
+            span_offset = np.interp(t_span, t_zero.astype(np.int64), zero) if len(zero) else 0.0
+            gain = np.interp(t, t_span, span_concentration / (span - span_offset))
+        else:
+            log.warning("⚠️  No span calibration found. Gain correction skipped.")
+
+    return (co2 - offset) * gain, offset, gain
+
+
+#: Reference pressure (mbar) of the LI-840 calibration polynomial
+LI840_P0 = 1013.25
+
+COEFFICIENT_COLUMNS = ("kzero", "kspan1", "kspan2")
+
+
+def li840_absorptance(raw, ref, kzero, kspan1, kspan2):
+    """Return the span-corrected CO2 absorptance of the LI-840 from its raw detector counts.
+
+    The zero-corrected absorptance is ``a = 1 - raw / ref * kzero``, which is then
+    corrected with the span coefficients to ``a * (kspan1 + kspan2 * a)``. This is the
+    ``CO2abs`` value logged by the analyzer.
+
+    Example
+    -------
+    >>> # values of a record in the Analyzer log
+    >>> round(float(li840_absorptance(3209379, 3628013, 1.038285, 0.958418, 0.280827)), 5)
+    0.08
+    """
+    absorptance = 1 - np.asarray(raw, dtype=float) / np.asarray(ref, dtype=float) * kzero
+    return absorptance * (kspan1 + kspan2 * absorptance)
+
+
+def li840_co2(absorptance, cell_temp, cell_press, poly, T0=273.15, P0=LI840_P0):
+    """Return the CO2 mole fraction from the (span-corrected) LI-840 absorptance.
+
+    The absorptance is normalized to the reference pressure `P0` and the calibration
+    polynomial ``poly[0] * x + poly[1] * x**2 + ...`` (without constant term) is scaled
+    with the cell temperature relative to `T0`::
+
+        x = absorptance * P0 / cell_press
+        CO2 = (cell_temp + 273.15) / T0 * sum(poly[i] * x ** (i + 1))
+
+    `cell_temp` is in °C, `cell_press` and `P0` in mbar, `T0` in K. The polynomial is
+    evaluated with Horner's scheme. `poly` may contain arrays (one value per record).
+    """
+    x = np.asarray(absorptance, dtype=float) * P0 / np.asarray(cell_press, dtype=float)
+    result = np.zeros_like(x)
+    for coefficient in reversed(poly):
+        result = (result + coefficient) * x
+    return (np.asarray(cell_temp, dtype=float) + 273.15) / T0 * result
+
+
+def coefficient_table(coefficients) -> pd.DataFrame:
+    """Return the coefficient table `coefficients` as DataFrame sorted by its start time.
+
+    `coefficients` is a DataFrame (or the path of a CSV file) with one row per period
+    in which a set of coefficients is valid. The period starts at the time given in the
+    ``start`` column (or index) and lasts until the next start. The columns ``a1``,
+    ``a2``, ... hold the calibration polynomial. Optional columns are ``kzero``,
+    ``kspan1``, ``kspan2`` (overriding the values logged by the analyzer), ``T0`` and
+    ``P0`` (see :func:`li840_co2`).
+    """
+    if not isinstance(coefficients, pd.DataFrame):
+        coefficients = pd.read_csv(coefficients)
+    coefficients = coefficients.copy()
+    if "start" in coefficients.columns:
+        coefficients = coefficients.set_index("start")
+    coefficients.index = pd.DatetimeIndex(pd.to_datetime(coefficients.index), name="start")
+    if not any(col.startswith("a") and col[1:].isdigit() for col in coefficients.columns):
+        raise ValueError("The coefficient table must contain polynomial coefficients a1, a2, ...")
+    return coefficients.sort_index()
+
+
+def recompute_co2(ds, coefficients, block_size: int | None = None):
+    """Recompute the CO2 mole fraction of the LI-840 from the raw counts in `ds`.
+
+    Each record is assigned the coefficients of the period it falls into (see
+    :func:`coefficient_table`); records before the first period yield NaN. Zero and
+    span coefficients missing in the table are taken from the logged ``CO2kzero``,
+    ``CO2kspan1`` and ``CO2kspan2``. The dataset is evaluated block-wise, so
+    dask-backed data is never loaded at once.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Dataset with ``CO2raw``, ``CO2ref``, ``CellTemp`` and ``CellPress``.
+    coefficients : pd.DataFrame or path-like
+        Coefficient table.
+    block_size : int, optional
+        Number of records processed at once. Defaults to the whole dataset.
+
+    Returns
+    -------
+    numpy.ndarray
+        The recomputed CO2.
+    """
+    table = coefficient_table(coefficients)
+    poly_columns = sorted(
+        (col for col in table.columns if col.startswith("a") and col[1:].isdigit()),
+        key=lambda col: int(col[1:]),
+    )
+    variables = ["CO2raw", "CO2ref", "CellTemp", "CellPress"]
+    variables += [f"CO2{col}" for col in COEFFICIENT_COLUMNS if col not in table.columns]
+
+    n = ds.sizes["time"]
+    block_size = n if block_size is None else max(int(block_size), 1)
+    co2 = np.empty(n)
+    for start in range(0, n, block_size):
+        block = ds[variables].isel(time=slice(start, start + block_size)).load()
+        co2[start : start + block.sizes["time"]] = _recompute_block(block, table, poly_columns)
+    return co2
+
+
+def _recompute_block(block, table: pd.DataFrame, poly_columns: list[str]):
+    """Recompute CO2 for the records of the (in-memory) `block`."""
+    period = table.index.searchsorted(block["time"].values, side="right") - 1
+    rows = table.iloc[np.maximum(period, 0)]
+
+    def coefficient(name, default=None):
+        if name in rows.columns:
+            return rows[name].to_numpy(dtype=float)
+        if default is not None:
+            return default
+        return block[f"CO2{name}"].values
+
+    absorptance = li840_absorptance(
+        block["CO2raw"].values,
+        block["CO2ref"].values,
+        *(coefficient(name) for name in COEFFICIENT_COLUMNS),
+    )
+    co2 = li840_co2(
+        absorptance,
+        block["CellTemp"].values,
+        block["CellPress"].values,
+        poly=[rows[col].to_numpy(dtype=float) for col in poly_columns],
+        T0=coefficient("T0", 273.15),
+        P0=coefficient("P0", LI840_P0),
+    )
+    return np.where(period >= 0, co2, np.nan)
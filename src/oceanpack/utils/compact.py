@@ -0,0 +1,243 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+"""A compact layout of converted datasets, which needs about a third of the memory.
+
+:func:`compact` applies all of the following:
+
+* The valve and pump states (``VALVE1`` … ``VALVE9`` and ``PUMP``, each a column of
+  0/1 in the log files) are packed into one ``uint16`` bitfield ``VALVES`` with
+  :func:`pack_valves`, and decoded again with :func:`unpack_valves` or
+  :func:`valve_state`. The bits follow the ``valves`` field of the ``$PSDS0``
+  records: ``VALVE1`` is bit 8, ``VALVE9`` bit 0 and ``PUMP`` bit 9.
+* The system states (``STATUS``) become ``uint8`` flags labelled with the states of
+  ``system_states.csv`` (the CF attributes ``flag_values`` and ``flag_meanings``), see
+  :func:`categorize_status` and :func:`status_labels`.
+* Floating-point variables are stored as ``float32`` if this keeps every value within
+  half of its resolution (the decimals of the log files), and integer variables with
+  the smallest integer type that holds them, see :func:`downcast`.
+* The time is written to netCDF as ``int64`` offsets from the first day.
+
+Example
+-------
+>>> import numpy as np, xarray as xr
+>>> ds = xr.Dataset(
+...     {f"VALVE{i}": ("time", [1, 0]) for i in range(1, 10)} | {"PUMP": ("time", [1, 1])}
+... )
+>>> packed = pack_valves(ds)
+>>> packed["VALVES"].values
+array([1023,  512], dtype=uint16)
+>>> valve_state(packed["VALVES"], "VALVE1").values
+array([ True, False])
+"""
+
+from functools import cache
+import logging
+from pathlib import Path
+import re
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+#: Bits of the valve and pump states in the bitfield ``VALVES``
+VALVE_BITS = {**{f"VALVE{i + 1}": 8 - i for i in range(9)}, "PUMP": 9}
+
+#: Value of ``VALVES`` in records with a missing valve or pump state
+VALVES_MISSING = np.uint16(0xFFFF)
+
+#: Variables with system states (``STATUS`` of the log files, ``sensor_state`` and
+#: ``ANA_state`` of the ``$PSDS0`` records)
+STATUS_VARIABLES = ("STATUS", "sensor_state", "ANA_state")
+
+#: Decimals up to which the resolution of the values is searched
+MAX_DECIMALS = 9
+
+
+def compact(ds):
+    """Return `ds` in the compact layout (see the module description)."""
+    ds = pack_valves(ds)
+    if "valves" in ds.variables:  # the bitfield of the $PSDS0 records
+        ds = ds.assign(
+            valves=_valves(
+                ds["valves"].fillna(VALVES_MISSING).astype(np.uint16), ds["valves"].attrs
+            )
+        )
+    for name in STATUS_VARIABLES:
+        if name in ds.variables:
+            ds = categorize_status(ds, name)
+    ds = downcast(ds)
+    if "time" in ds.indexes and len(ds.indexes["time"]):
+        first = ds.indexes["time"][0].normalize()
+        unit = (
+            "seconds"
+            if (ds.indexes["time"] == ds.indexes["time"].floor("s")).all()
+            else "milliseconds"
+        )
+        ds["time"].encoding.update(units=f"{unit} since {first:%Y-%m-%d}", dtype="int64")
+    return ds
+
+
+def pack_valves(ds, name: str = "VALVES"):
+    """Return `ds` with the valve and pump states packed into the ``uint16`` bitfield `name`.
+
+    The variables of :data:`VALVE_BITS` in `ds` are replaced by the bitfield; records in
+    which one of them is missing get the value :data:`VALVES_MISSING`. Returns `ds`
+    unchanged if it contains none of them.
+    """
+    present = [var for var in VALVE_BITS if var in ds.variables]
+    if not present:
+        return ds
+    bits = np.zeros(ds.sizes["time"], dtype=np.uint16)
+    missing = np.zeros(ds.sizes["time"], dtype=bool)
+    for var in present:
+        values = ds[var].values
+        missing |= np.isnan(values) if values.dtype.kind == "f" else False
+        bits |= (np.nan_to_num(values) != 0).astype(np.uint16) << VALVE_BITS[var]
+    bits[missing] = VALVES_MISSING
+    return ds.drop_vars(present).assign({name: _valves(("time", bits), {})})
+
+
+def unpack_valves(ds, name: str = "VALVES"):
+    """Return `ds` with the bitfield `name` decoded into the variables of :data:`VALVE_BITS` (0 or 1).
+
+    The inverse of :func:`pack_valves`: the states are ``uint8``, or ``float32`` with NaN
+    in records of missing states.
+    """
+    valves = ds[name]
+    missing = (valves == VALVES_MISSING).values
+    states = {}
+    for var in VALVE_BITS:
+        state = valve_state(valves, var).astype(np.uint8)
+        if missing.any():
+            state = state.astype(np.float32).where(~missing)
+        states[var] = state.assign_attrs(unit="ON/OFF")
+    return ds.drop_vars(name).assign(states)
+
+
+def valve_state(valves, valve: str):
+    """Return whether `valve` (e.g. ``"VALVE3"`` or ``"PUMP"``) is on in the bitfield `valves`.
+
+    Records with missing states (:data:`VALVES_MISSING`) are returned as off.
+    """
+    on = (valves.astype(np.uint16) >> VALVE_BITS[valve]) & 1 == 1
+    return on & (valves != VALVES_MISSING)
+
+
+def _valves(variable, attrs):
+    """Return the bitfield `variable` with the CF attributes of its bits."""
+    import xarray as xr
+
+    names = sorted(VALVE_BITS, key=VALVE_BITS.get)
+    attrs = {
+        **attrs,
+        "long_name": "Valve and pump states",
+        "flag_masks": np.array([1 << VALVE_BITS[var] for var in names], dtype=np.uint16),
+        "flag_meanings": " ".join(names),
+        "comment": f"bitfield of the states (1 = ON); {int(VALVES_MISSING)} if missing",
+    }
+    if isinstance(variable, xr.DataArray):
+        return variable.assign_attrs(attrs)
+    return xr.Variable(*variable, attrs=attrs)
+
+
+@cache
+def system_states() -> dict[int, str]:
+    """Return the descriptions of the system states of ``system_states.csv`` by state."""
+    import pandas as pd
+
+    file = Path(__file__).resolve().parents[1] / "system_states.csv"
+    states = pd.read_csv(file, sep=";", skipinitialspace=True)
+    return dict(zip(states["state"].astype(int), states["comment"].str.strip()))
+
+
+def categorize_status(ds, name: str = "STATUS"):
+    """Return `ds` with the system states `name` as ``uint8`` flags labelled from ``system_states.csv``.
+
+    The variable is left as is (with a warning) if it contains missing values or values
+    that do not fit into ``uint8``.
+    """
+    values = ds[name].values
+    if (
+        (values.dtype.kind == "f" and np.isnan(values).any())
+        or values.min(initial=0) < 0
+        or values.max(initial=0) > 255
+    ):
+        log.warning(f"⚠️  {name} contains missing or invalid states and is not stored as uint8.")
+        return ds
+    states = system_states()
+    attrs = {
+        **ds[name].attrs,
+        "flag_values": np.array(list(states), dtype=np.uint8),
+        "flag_meanings": " ".join(_flag_meaning(text) for text in states.values()),
+    }
+    return ds.assign({name: ds[name].astype(np.uint8).assign_attrs(attrs)})
+
+
+def status_labels(status):
+    """Return the system states `status` as :class:`pandas.Categorical` of the descriptions of ``system_states.csv``.
+
+    Example
+    -------
+    >>> list(status_labels([5, 2]))
+    ['Operate: default sea-CO2 analysis', 'Zero calibration, automatic']
+    """
+    import pandas as pd
+
+    states = system_states()
+    return pd.Categorical.from_codes(
+        pd.Index(list(states)).get_indexer(np.asarray(status)), categories=list(states.values())
+    )
+
+
+def _flag_meaning(text: str) -> str:
+    """Return `text` as a word of the CF attribute ``flag_meanings`` (e.g. ``Operate_default_sea-CO2_analysis``)."""
+    return re.sub(r"[^\w-]+", "_", text).strip("_")
+
+
+def downcast(ds):
+    """Return `ds` with the data variables in the smallest types that hold their values.
+
+    Integer variables get the smallest signed integer type (unsigned types, e.g. of the
+    bitfields, are kept). Floating-point variables become ``float32`` if the largest
+    rounding error is below half of the resolution of the values, i.e. the smallest
+    power of ten of which all values are multiples (e.g. 0.001 for the CO2 mole fraction
+    with three decimals). Dask-backed variables are checked chunk by chunk.
+    """
+    converted = {}
+    for name, variable in ds.data_vars.items():
+        kind = variable.dtype.kind
+        if kind == "i":
+            low, high = (
+                (int(v) for v in (variable.min(), variable.max())) if variable.size else (0, 0)
+            )
+            for dtype in (np.int8, np.int16, np.int32)[: variable.dtype.itemsize.bit_length() - 1]:
+                if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                    converted[name] = variable.astype(dtype)
+                    break
+        elif kind == "f" and variable.dtype.itemsize > 4 and _float32_exact(variable):
+            converted[name] = variable.astype(np.float32)
+    return ds.assign(converted)
+
+
+def _float32_exact(variable) -> bool:
+    """Return whether the values of `variable` are kept within half of their resolution as ``float32``."""
+    error = float(abs(variable - variable.astype(np.float32).astype(variable.dtype)).max())
+    if np.isnan(error):  # only missing values
+        return True
+    if error == 0:
+        return True
+    resolution = _resolution(variable)
+    return resolution is not None and error < resolution / 2
+
+
+def _resolution(variable) -> float | None:
+    """Return the smallest power of ten (down to :data:`MAX_DECIMALS` decimals) of which all values are multiples."""
+    for decimals in range(MAX_DECIMALS + 1):
+        scaled = variable * 10.0**decimals
+        if float(abs(scaled - np.rint(scaled)).max()) < 1e-3:
+            return 10.0**-decimals
+    return None
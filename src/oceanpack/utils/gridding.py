@@ -0,0 +1,306 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+"""Binned aggregation of ship tracks onto regular longitude/latitude(/time) grids."""
+
+import itertools
+import logging
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from oceanpack.utils.helpers import centered_bins
+
+log = logging.getLogger(__name__)
+
+STATISTICS = ("mean", "std", "count", "median")
+
+
+class BinnedStatistics:
+    """Accumulate count, mean, standard deviation and median of values per bin.
+
+    Values are fed block by block via :meth:`update`, so the data never have to be in
+    memory at once. Count, mean and standard deviation are merged with the pairwise
+    update of Chan et al. (1979); the median needs all values of a bin and therefore
+    keeps the (bin, value) pairs of every block until :meth:`result` is called.
+
+    Only the occupied bins are stored: the accumulators are kept per entry of the
+    sorted array :attr:`bins`, so the memory scales with the number of bins that
+    received values rather than with `nbins` (e.g. the mostly empty cells of a
+    time/latitude/longitude grid along a ship track).
+
+    Parameters
+    ----------
+    nbins : int
+        Number of bins.
+    stats : sequence of str
+        Subset of :data:`STATISTICS` to compute.
+
+    Example
+    -------
+    >>> acc = BinnedStatistics(3, stats=["mean", "count"])
+    >>> acc.update(np.array([0, 0, 2]), np.array([1.0, 3.0, 5.0]))
+    >>> acc.update(np.array([1]), np.array([np.nan]))
+    >>> acc.bins
+    array([0, 2])
+    >>> acc.result()
+    {'mean': array([ 2., nan,  5.]), 'count': array([2, 0, 1])}
+    >>> acc.result(dense=False)
+    {'mean': array([2., 5.]), 'count': array([2, 1])}
+    """
+
+    def __init__(self, nbins: int, stats=STATISTICS):
+        unknown = [stat for stat in stats if stat not in STATISTICS]
+        if unknown:
+            raise ValueError(f"Unknown statistics {unknown}. Valid options are {list(STATISTICS)}")
+        self.nbins = nbins
+        self.stats = list(stats)
+        self.bins = np.empty(0, dtype=np.int64)
+        self.count = np.empty(0, dtype=np.int64)
+        self.mean = np.empty(0)
+        self.m2 = np.empty(0)
+        self._median_parts = []
+
+    def update(self, index, values):
+        """Add `values` that fall into the bins `index` (NaN values are ignored)."""
+        index = np.asarray(index, dtype=np.int64)
+        values = np.asarray(values, dtype=float)
+        valid = np.isfinite(values)
+        index, values = index[valid], values[valid]
+        if not len(index):
+            return
+
+        occupied, inverse = np.unique(index, return_inverse=True)
+        count_b = np.bincount(inverse)
+        mean_b = np.bincount(inverse, weights=values) / count_b
+        m2_b = np.bincount(inverse, weights=(values - mean_b[inverse]) ** 2)
+
+        self._insert(occupied)
+        position = np.searchsorted(self.bins, occupied)
+        count_a = self.count[position]
+        count = count_a + count_b
+        delta = mean_b - self.mean[position]
+        self.mean[position] += delta * count_b / count
+        self.m2[position] += m2_b + delta**2 * count_a * count_b / count
+        self.count[position] = count
+
+        if "median" in self.stats:
+            self._median_parts.append((index, values))
+
+    def _insert(self, occupied):
+        """Add empty accumulators for the bins in `occupied` that are not stored yet."""
+        new = np.setdiff1d(occupied, self.bins, assume_unique=True)
+        if not len(new):
+            return
+        bins = np.union1d(self.bins, new)
+        kept = np.searchsorted(bins, self.bins)
+        for name in ("count", "mean", "m2"):
+            previous = getattr(self, name)
+            grown = np.zeros(len(bins), dtype=previous.dtype)
+            grown[kept] = previous
+            setattr(self, name, grown)
+        self.bins = bins
+
+    def result(self, dense: bool = True) -> dict[str, np.ndarray]:
+        """Return the requested statistics as a dictionary of arrays.
+
+        The arrays have length `nbins` if `dense` is True and are otherwise aligned
+        with the occupied :attr:`bins`.
+        """
+        results = {}
+        for stat in self.stats:
+            if stat == "count":
+                values = self.count.copy()
+            elif stat == "mean":
+                values = self.mean.copy()
+            elif stat == "std":
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    values = np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+            elif stat == "median":
+                values = self._median()
+            if dense:
+                fill = 0 if stat == "count" else np.nan
+                results[stat] = np.full(self.nbins, fill, dtype=values.dtype)
+                results[stat][self.bins] = values
+            else:
+                results[stat] = values
+        return results
+
+    def _median(self):
+        median = np.full(len(self.bins), np.nan)
+        if not self._median_parts:
+            return median
+        index = np.concatenate([part[0] for part in self._median_parts])
+        values = np.concatenate([part[1] for part in self._median_parts])
+        order = np.lexsort((values, index))
+        values = values[order]
+        bins, starts, counts = np.unique(index[order], return_index=True, return_counts=True)
+        median[np.searchsorted(self.bins, bins)] = 0.5 * (
+            values[starts + (counts - 1) // 2] + values[starts + counts // 2]
+        )
+        return median
+
+
+def grid_track(
+    ds: xr.Dataset,
+    lon_res: float,
+    lat_res: float,
+    time_res: str | None = None,
+    stats=STATISTICS,
+    variables: list[str] | None = None,
+    lon: str = "lon",
+    lat: str = "lat",
+    block_size: int | None = None,
+) -> xr.Dataset:
+    """Aggregate the track data in `ds` onto a regular longitude/latitude(/time) grid.
+
+    The grid is aligned to multiples of the resolution and covers the extent of the
+    track. Cell indices are computed once per block with integer arithmetic and all
+    variables are reduced with :class:`BinnedStatistics`. Dask-backed (chunked)
+    datasets are processed chunk by chunk along the track dimension.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Dataset with decimal-degree coordinates (see
+        :meth:`~oceanpack.app.models.data_processor.DataProcessor.convert_coordinates`).
+    lon_res, lat_res : float
+        Grid resolution in degrees.
+    time_res : str, optional
+        Temporal resolution as pandas offset string (e.g. ``"1D"``). If None, the
+        output has no time dimension.
+    stats : sequence of str
+        Statistics to compute out of ``mean``, ``std``, ``count`` and ``median``.
+    variables : list of str, optional
+        Variables to grid. Defaults to all numeric variables along the track.
+    lon, lat : str
+        Names of the coordinate variables in `ds`.
+    block_size : int, optional
+        Number of records processed at once. Defaults to the dask chunks of `ds` or,
+        for in-memory data, to the full track.
+
+    Returns
+    -------
+    xr.Dataset
+        One variable ``<name>_<stat>`` per variable and statistic on the grid cell
+        centres, with cell boundaries (as given by :func:`centered_bins`) in
+        ``lon_bnds``/``lat_bnds``.
+    """
+    dim = ds[lon].dims[0]
+    if variables is None:
+        variables = [
+            var
+            for var in ds.data_vars
+            if var not in (lon, lat)
+            and ds[var].dims == (dim,)
+            and np.issubdtype(ds[var].dtype, np.number)
+        ]
+    for var in variables:
+        if ds[var].dims != (dim,):
+            raise ValueError(f"Variable '{var}' must have the single dimension '{dim}'.")
+
+    grid = _TrackGrid(ds, dim, lon, lat, lon_res, lat_res, time_res)
+    log.info(f"Grid {len(variables)} variables onto {' x '.join(map(str, grid.shape))} cells")
+
+    accumulators = {var: BinnedStatistics(grid.size, stats) for var in variables}
+    for block in _blocks(ds, dim, block_size):
+        block = block[[lon, lat, *variables]].compute()
+        cell, valid = grid.cell_index(block)
+        for var in variables:
+            accumulators[var].update(cell, block[var].values[valid])
+
+    gridded = grid.to_dataset()
+    for var, acc in accumulators.items():
+        for stat, values in acc.result().items():
+            attrs = {} if stat == "count" else dict(ds[var].attrs)
+            attrs["cell_methods"] = f"area: {stat}"
+            gridded[f"{var}_{stat}"] = (grid.dims, values.reshape(grid.shape), attrs)
+    return gridded
+
+
+class _TrackGrid:
+    """Regular grid covering the extent of a track, with the cell index arithmetic."""
+
+    def __init__(self, ds, dim, lon, lat, lon_res, lat_res, time_res=None):
+        self.dim, self.lon, self.lat = dim, lon, lat
+        self.lon_res, self.lat_res = lon_res, lat_res
+        self.lon_centers, self.lon0 = _axis(ds[lon], lon_res)
+        self.lat_centers, self.lat0 = _axis(ds[lat], lat_res)
+        self.time_res = None if time_res is None else pd.to_timedelta(time_res)
+        if self.time_res is None:
+            self.dims = ("lat", "lon")
+            self.shape = (len(self.lat_centers), len(self.lon_centers))
+        else:
+            self.t0 = pd.Timestamp(ds[dim].min().values).floor(self.time_res)
+            ntime = int((pd.Timestamp(ds[dim].max().values) - self.t0) // self.time_res) + 1
+            self.time_centers = pd.date_range(
+                self.t0 + self.time_res / 2, periods=ntime, freq=self.time_res
+            )
+            self.dims = ("time", "lat", "lon")
+            self.shape = (ntime, len(self.lat_centers), len(self.lon_centers))
+        self.size = int(np.prod(self.shape))
+
+    def cell_index(self, block: xr.Dataset):
+        """Return the flat cell indices of the valid records in `block` and the validity mask."""
+        nlat, nlon = self.shape[-2:]
+        ilon = np.floor((block[self.lon].values - self.lon0) / self.lon_res)
+        ilat = np.floor((block[self.lat].values - self.lat0) / self.lat_res)
+        valid = np.isfinite(ilon) & np.isfinite(ilat)
+        cell = ilat * nlon + ilon
+        if self.time_res is not None:
+            times = block[self.dim].values
+            valid &= ~np.isnat(times)
+            itime = (times - self.t0.to_datetime64()) // self.time_res.to_timedelta64()
+            cell = cell + itime * (nlat * nlon)
+        return cell[valid].astype(np.int64), valid
+
+    def to_dataset(self) -> xr.Dataset:
+        """Return an empty dataset with the grid coordinates and cell boundaries."""
+        gridded = xr.Dataset(
+            coords={
+                "lat": ("lat", self.lat_centers, {"units": "degrees_north", "bounds": "lat_bnds"}),
+                "lon": ("lon", self.lon_centers, {"units": "degrees_east", "bounds": "lon_bnds"}),
+                "lat_bnds": (("lat", "nv"), _bounds(self.lat_centers, self.lat_res)),
+                "lon_bnds": (("lon", "nv"), _bounds(self.lon_centers, self.lon_res)),
+            },
+            attrs={"lon_res": self.lon_res, "lat_res": self.lat_res},
+        )
+        if self.time_res is not None:
+            gridded = gridded.assign_coords(time=("time", self.time_centers.values))
+            gridded.attrs["time_res"] = str(self.time_res)
+        return gridded
+
+
+def _axis(coord: xr.DataArray, res: float):
+    """Return the cell centres of a grid axis aligned to multiples of `res`, and its origin."""
+    vmin = float(coord.min().values)
+    vmax = float(coord.max().values)
+    origin = np.floor(vmin / res) * res
+    n = int(np.floor((vmax - origin) / res)) + 1
+    return origin + (np.arange(n) + 0.5) * res, origin
+
+
+def _bounds(centers, res):
+    """Return the (n, 2) cell boundaries of the grid axis with the given `centers`."""
+    if len(centers) > 1:
+        edges = centered_bins(centers)
+    else:
+        edges = centers[0] + np.array([-0.5, 0.5]) * res
+    return np.stack([edges[:-1], edges[1:]], axis=-1)
+
+
+def _blocks(ds: xr.Dataset, dim: str, block_size: int | None = None):
+    """Yield consecutive slices of `ds` along `dim`."""
+    if block_size is None:
+        chunks = ds.chunks.get(dim) if ds.chunks else None
+        if chunks:
+            for start, stop in itertools.pairwise(np.cumsum((0, *chunks))):
+                yield ds.isel({dim: slice(start, stop)})
+            return
+        block_size = ds.sizes[dim]
+    for start in range(0, ds.sizes[dim], max(block_size, 1)):
+        yield ds.isel({dim: slice(start, start + block_size)})
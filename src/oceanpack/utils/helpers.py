@@ -4,10 +4,17 @@
 # Date:   2024-06-14
 # %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
 #
-"""Helper utilities for coordinate conversion, unit handling, and common data transformations."""
+"""Helper utilities for coordinate conversion, unit handling, and common data transformations.
+
+The physical conversions accept scalars, NumPy arrays, :class:`pandas.Series` and
+:class:`xarray.DataArray` objects alike; dask-backed input is kept lazy. They compute
+in double precision by default; with ``precision="float32"`` they compute in single
+precision, which halves memory and bandwidth (see :func:`fugacity` for the accuracy).
+"""
 
 from copy import copy
 import logging
+from typing import NamedTuple
 import warnings
 
 import numpy as np
@@ -16,6 +23,9 @@ import xarray as xr
 
 log = logging.getLogger(__name__)
 
+#: Floating-point precisions of the physical conversions
+PRECISIONS = ("float64", "float32")
+
 
 def convert_coordinates(x):
     """Convert coordinates from 'ddmm.mmmm' format into 'dd.dddd'.
@@ -57,9 +67,9 @@ def compute_salinity(C, T, p, units=None):
         Conductivity. The PSS-78 formula requires mS/cm. If ``C`` is an
         :class:`xarray.DataArray` with a ``units`` attribute the unit is detected
         automatically. Pass ``units='S/m'`` to convert S/m input explicitly.
-    T : float
+    T : float or array-like or xr.DataArray
         Temperature (°C or K; converted internally).
-    p : float
+    p : float or array-like or xr.DataArray
         Pressure (hPa, Pa or atm; converted internally).
     units : str, optional
         Conductivity units: ``'mS/cm'`` or ``'S/m'``.  When *None* the function
@@ -122,7 +132,9 @@ def compute_salinity(C, T, p, units=None):
 
     salinity = a0 + a1*ξ + a2*ξ**2 + a3*ξ**3 + a4*ξ**4 + a5*ξ**5 + dSal
 
-    return float(salinity)
+    if np.ndim(salinity) == 0:
+        return float(salinity)
+    return salinity
 
 
 def _conductivity_unit_handling(C, units=None):
@@ -140,7 +152,7 @@ def _conductivity_unit_handling(C, units=None):
             raise ValueError(f"Unknown conductivity units '{units}'. Expected 'mS/cm' or 'S/m'.")
     else:
         # heuristic: seawater mS/cm is ~20–70 (OOM 1–2); S/m is ~2–7 (OOM 0–1)
-        c_vals = np.asarray(C, dtype=float).ravel()
+        c_vals = _sample_values(C).ravel()
         c_vals = c_vals[np.isfinite(c_vals) & (c_vals > 0)]
         if len(c_vals) > 0:
             oom_vals = order_of_magnitude(c_vals)
@@ -167,9 +179,53 @@ def _conductivity_unit_handling(C, units=None):
     return C
 
 
-def pressure2atm(p):
+_PRESSURE_UNITS = {
+    "hpa": "hPa",
+    "mbar": "hPa",
+    "mb": "hPa",
+    "millibar": "hPa",
+    "pa": "Pa",
+    "atm": "atm",
+}
+
+
+def _pressure_unit_handling(p, units=None):
+    """Determine the unit ('hPa', 'Pa' or 'atm') of the pressure `p`.
+
+    An explicit `units` argument takes precedence, followed by a ``units`` or ``unit``
+    attribute of an :class:`xarray.DataArray`. Otherwise the unit is guessed from the
+    median order of magnitude of the values.
+    """
+    if units is None and isinstance(p, xr.DataArray):
+        units = p.attrs.get("units", p.attrs.get("unit"))
+        if units is not None:
+            log.info("Pressure units auto-detected from DataArray attribute: '%s'", units)
+
+    if units is not None:
+        units_norm = units.strip().lower().replace(" ", "")
+        if units_norm not in _PRESSURE_UNITS:
+            raise ValueError(
+                f"Unknown pressure units '{units}'. Expected 'hPa', 'mbar', 'Pa' or 'atm'."
+            )
+        return _PRESSURE_UNITS[units_norm]
+
+    oom = np.nanmedian(np.rint(order_of_magnitude(_sample_values(p))))
+    if 2 <= oom <= 3:
+        return "hPa"
+    elif 4 <= oom <= 5:
+        return "Pa"
+    elif -1 <= oom <= 1:
+        return "atm"
+    raise ValueError("Pressure must be given in hPa, Pa or atm")
+
+
+def pressure2atm(p, units=None, precision: str = "float64"):
     """Convert pressure given in hPa, Pa or atm into atm.
 
+    The unit is taken from `units`, from the attributes of an :class:`xarray.DataArray`,
+    or inferred from the order of magnitude of the values. Dask-backed input stays lazy.
+    `precision` is the floating-point precision (see :func:`_with_precision`).
+
     Examples
     --------
     >>> pressure2atm(1013.25)
@@ -182,24 +238,29 @@ def pressure2atm(p):
     0    1.000000
     1    1.010609
     dtype: float64
+    >>> pressure2atm(np.array([1013.25]), precision="float32")
+    array([1.], dtype=float32)
     """
-    p = copy(p)
-    if 2 <= np.nanmedian(np.rint(order_of_magnitude(p))) <= 3:
-        p /= 1013.25
+    p = _with_precision(copy(p), precision)
+    unit = _pressure_unit_handling(p, units)
+    if unit == "hPa":
+        p = p / 1013.25
         log.info("Pressure is assumed to be in hPa and was converted to atm")
-    elif 4 <= np.nanmedian(np.rint(order_of_magnitude(p))) <= 5:
-        p /= 101325
+    elif unit == "Pa":
+        p = p / 101325
         log.info("Pressure is assumed to be in Pa and was converted to atm")
-    elif -1 <= np.nanmedian(np.rint(order_of_magnitude(p))) <= 1:
-        log.info("Pressure is assumed to be already in atm (no conversion)")
     else:
-        raise ValueError("Pressure must be given in hPa, Pa or atm")
+        log.info("Pressure is assumed to be already in atm (no conversion)")
     return p
 
 
-def pressure2mbar(p):
+def pressure2mbar(p, units=None, precision: str = "float64"):
     """Convert pressure given in hPa, Pa or atm into mbar (or hPa).
 
+    The unit is taken from `units`, from the attributes of an :class:`xarray.DataArray`,
+    or inferred from the order of magnitude of the values. Dask-backed input stays lazy.
+    `precision` is the floating-point precision (see :func:`_with_precision`).
+
     Examples
     --------
     >>> pressure2mbar(1013)
@@ -213,17 +274,16 @@ def pressure2mbar(p):
     1    2060.95050
     dtype: float64
     """
-    p = copy(p)
-    if 2 <= np.nanmedian(np.rint(order_of_magnitude(p))) <= 3:
+    p = _with_precision(copy(p), precision)
+    unit = _pressure_unit_handling(p, units)
+    if unit == "hPa":
         log.info("Pressure is assumed to be already in mbar (no conversion)")
-    elif 4 <= np.nanmedian(np.rint(order_of_magnitude(p))) <= 5:
-        p /= 100
+    elif unit == "Pa":
+        p = p / 100
         log.info("Pressure is assumed to be in Pa and was converted to mbar (hPa)")
-    elif -1 <= np.nanmedian(np.rint(order_of_magnitude(p))) <= 1:
-        log.info("Pressure is assumed to be in atm and was converted to mbar (hPa)")
-        p *= 1013.25
     else:
-        raise ValueError("Pressure must be given in hPa, Pa or atm")
+        p = p * 1013.25
+        log.info("Pressure is assumed to be in atm and was converted to mbar (hPa)")
     return p
 
 
@@ -254,58 +314,127 @@ def order_of_magnitude(x):
     return np.array(oom).squeeze()
 
 
+def _is_dask(x):
+    """Return True if `x` is (or wraps) a dask collection."""
+    try:
+        from dask.base import is_dask_collection
+    except ImportError:
+        return False
+    return is_dask_collection(x)
+
+
+def _sample_values(x):
+    """Return the values of `x` as a NumPy array for the unit heuristics.
+
+    Dask-backed input is represented by its first chunk only, so that the heuristics
+    never trigger a computation of the full array.
+    """
+    data = x.data if isinstance(x, xr.DataArray) else x
+    if _is_dask(data):
+        if data.ndim > 0:
+            data = data.blocks[(0,) * data.ndim]
+        data = data.compute()
+    return np.asarray(data, dtype=float)
+
+
+def _apply_kernel(kernel, *args):
+    """Apply the element-wise NumPy `kernel` to scalars, NumPy, pandas, xarray or dask input.
+
+    :class:`xarray.DataArray` input is routed through :func:`xarray.apply_ufunc` (dask-backed
+    data stays lazy), :class:`pandas.Series` keep their index, and scalar input yields a
+    Python scalar.
+    """
+    if any(isinstance(arg, xr.DataArray) for arg in args):
+        return xr.apply_ufunc(kernel, *args, dask="allowed", keep_attrs=True)
+
+    series = next((arg for arg in args if isinstance(arg, pd.Series)), None)
+    if series is not None:
+        values = kernel(*(arg.to_numpy() if isinstance(arg, pd.Series) else arg for arg in args))
+        return pd.Series(values, index=series.index, name=series.name)
+
+    result = kernel(*args)
+    if np.ndim(result) == 0 and not _is_dask(result):
+        return result.item()
+    return result
+
+
+def _with_precision(x, precision: str = "float64"):
+    """Return `x` as floating-point values of `precision` (one of :data:`PRECISIONS`).
+
+    In ``"float64"`` precision, only floating-point input of lower precision (e.g. of a
+    dataset in the compact layout, see :mod:`oceanpack.utils.compact`) is cast, so that
+    integer input and Python scalars pass unchanged.
+
+    Examples
+    --------
+    >>> _with_precision(np.array([1.5]), "float32")
+    array([1.5], dtype=float32)
+    >>> _with_precision(np.array([1.5], dtype=np.float32)).dtype
+    dtype('float64')
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}'. Expected one of {PRECISIONS}.")
+    if x is None:
+        return x
+    dtype = np.dtype(precision)
+    current = getattr(x, "dtype", None)
+    if current is None:  # Python scalar
+        return x if precision == "float64" else dtype.type(x)
+    if precision == "float64" and not (current.kind == "f" and current.itemsize < dtype.itemsize):
+        return x
+    return x.astype(dtype)
+
+
 # Ocean/atmospheric temperatures never exceed ~50 °C, so any value at or above
 # this threshold is assumed to already be in Kelvin (≥ 273.15 K for 0 °C).
 _CELSIUS_KELVIN_THRESHOLD = 200.0
 
 
-def temperature2K(T):
+def _celsius_to_kelvin(T):
+    return np.where(T < _CELSIUS_KELVIN_THRESHOLD, T + 273.15, T)
+
+
+def _kelvin_to_celsius(T):
+    return np.where(T > _CELSIUS_KELVIN_THRESHOLD, T - 273.15, T)
+
+
+def temperature2K(T, precision: str = "float64"):
     """Convert temperatures given in °C into Kelvin.
 
     Uses a heuristic: values below :data:`_CELSIUS_KELVIN_THRESHOLD` are treated
     as °C and shifted by 273.15; values at or above the threshold are assumed to
-    already be in Kelvin and are returned unchanged.
+    already be in Kelvin and are returned unchanged. Dask-backed input stays lazy.
+    `precision` is the floating-point precision (see :func:`_with_precision`).
 
     Examples
     --------
     >>> temperature2K(10)
     283.15
+    >>> temperature2K(np.array([10.0, 283.15]))
+    array([283.15, 283.15])
     """
-    T = copy(T)
-    if isinstance(T, pd.Series):
-        if (T >= _CELSIUS_KELVIN_THRESHOLD).any():
-            log.warning("Some values seem to be already in Kelvin")
-        T.loc[T < _CELSIUS_KELVIN_THRESHOLD] += 273.15
-    elif isinstance(T, xr.DataArray):
-        if (T >= _CELSIUS_KELVIN_THRESHOLD).any():
-            log.warning("Some values seem to be already in Kelvin")
-        T = T.where(T >= _CELSIUS_KELVIN_THRESHOLD, T + 273.15)
-    elif T < _CELSIUS_KELVIN_THRESHOLD:
-        T += 273.15
-    return T
-
-
-def temperature2C(T):
+    if np.ndim(T) > 0 and not _is_dask(T) and np.any(np.asarray(T) >= _CELSIUS_KELVIN_THRESHOLD):
+        log.warning("Some values seem to be already in Kelvin")
+    return _apply_kernel(_celsius_to_kelvin, _with_precision(T, precision))
+
+
+def temperature2C(T, precision: str = "float64"):
     """Convert temperatures given in Kelvin into °C.
 
     Uses a heuristic: values above :data:`_CELSIUS_KELVIN_THRESHOLD` are treated
     as Kelvin and shifted by −273.15; values at or below the threshold are assumed
-    to already be in °C and are returned unchanged.
+    to already be in °C and are returned unchanged. Dask-backed input stays lazy.
+    `precision` is the floating-point precision (see :func:`_with_precision`).
 
     Examples
     --------
     >>> temperature2C(283.15)
     10.0
     """
-    T = copy(T)
-    if isinstance(T, pd.Series):
-        T.loc[T > _CELSIUS_KELVIN_THRESHOLD] -= 273.15
-    elif T > _CELSIUS_KELVIN_THRESHOLD:
-        T -= 273.15
-    return T
+    return _apply_kernel(_kelvin_to_celsius, _with_precision(T, precision))
 
 
-def ppm2uatm(xCO2, p_equ, input="wet", T=None, S=None):
+def ppm2uatm(xCO2, p_equ, input="wet", T=None, S=None, precision: str = "float64"):
     r"""Convert mole fraction concentration (in ppm) into partial pressure (in µatm) following :cite:t:`dickson_guide_2007`
 
     .. math::
@@ -313,24 +442,27 @@ def ppm2uatm(xCO2, p_equ, input="wet", T=None, S=None):
 
     Parameters
     ----------
-    xCO2: float or pandas.Series
+    xCO2: float or array-like
         The measured CO2 concentration (in ppm)
-    p_equ: float or pandas.Series
+    p_equ: float or array-like
         The measured pressure (in hPa, Pa or atm) at the equilibrator (hint: you might want to smoothen your time series)
     input: str [default: "wet"]
         Either "wet" or "dry", specifying the type of air, in which the concentration is measured.
         If the CO2 concentration is measured in dry air, one must correct for the water vapor pressure.
         In this case, make sure to also provide T (temperature in Kelvin) and S (salinity in PSU) as arguments.
-    T: float or pandas.Series [default: None]
+    T: float or array-like [default: None]
         Temperature in Kelvin (needs to be provided if xCO2 is measured in dry air)
-    S: float or pandas.Series [default: None]
+    S: float or array-like [default: None]
         Salinity in PSU (needs to be provided if xCO2 is measured in dry air)
+    precision: str [default: "float64"]
+        The floating-point precision of the computation, "float64" or "float32".
     """
+    xCO2 = _with_precision(xCO2, precision)
     # Pa or hPa -> atm
-    p_equ = pressure2atm(p_equ)
+    p_equ = pressure2atm(p_equ, precision=precision)
 
     if input == "dry":
-        pH2O = compute_water_vapor_pressure(T, S)
+        pH2O = compute_water_vapor_pressure(T, S, precision=precision)
     elif input == "wet":
         pH2O = 0
     else:
@@ -341,25 +473,30 @@ def ppm2uatm(xCO2, p_equ, input="wet", T=None, S=None):
     return pCO2_wet_equ
 
 
-def compute_water_vapor_pressure(T, S):
+def compute_water_vapor_pressure(T, S, precision: str = "float64"):
     """Compute the water vapor pressure by means of the temperature [K] and the salinity [PSU]
     following :cite:t:`weiss_nitrous_1980`.
 
     Parameters
     ----------
-    S: float or pandas.Series
+    S: float or array-like
         Salinity in PSU
-    T: float or pandas.Series
+    T: float or array-like
         Temperature (°C gets converted into Kelvin)
+    precision: str [default: "float64"]
+        The floating-point precision of the computation, "float64" or "float32".
     """
     # °C -> K
-    T = temperature2K(T)
+    T = temperature2K(T, precision=precision)
+    S = _with_precision(S, precision)
 
     pH2O = np.exp(24.4543 - 67.4509*(100/T) - 4.8489*np.log(T/100) - 0.000544*S)
     return pH2O
 
 
-def temperature_correction(CO2, T_out=None, T_in=None, method="Takahashi2009", **kwargs):
+def temperature_correction(
+    CO2, T_out=None, T_in=None, method="Takahashi2009", precision: str = "float64", **kwargs
+):
     r"""Apply a temperature correction. This might be necessary when the temperatures at the water intake
     (often outside the ship) and at the OceanPack CTD differ. The correction used here follows :cite:t:`takahashi_climatological_2009`:
 
@@ -372,34 +509,57 @@ def temperature_correction(CO2, T_out=None, T_in=None, method="Takahashi2009", *
 
     Parameters
     ----------
-    CO2: float or pandas.Series
+    CO2: float or array-like
         The CO2 variable, which shall be corrected for temperature differences.
         Can be one out of the following:
         - xCO2 (mole fraction in ppm)
         - pCO2 (partial pressure in hPa, Pa, atm or µatm)
         - fCO2 (fugacity in hPa, Pa, atm or µatm)
-    T_out: float or pandas.Series
+    T_out: float or array-like
         The temperature towards which the data shall be corrected. Typically, the in-situ temperature (°C or K), at which the water was sampled.
-    T_in: float or pandas.Series
+    T_in: float or array-like
         The temperature from which the data shall be corrected. Typically, the temperature (°C or K) at the equilibrator, at which the water was measured.
     method: str
         Either "Takahashi2009" or "Takahashi1993", describing the method of the respectively published paper by Takahashi et al.
+    precision: str [default: "float64"]
+        The floating-point precision of the computation, "float64" or "float32".
+
+    Notes
+    -----
+    The difference of the squared temperatures is computed as
+    :math:`(SST - T_\\text{equ})(SST + T_\\text{equ})`, which does not lose the digits of the
+    small temperature difference in single precision.
     """
     if T_out is None:
         T_out = kwargs.pop("T_insitu")
     if T_in is None:
         T_in = kwargs.pop("T_equ")
+    CO2, T_out, T_in = (_with_precision(x, precision) for x in (CO2, T_out, T_in))
     if method=="Takahashi2009":
-        CO2_out = CO2 * np.exp(0.0433*(T_out - T_in) - 4.35e-5*(T_out**2 - T_in**2))
-    elif method=="Takahashi1993":
-        CO2_out = CO2 * np.exp(0.0423*(T_out - T_in))
+        dT = T_out - T_in
+        CO2_out = CO2 * np.exp(dT * (0.0433 - 4.35e-5 * (T_out + T_in)))
+    elif method == "Takahashi1993":
+        CO2_out = CO2 * np.exp(0.0423 * (T_out - T_in))
     else:
         raise ValueError("Unknown method for temperature conversion.")
 
     return CO2_out
 
 
-def fugacity(pCO2, p_equ, SST, xCO2=None):
+#: Gas constant in cm³⋅atm⋅K−1⋅mol−1
+_R = 8.2057366080960e-2 * 1000
+
+#: Coefficients of the virial coefficient B(CO2, T) of :func:`fugacity` as polynomial of the
+#: temperature in °C (c0 + c1*t + c2*t**2 + c3*t**3), expanded from the polynomial in K
+_B_CO2_CELSIUS = tuple(
+    float(c)
+    for c in np.polynomial.Polynomial([-1636.75, 12.0408, -3.27957e-2, 3.16528e-5])(
+        np.polynomial.Polynomial([273.15, 1.0])
+    ).coef
+)
+
+
+def fugacity(pCO2, p_equ, SST, xCO2=None, precision: str = "float64"):
     r"""Calculate the fugacity of CO2. Can be done either before or after a :func:`temperature_correction`.
     The formulas follow :cite:t:`dickson_guide_2007`, mainly SOP 5, Chapter 8. "Calculation and expression of results".
 
@@ -421,80 +581,339 @@ def fugacity(pCO2, p_equ, SST, xCO2=None):
 
     Parameters
     ----------
-    pCO2: float or pandas.Series
+    pCO2: float or array-like
         The partial pressure of CO2 (in µatm).
         Make sure you have converted xCO2 concentration (mole fraction in ppm) into partial pressure (in µatm).
-    p_equ: float or pandas.Series
+    p_equ: float or array-like
         The measured pressure (in hPa, Pa or atm) at the equilibrator (hint: you might want to smoothen your time series)
-    SST: float or pandas.Series
+    SST: float or array-like
         The in-situ measurement temperature (in °C or Kelvin)
-    xCO2: float or pandas.Series (optional)
+    xCO2: float or array-like (optional)
         CO2 concentration (mole fraction in ppm). If given, the δ_CO2 virial coefficient in the numerator in the exponential expression is multiplied by (1 - xCO2*1e-6). Else, this term is 1.
+    precision: str [default: "float64"]
+        The floating-point precision of the computation, "float64" or "float32".
+
+    Notes
+    -----
+    The virial coefficients and :math:`R\\cdot SST` are evaluated as polynomials of the
+    temperature in °C, whose coefficients are expanded around 273.15 K in double
+    precision (:data:`_B_CO2_CELSIUS`). This avoids the cancellation of the large terms
+    of the polynomial in K: in single precision, the relative error of the exponent is
+    below :math:`10^{-6}` (instead of about :math:`10^{-5}`), and fCO2 deviates by less
+    than 0.001 µatm from the double-precision result, far below the accuracy of the
+    instrument (about 1 µatm).
     """
+    pCO2 = _with_precision(pCO2, precision)
     # Pa or hPa -> atm
-    p_equ = pressure2atm(p_equ)
+    p_equ = pressure2atm(p_equ, precision=precision)
 
-    # °C -> K
-    SST = temperature2K(SST)
+    # K -> °C
+    SST = temperature2C(SST, precision=precision)
 
     # respectively in cm³/mol
-    B_CO2 = -1636.75 + 12.0408*SST - 3.27957e-2*SST**2 + 3.16528e-5*SST**3
-    δ_CO2 = 57.7 - 0.118*SST
-
-    # gas constant
-    R = 8.2057366080960e-2 	# L⋅atm⋅K−1⋅mol−1
-    R *= 1000               # cm³⋅atm⋅K−1⋅mol−1
+    c0, c1, c2, c3 = _B_CO2_CELSIUS
+    B_CO2 = c0 + SST * (c1 + SST * (c2 + SST * c3))
+    δ_CO2 = (57.7 - 0.118 * 273.15) - 0.118 * SST
 
     if xCO2 is None:
         x_c = 1
     else:
-        x_c = (1 - xCO2*1e-6)  # can be and is often neglected in literature
+        x_c = (
+            1 - _with_precision(xCO2, precision) * 1e-6
+        )  # can be and is often neglected in literature
 
-    A = p_equ*(B_CO2 + 2 * δ_CO2 * x_c**2)
-    B = R*SST
-    f = pCO2 * np.exp(A / B)   # same unit as pCO2 (µatm)
+    A = p_equ * (B_CO2 + 2 * δ_CO2 * x_c**2)
+    B = _R * 273.15 + _R * SST
+    f = pCO2 * np.exp(A / B)  # same unit as pCO2 (µatm)
 
     return f
 
 
-def set_nonoperating_to_nan(data, col="CO2", buffer="30min", status_var="ANA_state"):
-    """Set all values from each period, which is ranging from the begin of a certain phase
-    (indicated by the status flag) to the end of the phase, plus a given buffer to NaN.
+def estimate_lag(x, y, max_lag=None):
+    """Estimate the lag (in samples) of `y` behind `x` by FFT cross-correlation.
+
+    Both series must be sampled on the same regular grid. Gaps (NaN) are filled by linear
+    interpolation and a linear trend is removed before correlating. The position of the
+    correlation maximum is refined to sub-sample precision by parabolic interpolation.
+    A positive lag means that `y` follows `x`, i.e. ``y(t) ≈ x(t - lag)``.
+
+    Parameters
+    ----------
+    x, y : array-like
+        Equally sampled time series of the same length.
+    max_lag : int, optional
+        Largest lag (in samples) to consider. Defaults to half the series length.
+
+    Returns
+    -------
+    lag : float
+        The lag in samples.
+    correlation : float
+        The normalized cross-correlation at the lag.
+
+    Example
+    -------
+    >>> t = np.arange(500.0)
+    >>> x = np.exp(-(((t - 250) / 20) ** 2))
+    >>> lag, corr = estimate_lag(x, np.roll(x, 12), max_lag=50)
+    >>> round(lag)
+    12
     """
-    grouped_by_status = data.groupby((data[status_var] != data[status_var].shift()).cumsum())
+    lags, correlation = sliding_lag(x, y, window=len(x), step=len(x), max_lag=max_lag)[1:]
+    return float(lags[0]), float(correlation[0])
+
+
+def sliding_lag(x, y, window, step, max_lag=None, min_valid=0.5):
+    """Estimate the lag of `y` behind `x` (see :func:`estimate_lag`) in sliding windows.
+
+    All windows are gap-filled, detrended and cross-correlated at once with a batched
+    FFT. Windows with less than `min_valid` valid (non-NaN) samples in either series
+    yield NaN.
 
-    # get the first and last index of all periods which are not in operating status
-    non_operating = [
-        (g.index[0], g.index[-1]) for i, g in grouped_by_status if g[status_var].unique() != 5
+    Parameters
+    ----------
+    x, y : array-like
+        Equally sampled time series of the same length.
+    window, step : int
+        Window length and step (in samples).
+    max_lag : int, optional
+        Largest lag (in samples) to consider. Defaults to half the window length.
+    min_valid : float [default: 0.5]
+        Minimum fraction of valid samples per window.
+
+    Returns
+    -------
+    centers, lags, correlation : numpy.ndarray
+        Index of the window centres, lag in samples and correlation at the lag.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    window = min(int(window), len(x))
+    max_lag = window // 2 if max_lag is None else min(int(max_lag), window - 1)
+    starts = np.arange(0, len(x) - window + 1, max(int(step), 1))
+
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    xw = sliding_window_view(x, window)
+    yw = sliding_window_view(y, window)
+    # process the windows in batches of at most ~2**22 samples to bound the memory usage
+    batch = max(1, 2**22 // window)
+    results = [
+        _xcorr_peak(xw[starts[i : i + batch]], yw[starts[i : i + batch]], max_lag, min_valid)
+        for i in range(0, len(starts), batch)
     ]
-    if not non_operating:
-        return data
+    lags = np.concatenate([r[0] for r in results])
+    correlation = np.concatenate([r[1] for r in results])
+    return starts + window // 2, lags, correlation
+
+
+def _xcorr_peak(xw, yw, max_lag, min_valid):
+    """Return lag and correlation of the cross-correlation maximum for each row pair."""
+    window = xw.shape[1]
+    valid = (np.isfinite(xw).mean(axis=1) >= min_valid) & (
+        np.isfinite(yw).mean(axis=1) >= min_valid
+    )
+    xw = _detrend(_fill_gaps(xw))
+    yw = _detrend(_fill_gaps(yw))
+
+    nfft = 1 << int(np.ceil(np.log2(2 * window)))
+    cc = np.fft.irfft(np.conj(np.fft.rfft(xw, nfft)) * np.fft.rfft(yw, nfft), nfft)
+    cc = np.concatenate([cc[:, nfft - max_lag :], cc[:, : max_lag + 1]], axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cc /= np.sqrt((xw**2).sum(axis=1) * (yw**2).sum(axis=1))[:, None]
+
+    peak = np.argmax(np.nan_to_num(cc, nan=-np.inf), axis=1)
+    rows = np.arange(len(cc))
+    left = cc[rows, np.clip(peak - 1, 0, None)]
+    center = cc[rows, peak]
+    right = cc[rows, np.clip(peak + 1, None, cc.shape[1] - 1)]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        denom = left - 2 * center + right
+        shift = np.where(
+            (peak > 0) & (peak < cc.shape[1] - 1) & (denom != 0), 0.5 * (left - right) / denom, 0
+        )
+    lags = np.where(valid, peak - max_lag + shift, np.nan)
+    correlation = np.where(valid, center, np.nan)
+    return lags, correlation
+
+
+def _fill_gaps(a):
+    """Fill NaNs in each row of the 2-D array `a` by linear interpolation (edges: nearest value)."""
+    a = a.copy()
+    positions = np.arange(a.shape[1])
+    for row in np.flatnonzero(~np.isfinite(a).all(axis=1)):
+        valid = np.isfinite(a[row])
+        a[row] = np.interp(positions, positions[valid], a[row, valid]) if valid.any() else 0.0
+    return a
+
+
+def _detrend(a):
+    """Remove the least-squares linear trend from each row of the 2-D array `a`."""
+    t = np.arange(a.shape[1]) - (a.shape[1] - 1) / 2
+    slope = (a @ t) / max((t**2).sum(), 1)
+    return a - a.mean(axis=1, keepdims=True) - slope[:, None] * t
+
+
+OPERATING_STATE = 5
+
+
+def status_segments(status):
+    """Split a status time series into runs of constant value (run-length encoding).
 
-    phase_start, phase_end = zip(*non_operating)
+    Returns
+    -------
+    starts, stops, values : numpy.ndarray
+        Start index, stop index (exclusive) and status value of each run.
+
+    Example
+    -------
+    >>> status_segments([5, 5, 1, 1, 2, 5])
+    (array([0, 2, 4, 5]), array([2, 4, 5, 6]), array([5, 1, 2, 5]))
+    """
+    status = np.asarray(status)
+    if status.size == 0:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, status
+    changes = np.flatnonzero(status[1:] != status[:-1]) + 1
+    starts = np.concatenate([[0], changes])
+    stops = np.concatenate([changes, [status.size]])
+    return starts, stops, status[starts]
+
+
+def nonoperating_mask(time, status, buffer="0min", operating_state=OPERATING_STATE):
+    """Flag all samples of non-operating phases, including a `buffer` after each phase.
+
+    A non-operating phase ranges from the first to the last sample whose status differs
+    from `operating_state`. All samples between its start and its end plus `buffer` are
+    flagged. `time` must be sorted in ascending order.
+
+    Example
+    -------
+    >>> time = pd.date_range("2020-01-01", periods=6, freq="1min")
+    >>> nonoperating_mask(time, [5, 1, 1, 5, 5, 5], buffer="1min")
+    array([False,  True,  True,  True, False, False])
+    """
+    time = np.asarray(time, dtype="datetime64[ns]")
+    nonoperating = np.asarray(status) != operating_state
+    starts, stops, values = status_segments(nonoperating)
+    starts, stops = starts[values], stops[values]
+    if not len(starts):
+        return np.zeros(time.shape, dtype=bool)
 
-    phase_start = pd.to_datetime(phase_start)
-    phase_end = pd.to_datetime(phase_end)
+    phase_start = time[starts]
+    phase_end = time[stops - 1] + pd.to_timedelta(buffer).to_timedelta64()
+    phase = np.searchsorted(phase_start, time, side="right") - 1
+    reach = np.maximum.accumulate(phase_end)
+    return (phase >= 0) & (time <= reach[np.clip(phase, 0, None)])
 
-    # add shift to the end
-    phase_end_shift = phase_end + pd.to_timedelta(buffer)
+
+def set_nonoperating_to_nan(data, col="CO2", buffer="30min", status_var="ANA_state"):
+    """Set all values from each period, which is ranging from the begin of a certain phase
+    (indicated by the status flag) to the end of the phase, plus a given buffer to NaN.
+    """
+    mask = nonoperating_mask(data.index, data[status_var], buffer=buffer)
+    if not mask.any():
+        return data
 
     # set all values in the respective column(s) to NaN
-    for i, j in zip(phase_start, phase_end_shift):
-        data.loc[i:j, col] = np.nan
+    data.loc[mask, col] = np.nan
 
     return data
 
 
-def find_nearest(items: list, pivot: float) -> float:
-    """Find the element inside `items` that is closest to the `pivot` element.
+class NearestMatch(NamedTuple):
+    """Result of :func:`find_nearest` with ``full_output=True``."""
+
+    index: np.ndarray
+    value: np.ndarray
+    distance: np.ndarray
+
+
+def find_nearest(items, pivots, tolerance=None, full_output=False):
+    """Find the elements inside `items` that are closest to each of the `pivots`.
+
+    `items` is sorted once (or used as-is if it is already in ascending order) and all
+    pivots are answered in a single :func:`numpy.searchsorted` call. Ties resolve to the
+    smaller value. Numeric and ``datetime64`` items are supported.
+
+    Parameters
+    ----------
+    items : array-like
+        The values to search in (must not contain NaN/NaT).
+    pivots : scalar or array-like
+        The value(s) to look up.
+    tolerance : scalar or str, optional
+        Maximum allowed distance. Pivots without a match within `tolerance` get the
+        index -1 and a missing value (NaN or NaT). Strings are interpreted as
+        :func:`pandas.to_timedelta` offsets, e.g. ``"30s"``.
+    full_output : bool [default: False]
+        If True, return a :class:`NearestMatch` with the indices (into the original
+        `items`), values and distances. Otherwise only the values are returned.
+
+    Returns
+    -------
+    scalar, numpy.ndarray or NearestMatch
+        For a scalar pivot and ``full_output=False``, the nearest element itself.
 
     Examples
     --------
     >>> result = find_nearest(np.array([2, 4, 5, 7, 9, 10]), 4.6)
     >>> int(result)  # Account for type conflicts when testing with pytest
     5
+    >>> find_nearest([2, 4, 5, 7, 9, 10], [0.5, 7.4, 12])
+    array([ 2,  7, 10])
+    >>> find_nearest([2, 4, 5, 7, 9, 10], [0.5, 7.4, 12], tolerance=1, full_output=True)
+    NearestMatch(index=array([-1,  3, -1]), value=array([nan,  7., nan]), distance=array([nan, 0.4, nan]))
     """
-    return min(items, key=lambda x: abs(x - pivot))
+    items = np.asarray(items)
+    if items.size == 0:
+        raise ValueError("Cannot search for nearest elements in an empty sequence.")
+    is_scalar = np.ndim(pivots) == 0
+    pivots = np.atleast_1d(
+        np.asarray(pivots, dtype=items.dtype if items.dtype.kind == "M" else None)
+    )
+
+    items = items.ravel()
+    if np.all(items[1:] >= items[:-1]):
+        order = None
+        sorted_items = items
+    else:
+        order = np.argsort(items, kind="stable")
+        sorted_items = items[order]
+
+    right = np.clip(np.searchsorted(sorted_items, pivots, side="left"), 0, len(sorted_items) - 1)
+    left = np.clip(right - 1, 0, None)
+    distance_left = np.abs(pivots - sorted_items[left])
+    distance_right = np.abs(sorted_items[right] - pivots)
+    position = np.where(distance_left <= distance_right, left, right)
+
+    index = position if order is None else order[position]
+    value = sorted_items[position]
+    distance = np.minimum(distance_left, distance_right)
+
+    if tolerance is not None:
+        if isinstance(tolerance, str):
+            tolerance = pd.to_timedelta(tolerance).to_timedelta64()
+        outside = distance > tolerance
+        if outside.any():
+            index = np.where(outside, -1, index)
+            value = _mask_values(value, outside)
+            distance = _mask_values(distance, outside)
+
+    if full_output:
+        return NearestMatch(index, value, distance)
+    return value[0] if is_scalar else value
+
+
+def _mask_values(x, mask):
+    """Return a copy of `x` with the entries at `mask` set to NaN (or NaT)."""
+    if x.dtype.kind in "mM":
+        x = x.copy()
+        x[mask] = np.array("NaT", dtype=x.dtype)
+    else:
+        x = x.astype(float)
+        x[mask] = np.nan
+    return x
 
 
 def centered_bins(x):
@@ -540,3 +959,20 @@ def compress_xarray(
     elif isinstance(data, xr.DataArray):
         data.encoding.update(compression_dict)
     return data
+
+
+def config_hash(config: dict) -> str:
+    """Return a short hash of the (JSON-serializable) processing configuration `config`.
+
+    The hash does not depend on the order of the keys.
+
+    Example
+    -------
+    >>> config_hash({"a": 1, "b": [1, 2]}) == config_hash({"b": [1, 2], "a": 1})
+    True
+    """
+    import hashlib
+    import json
+
+    serialized = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode()).hexdigest()[:16]
@@ -0,0 +1,213 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+"""Memory budget of the processing chain.
+
+Within :func:`memory_budget`, the models size their work to stay below the given
+number of bytes: :class:`~oceanpack.app.models.filesource.FileSourceModel` reads the
+log files in batches, and :class:`~oceanpack.app.models.data_processor.DataMerger` and
+:class:`~oceanpack.app.models.data_processor.DataProcessor` process datasets that do
+not fit into the budget in dask chunks and write them block by block. The sizes are
+estimated from the number and types of the columns and the dtypes of the datasets.
+Without a budget, everything is processed in memory.
+
+Only the standard library is imported here, so the CLI can import this module without
+loading the scientific stack.
+"""
+
+from contextlib import contextmanager
+import logging
+import os
+import re
+import sys
+
+log = logging.getLogger(__name__)
+
+#: The active :class:`MemoryBudget` (None if the memory is not limited)
+_active = None
+
+#: Bytes of a text value held by pandas (a Python string object plus its pointer)
+TEXT_BYTES = 64
+
+#: Copies of the records held at once while converting log files (the parsed
+#: DataFrames, their concatenation and the converted columns)
+CONVERSION_COPIES = 3
+
+#: Copies of the records held at once while merging or processing a dataset in memory
+#: (the input variables plus the derived ones)
+PROCESSING_COPIES = 2
+
+#: Fraction of the budget that a dask chunk of all variables may take; several chunks
+#: are processed at once by the threads of dask
+CHUNK_SHARE = 1 / 8
+
+#: Share of the budget that remains available however much is used already
+MIN_AVAILABLE = 1 / 4
+
+
+class MemoryBudget:
+    """The number of bytes the process may use and derived batch and chunk sizes."""
+
+    def __init__(self, limit):
+        self.limit = parse_size(limit)
+        if self.limit <= 0:
+            raise ValueError(f"The memory budget must be positive, got {limit}.")
+
+    def available(self) -> int:
+        """Return the bytes left of the budget (at least :data:`MIN_AVAILABLE` of it)."""
+        used = current_rss() or 0
+        return max(self.limit - used, int(self.limit * MIN_AVAILABLE))
+
+    def fits(self, nbytes: int, copies: int = 1) -> bool:
+        """Return whether `copies` of `nbytes` fit into the available memory."""
+        return nbytes * copies <= self.available()
+
+    def rows(self, bytes_per_row: int, share: float = CHUNK_SHARE) -> int:
+        """Return the number of rows of `bytes_per_row` that fit into `share` of the available memory."""
+        return max(int(self.available() * share) // max(bytes_per_row, 1), 1)
+
+    def batches(self, items, sizes, copies: int = 1) -> list[list]:
+        """Split `items` into consecutive batches whose `sizes` add up to the available memory.
+
+        Items that do not fit on their own form a batch of their own.
+        """
+        available = self.available()
+        batches, batch, total = [], [], 0
+        for item, size in zip(items, sizes):
+            if batch and total + size * copies > available:
+                batches.append(batch)
+                batch, total = [], 0
+            if size * copies > available:
+                log.warning(
+                    f"⚠️  {item} needs about {format_size(size * copies)}, "
+                    f"more than the available {format_size(available)}."
+                )
+            batch.append(item)
+            total += size * copies
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def report(self) -> str:
+        """Return a line comparing the peak memory of the process with the budget."""
+        peak = peak_rss()
+        if peak is None:
+            return f"Memory budget {format_size(self.limit)} (peak memory not available on this platform)"
+        message = f"Peak memory {format_size(peak)} of {format_size(self.limit)} ({peak / self.limit:.0%})"
+        if peak > self.limit:
+            message = f"⚠️  {message}: budget exceeded"
+        return message
+
+
+@contextmanager
+def memory_budget(limit):
+    """Limit the memory of the processing chain within the context to `limit` (bytes or e.g. ``"2GB"``).
+
+    The :class:`MemoryBudget` is yielded.
+    """
+    global _active
+
+    budget = MemoryBudget(limit)
+    previous, _active = _active, budget
+    try:
+        yield budget
+    finally:
+        _active = previous
+        log.info(budget.report())
+
+
+def active(limit=None) -> MemoryBudget | None:
+    """Return a budget of `limit`, if given, or else the active budget (None if there is none)."""
+    return MemoryBudget(limit) if limit is not None else _active
+
+
+def text_bytes_per_row(lines, separator=",") -> int:
+    """Estimate the bytes per record that pandas needs for the records in `lines`.
+
+    Numeric fields take 8 bytes, all others :data:`TEXT_BYTES`. The largest estimate of
+    all lines is returned.
+    """
+    estimate = 0
+    for line in lines:
+        fields = line.rstrip("\r\n").split(separator)
+        estimate = max(estimate, sum(8 if _is_number(field) else TEXT_BYTES for field in fields))
+    return estimate
+
+
+def dataset_bytes_per_row(ds, dim: str = "time") -> int:
+    """Return the bytes per record along `dim` of all variables of the dataset `ds`."""
+    total = 0
+    for var in ds.variables.values():
+        if dim not in var.dims:
+            continue
+        per_row = var.dtype.itemsize if var.dtype.kind not in "OUS" else TEXT_BYTES
+        for d, size in zip(var.dims, var.shape):
+            if d != dim:
+                per_row *= size
+        total += per_row
+    return total
+
+
+def current_rss() -> int | None:
+    """Return the resident set size of the process in bytes (None where unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def peak_rss() -> int | None:
+    """Return the peak resident set size of the process in bytes (None where unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def parse_size(size) -> int:
+    """Return the number of bytes of `size`, given as number or string such as ``"10GB"``.
+
+    Example
+    -------
+    >>> parse_size("1.5 kB")
+    1536
+    """
+    if isinstance(size, int | float):
+        return int(size)
+    match = re.fullmatch(r"\s*([\d.]+)\s*([kKMGT]?)i?B?\s*", size)
+    if match is None:
+        raise ValueError(f"Invalid size: {size}")
+    factor = 1024 ** " KMGT".index(match.group(2).upper() or " ")
+    return int(float(match.group(1)) * factor)
+
+
+def format_size(nbytes: int) -> str:
+    """Return `nbytes` in human-readable form.
+
+    Example
+    -------
+    >>> format_size(3 * 1024**3)
+    '3.0 GB'
+    """
+    for unit in ("B", "kB", "MB", "GB"):
+        if abs(nbytes) < 1024:
+            return f"{nbytes:.0f} {unit}" if unit == "B" else f"{nbytes:.1f} {unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f} TB"
+
+
+def _is_number(text: str) -> bool:
+    """Return whether `text` is parsed as number (empty fields become NaN)."""
+    if not text.strip():
+        return True
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
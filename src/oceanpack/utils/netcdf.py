@@ -0,0 +1,115 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+"""Incremental netCDF writing: appending records along the (unlimited) time dimension,
+adding or updating single variables in place, and atomic replacement of whole files.
+"""
+
+import logging
+import os
+from pathlib import Path
+import tempfile
+
+import numpy as np
+import xarray as xr
+
+log = logging.getLogger(__name__)
+
+# Fixed time encoding for files that grow over time. xarray would otherwise derive the
+# units from the first block, which may not be able to represent later time stamps.
+TIME_ENCODING = {"units": "seconds since 1970-01-01 00:00:00", "dtype": "float64"}
+
+
+def append_along_time(ds: xr.Dataset, path, dim: str = "time"):
+    """Append the records of `ds` along `dim` to the netCDF file at `path`.
+
+    If the file does not exist yet, it is created with `dim` as unlimited dimension.
+    Otherwise the values are written into the existing variables behind the last
+    record, so the file content is never rewritten. All variables along `dim` must
+    already exist in the file.
+    """
+    path = Path(path)
+    if not path.exists():
+        encoding = {dim: TIME_ENCODING} if np.issubdtype(ds[dim].dtype, np.datetime64) else {}
+        ds.to_netcdf(path, unlimited_dims=[dim], encoding=encoding)
+        return
+
+    import netCDF4
+
+    with netCDF4.Dataset(path, mode="a") as nc:
+        start = len(nc.dimensions[dim])
+        stop = start + ds.sizes[dim]
+        missing = [
+            name for name in ds.variables if dim in ds[name].dims and name not in nc.variables
+        ]
+        if missing:
+            raise ValueError(f"Variables {missing} do not exist in {path}.")
+        for name, var in ds.variables.items():
+            if dim not in var.dims:
+                continue
+            ncvar = nc.variables[str(name)]
+            index = tuple(slice(start, stop) if d == dim else slice(None) for d in var.dims)
+            ncvar[index] = _encode(var, ncvar)
+    log.info(f"Appended {ds.sizes[dim]} records to {path}")
+
+
+def _encode(var: xr.Variable, ncvar):
+    """Encode the values of `var` for writing into the existing netCDF variable `ncvar`."""
+    values = var.values
+    if np.issubdtype(values.dtype, np.datetime64):
+        calendar = getattr(ncvar, "calendar", "proleptic_gregorian")
+        values, _, _ = xr.coding.times.encode_cf_datetime(
+            values, ncvar.units, calendar, dtype=ncvar.dtype
+        )
+    return values
+
+
+def update_variables(ds: xr.Dataset, path, start: int = 0, rows: int | None = None):
+    """Write the data variables of `ds` into the existing netCDF file at `path`.
+
+    Variables that already exist in the file are overwritten with the values and
+    attributes of `ds`, all others are added. Other variables in the file are
+    neither read nor rewritten. The values are written along the first dimension from
+    index `start` on, so only a part of the records can be updated. If `rows` is given,
+    the values are read from `ds` and written in blocks of that many records.
+    """
+    import netCDF4
+
+    with netCDF4.Dataset(path, mode="a") as nc:
+        added = 0
+        for name, var in ds.data_vars.items():
+            if name not in nc.variables:
+                fill_value = np.nan if np.issubdtype(var.dtype, np.floating) else None
+                nc.createVariable(str(name), var.dtype, var.dims, fill_value=fill_value)
+                added += 1
+            ncvar = nc.variables[name]
+            block = rows or max(var.shape[0], 1)
+            for offset in range(0, var.shape[0], block):
+                values = var.variable[offset : offset + block]
+                index = (slice(start + offset, start + offset + values.shape[0]),) + (
+                    slice(None),
+                ) * (var.ndim - 1)
+                ncvar[index] = _encode(values, ncvar)
+            ncvar.setncatts({k: v for k, v in var.attrs.items() if not k.startswith("_")})
+    log.info(f"Updated {len(ds.data_vars) - added} and added {added} variables in {path}")
+
+
+def atomic_to_netcdf(ds: xr.Dataset, path, **kwargs):
+    """Write `ds` to `path` via a temporary file in the same directory.
+
+    The temporary file replaces `path` only after it was written completely, so a
+    crash never leaves a partially written file behind. `kwargs` are passed on to
+    :meth:`xarray.Dataset.to_netcdf`.
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        ds.to_netcdf(tmp, **kwargs)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
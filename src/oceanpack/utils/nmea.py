@@ -0,0 +1,362 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+r"""Vectorized parsing of NMEA-style records, such as the ``$PSDS0`` records of OceanView.
+
+A record is a line of comma-separated fields that starts with a tag (e.g. ``$PSDS0``)
+and may end with a checksum ``*hh``, the XOR of all characters between ``$`` and ``*``
+as two hexadecimal digits. :func:`parse_records` works on a whole block of bytes at
+once: the record boundaries, checksums and fields are found with :mod:`numpy` array
+operations instead of line by line, and the numeric fields are parsed straight into
+typed arrays.
+
+Records that are damaged (wrong checksum, wrong number of fields, or an invalid date
+or time) are not parsed but returned separately, so that a few corrupted lines do not
+turn whole columns into strings.
+
+>>> result = parse_records(
+...     b"$GPXXX,2020-01-01,00:00:10,1.5,7*53\r\n$GPXXX,2020-01-01,00:00:20,2.5,8*00\r\n",
+...     ["tag", "date", "time", "a", "b"],
+...     tag=b"$GPXXX",
+... )
+>>> result.data.index[0], result.data.to_dict("list")
+(Timestamp('2020-01-01 00:00:10'), {'a': [1.5], 'b': [7]})
+>>> result.rejected
+{'checksum': [b'$GPXXX,2020-01-01,00:00:20,2.5,8*00\r\n']}
+"""
+
+from dataclasses import dataclass, field
+import logging
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+#: Value of each byte as hexadecimal digit, or -1
+_HEX = np.full(256, -1, dtype=np.int16)
+_HEX[np.frombuffer(b"0123456789", np.uint8)] = np.arange(10)
+_HEX[np.frombuffer(b"ABCDEF", np.uint8)] = np.arange(10, 16)
+_HEX[np.frombuffer(b"abcdef", np.uint8)] = np.arange(10, 16)
+
+_POW10 = 10 ** np.arange(19, dtype=np.int64)
+#: Mantissas with more digits may not fit into an int64
+_MAX_DIGITS = 18
+#: Mantissas with up to this many digits are exact in float64
+_FLOAT_DIGITS = 15
+#: Longer fields are not parsed as numbers
+_MAX_WIDTH = 24
+
+#: Reasons for rejecting a line, by their code
+REASONS = ["", "tag", "checksum", "fields", "time"]
+
+
+@dataclass
+class ParsedRecords:
+    """The result of :func:`parse_records`."""
+
+    #: The fields of the valid records, indexed by time
+    data: pd.DataFrame
+    #: The rejected lines (with their line breaks) by the reason of their rejection
+    rejected: dict[str, list[bytes]] = field(default_factory=dict)
+
+    @property
+    def counts(self) -> dict[str, int]:
+        """The number of rejected lines by reason."""
+        return {reason: len(lines) for reason, lines in self.rejected.items()}
+
+
+def parse_records(
+    data: bytes,
+    names,
+    tag: bytes = b"$PSDS0",
+    date: str = "date",
+    time: str = "time",
+    block_size: int = 1 << 21,
+) -> ParsedRecords:
+    """Parse the records in `data` into typed columns.
+
+    Parameters
+    ----------
+    data : bytes
+        Lines of records. A last line without line break is parsed as well.
+    names : list[str]
+        The names of the fields of a record, including the tag.
+    tag : bytes
+        The first field of the records. Other lines are rejected as ``"tag"``.
+    date, time : str
+        The names of the fields with the date (``YYYY-MM-DD``) and time (``HH:MM:SS``)
+        of the record, which form the index.
+    block_size : int
+        `data` is parsed in blocks of about this many bytes, which fit into the CPU cache.
+
+    Returns
+    -------
+    ParsedRecords
+        The valid records, with one int64 (or float64, if any value has decimals or is
+        missing) column for each numeric field; fields without any numeric value, such as
+        the tag, are left out. Lines without checksum are not checked, empty lines are
+        skipped.
+    """
+    names = list(names)
+    blocks = []
+    rejected = {}
+    start = 0
+    while start < len(data):
+        stop = data.find(b"\n", start + block_size) + 1 or len(data)
+        block = data[start:stop]
+        blocks.append(_parse_block(block, names, tag, date, time))
+        for reason, lines in blocks[-1][2].items():
+            rejected.setdefault(reason, []).extend(lines)
+        start = stop
+
+    index = pd.DatetimeIndex(np.concatenate([b[0] for b in blocks]) if blocks else [], name="time")
+    columns = {}
+    for k, name in enumerate(names):
+        if k == 0 or name in (date, time):
+            continue
+        parts = [b[1][name] for b in blocks]
+        if not any(numeric.any() for _, numeric, _, _ in parts):
+            log.debug(f"{name} has no numeric values and is skipped.")
+            continue
+        if (invalid := sum(n_invalid for *_, n_invalid in parts)) > 0:
+            log.warning(f"⚠️  {invalid} values of {name} are not numbers and are set to NaN.")
+        values = np.concatenate([values for values, *_ in parts])
+        integer = all(numeric.all() and is_int.all() for _, numeric, is_int, _ in parts)
+        columns[name] = values.astype(np.int64) if integer else values
+    return ParsedRecords(pd.DataFrame(columns, index=index), rejected)
+
+
+def _parse_block(data: bytes, names: list[str], tag: bytes, date: str, time: str):
+    """Parse the records of a block of lines.
+
+    Returns the times of the valid records, the result of :func:`_parse_numbers` with
+    the number of invalid values for each field, and the rejected lines by reason.
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    # padded, so that fields of up to _MAX_WIDTH bytes can be taken from any position
+    padded = np.concatenate([buf, np.zeros(_MAX_WIDTH, np.uint8)])
+    ends = np.flatnonzero(buf == ord("\n"))
+    if len(buf) and buf[-1] != ord("\n"):
+        ends = np.append(ends, len(buf))
+    starts = np.concatenate([[0], ends[:-1] + 1]).astype(np.int64)
+    # the end of the line without line break
+    stops = ends - ((ends > starts) & (padded[ends - 1] == ord("\r")))
+    nonempty = stops > starts
+    starts, stops, ends = starts[nonempty], stops[nonempty], ends[nonempty]
+    reason = np.zeros(len(starts), dtype=np.int8)
+
+    prefix = _columns(padded, starts, len(tag))
+    has_tag = (stops - starts >= len(tag)) & _all(prefix == np.frombuffer(tag, np.uint8)[:, None])
+    reason[~has_tag] = REASONS.index("tag")
+
+    # checksum: the XOR of the bytes between "$" and "*" of each line
+    stars = np.flatnonzero(buf == ord("*"))
+    last = np.searchsorted(stars, stops) - 1
+    star = stars[last] if len(stars) else np.full(len(starts), -1)
+    has_star = (last >= 0) & (star >= starts)
+    content_stops = np.where(has_star, star, stops)
+    checked = np.flatnonzero(has_star & (reason == 0))
+    bounds = np.column_stack([starts[checked] + 1, star[checked]]).ravel()
+    actual = np.bitwise_xor.reduceat(buf, bounds)[::2] if len(bounds) else np.empty(0, np.uint8)
+    digits = _HEX[_columns(padded, star[checked] + 1, 2)]
+    expected = digits[0] * 16 + digits[1]
+    valid = (stops[checked] == star[checked] + 3) & _all(digits >= 0) & (actual == expected)
+    reason[checked[~valid]] = REASONS.index("checksum")
+
+    # fields: separated by the commas before the checksum
+    commas = np.flatnonzero(buf == ord(","))
+    before = np.searchsorted(commas, starts)
+    n_commas = np.searchsorted(commas, content_stops) - before
+    reason[(reason == 0) & (n_commas != len(names) - 1)] = REASONS.index("fields")
+    ok = np.flatnonzero(reason == 0)
+    positions = commas[before[ok] + np.arange(len(names) - 1)[:, None]]
+    field_starts = np.vstack([starts[ok], positions + 1])
+    field_stops = np.vstack([positions, content_stops[ok]])
+
+    i, j = names.index(date), names.index(time)
+    index, valid = _parse_datetime(
+        padded, field_starts[i], field_stops[i], field_starts[j], field_stops[j]
+    )
+    reason[ok[~valid]] = REASONS.index("time")
+    if not valid.all():
+        field_starts, field_stops, index = (
+            field_starts[:, valid],
+            field_stops[:, valid],
+            index[valid],
+        )
+
+    columns = {}
+    for k, name in enumerate(names):
+        if k == 0 or name in (date, time):
+            continue
+        values, numeric, is_int = _parse_numbers(padded, field_starts[k], field_stops[k])
+        n_invalid = ((field_stops[k] > field_starts[k]) & ~numeric).sum()
+        columns[name] = values, numeric, is_int, n_invalid
+
+    rejected = {}
+    for code in np.unique(reason[reason > 0]):
+        rejected[REASONS[code]] = [
+            data[starts[k] : ends[k] + 1] for k in np.flatnonzero(reason == code)
+        ]
+    return index, columns, rejected
+
+
+def _columns(padded: np.ndarray, starts: np.ndarray, width: int) -> np.ndarray:
+    """Return the `width` bytes from each of `starts` as the columns of a (width, n) array.
+
+    With one row per character position, the reductions over the characters of the
+    fields run along whole rows, which is much faster than along many short rows.
+    `padded` must extend `width` bytes past all `starts`.
+    """
+    chars = np.empty((width, len(starts)), np.uint8)
+    for k in range(width):
+        np.take(padded, starts + k, out=chars[k])
+    return chars
+
+
+def _all(array: np.ndarray) -> np.ndarray:
+    """Return whether all rows of the (width, n) `array` are true, for each column."""
+    return np.logical_and.reduce(array, axis=0) if len(array) else np.ones(array.shape[1], bool)
+
+
+def _fixed_digits(padded, starts, stops, pattern: bytes):
+    """Return the digits of fields of the form `pattern` (``0`` for a digit) and whether each field matches."""
+    chars = _columns(padded, starts, len(pattern))
+    template = np.frombuffer(pattern, np.uint8)
+    digits = chars - np.uint8(ord("0"))
+    matches = np.where((template == ord("0"))[:, None], digits < 10, chars == template[:, None])
+    return digits.astype(np.int64), (stops - starts == len(pattern)) & _all(matches)
+
+
+def _number(digits: np.ndarray, rows) -> np.ndarray:
+    """Return the decimal number formed by the `rows` of `digits`."""
+    return sum(digits[row] * 10 ** (len(rows) - 1 - k) for k, row in enumerate(rows))
+
+
+def _parse_datetime(padded, date_starts, date_stops, time_starts, time_stops):
+    """Parse ``YYYY-MM-DD`` and ``HH:MM:SS`` fields into datetime64[ns] and return them with their validity."""
+    date, valid_date = _fixed_digits(padded, date_starts, date_stops, b"0000-00-00")
+    clock, valid_clock = _fixed_digits(padded, time_starts, time_stops, b"00:00:00")
+    year, month, day = _number(date, [0, 1, 2, 3]), _number(date, [5, 6]), _number(date, [8, 9])
+    hour, minute, second = _number(clock, [0, 1]), _number(clock, [3, 4]), _number(clock, [6, 7])
+    months = (year - 1970) * 12 + np.clip(month, 1, 12) - 1
+    first = months.astype("datetime64[M]").astype("datetime64[D]")
+    length = (months + 1).astype("datetime64[M]").astype("datetime64[D]") - first
+    valid = (
+        valid_date & valid_clock
+        & (month >= 1) & (month <= 12) & (day >= 1) & (day <= length.astype(np.int64))
+        & (hour < 24) & (minute < 60) & (second < 60)
+    )  # fmt: skip
+    seconds = (hour * 3600 + minute * 60 + second).astype("timedelta64[s]")
+    index = (first + (day - 1).astype("timedelta64[D]")).astype("datetime64[ns]") + seconds
+    return index, valid
+
+
+def _parse_numbers(padded, starts, stops):
+    """Parse decimal fields such as ``-12.50`` into float64.
+
+    Returns the values (NaN where a field is empty or not a number), whether each field
+    is a number, and whether it is an integer (without decimal point).
+
+    The digits of each field form an integer mantissa (the place value of each digit
+    follows from its distance to the decimal point), which is divided by a power of ten
+    once. This gives the correctly rounded value, as :func:`float` does. Fields with more
+    than 18 digits (or 24 characters) are not parsed.
+    """
+    n = len(starts)
+    lengths = stops - starts
+    width = min(int(lengths.max(initial=0)), _MAX_WIDTH)
+    if width == 0:
+        return np.full(n, np.nan), np.zeros(n, bool), np.zeros(n, bool)
+    if (aligned := _parse_aligned(padded, starts, stops, width)) is not None:
+        return aligned
+
+    chars = _columns(padded, starts, width)
+    digits = chars - np.uint8(ord("0"))
+    position = np.arange(width)[:, None]
+    inside = position < lengths
+    is_digit = (digits < 10) & inside
+    is_dot = (chars == ord(".")) & inside
+    has_dot = is_dot.any(axis=0)
+    # the position of the decimal point, assuming there is at most one (else, it is not a number)
+    dot = np.where(has_dot, is_dot.argmax(axis=0), lengths)
+    decimals = np.where(has_dot, lengths - dot - 1, 0)
+    signed = (chars[0] == ord("-")) | (chars[0] == ord("+"))
+    n_digits = is_digit.sum(axis=0)
+    numeric = (
+        (n_digits == lengths - has_dot - signed)
+        & (n_digits > 0)
+        & (n_digits <= _MAX_DIGITS)
+        & (lengths <= _MAX_WIDTH)
+    )
+    digits = np.where(is_digit, digits, np.uint8(0))
+    place = np.clip(dot - position - (position < dot) + decimals, 0, _MAX_DIGITS)
+    mantissa = (digits * 10.0**place).sum(axis=0)
+    if not (exact := n_digits <= _FLOAT_DIGITS).all():
+        mantissa[~exact] = (digits[:, ~exact] * _POW10[place[:, ~exact]]).sum(axis=0)
+    values = mantissa / 10.0**decimals
+    values = np.where(chars[0] == ord("-"), -values, values)
+    return np.where(numeric, values, np.nan), numeric, ~has_dot
+
+
+def _parse_aligned(padded, starts, stops, width):
+    """Parse fields that all have the same number of decimals.
+
+    This is the common case of numbers written with a fixed format. Aligned at their
+    ends, the place values of the digits are the same in all fields, so the mantissas
+    are a single matrix product. Returns None if any field (other than an empty one) is
+    not of this form, and :func:`_parse_numbers` parses the fields then.
+    """
+    n = len(starts)
+    lengths = stops - starts
+    if stops.min() < width:
+        return None
+    chars = _columns(padded, stops - width, width)
+    digits = chars - np.uint8(ord("0"))
+    # the decimal point of the longest field is where all fields must have theirs
+    longest = int(np.argmax(lengths))
+    dots = (
+        np.flatnonzero(chars[width - lengths[longest] :, longest] == ord("."))
+        + width
+        - lengths[longest]
+    )
+    if len(dots) > 1 or width - len(dots) > _MAX_DIGITS:
+        return None
+    dot = dots[0] if len(dots) else width
+    first = padded[starts]
+    negative = first == ord("-")
+    signed = negative | (first == ord("+"))
+    # the first digit of each field
+    offset = width - lengths + signed
+    is_digit = digits < 10
+    varying = lengths.min() < width or signed.any()
+    if len(dots):
+        if not ((chars[dot] == ord(".")) | (lengths == 0)).all():
+            return None
+        is_digit[dot] = True
+    if varying:
+        inside = np.arange(width)[:, None] >= offset
+        conform = _all(is_digit | ~inside) & (offset <= dot) & (lengths - signed > len(dots))
+    else:
+        conform = _all(is_digit) & (width > len(dots))
+    numeric = lengths > 0
+    if not (conform | ~numeric).all():
+        return None
+
+    position = np.arange(width)
+    decimals = max(width - dot - 1, 0)
+    exponent = dot - position - (position < dot) + decimals
+    weights = np.where(position == dot, 0, _POW10[np.clip(exponent, 0, _MAX_DIGITS)])
+    if varying:
+        digits = np.where(inside, digits, np.uint8(0))
+    if width - len(dots) <= _FLOAT_DIGITS:
+        mantissa = weights.astype(np.float64) @ digits
+    else:
+        mantissa = (weights @ digits.astype(np.int64)).astype(np.float64)
+    values = mantissa / 10.0**decimals
+    values = np.where(negative, -values, values)
+    return np.where(numeric, values, np.nan), numeric, np.full(n, not len(dots))
@@ -0,0 +1,142 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+"""Export of datasets to Parquet files partitioned by day, for analytics engines such as DuckDB or Spark.
+
+The records are written into a Hive-style directory tree, one file per day (and
+optionally per cruise)::
+
+    output/cruise=MSM-01/date=2020-01-01/part-0.parquet
+
+so that queries on a time window or a cruise only read the matching files. Within a
+file, the records are written block by block as row groups of :data:`ROW_GROUP_ROWS`
+records, whose min/max statistics let the engines skip row groups outside a time
+window, and only one block is held in memory at a time. Writing Parquet requires
+:mod:`pyarrow`, which is an optional dependency.
+"""
+
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+#: Records per row group (about 4.5 hours at 1 Hz): small enough for selective
+#: statistics, large enough for efficient scans
+ROW_GROUP_ROWS = 16384
+
+#: Variables of few distinct values, which are dictionary-encoded
+DICTIONARY_VARIABLES = ("STATUS", "ANA_state", "Error", "data_mode")
+
+
+def write_parquet(ds, path, cruise: str | None = None, row_group_rows: int = ROW_GROUP_ROWS):
+    """Write the variables along time of `ds` to Parquet files partitioned by day below `path`.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        The dataset, sorted by time. Dask-backed or lazily opened datasets are computed
+        block by block.
+    path : path-like
+        The output directory. Files of other days (or cruises) in it are kept, the
+        files of the days in `ds` are replaced.
+    cruise : str, optional
+        Partition the files by this cruise as well (``cruise=<name>/date=<day>``).
+        Defaults to the ``cruise`` attribute of `ds`, if any.
+    row_group_rows : int
+        Records per row group.
+
+    Returns
+    -------
+    list[Path]
+        The written files.
+
+    Notes
+    -----
+    The time is stored as 64-bit integer timestamps in microseconds (the Parquet
+    ``TIMESTAMP(MICROS)`` type, which all engines read), the variables with few distinct
+    values (:data:`DICTIONARY_VARIABLES`) are dictionary-encoded. The units and long
+    names of the variables are kept as field metadata.
+    """
+    pa, pq = _import_pyarrow()
+
+    path = Path(path)
+    cruise = cruise or ds.attrs.get("cruise")
+    columns = [
+        str(name) for name, var in ds.variables.items() if var.dims == ("time",) and name != "time"
+    ]
+    skipped = [str(name) for name in ds.data_vars if name not in columns]
+    if skipped:
+        log.warning(
+            f"⚠️  Variables {skipped} do not have time as only dimension and are not written to Parquet."
+        )
+    times = ds.indexes["time"]
+    if not times.is_monotonic_increasing:
+        raise ValueError("The dataset must be sorted by time to be written to Parquet.")
+
+    days = times.normalize()
+    starts = np.concatenate([[0], np.flatnonzero(days[1:] != days[:-1]) + 1])
+    stops = np.append(starts[1:], len(times))
+    written = []
+    for start, stop in zip(starts, stops):
+        directory = path / f"cruise={cruise}" if cruise else path
+        file = directory / f"date={days[start]:%Y-%m-%d}" / "part-0.parquet"
+        file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = file.with_name(f".{file.name}.tmp")
+        writer = None
+        try:
+            for first in range(start, stop, row_group_rows):
+                block = (
+                    ds[columns].isel(time=slice(first, min(first + row_group_rows, stop))).compute()
+                )
+                table = pa.table(
+                    {
+                        "time": block.indexes["time"].values.astype("datetime64[us]"),
+                        **{name: block[name].values for name in columns},
+                    }
+                )
+                if writer is None:
+                    schema = _schema(pa, table.schema, ds)
+                    dictionary = [name for name in DICTIONARY_VARIABLES if name in columns]
+                    writer = pq.ParquetWriter(
+                        tmp, schema, use_dictionary=dictionary, write_statistics=True
+                    )
+                writer.write_table(table.cast(writer.schema), row_group_size=row_group_rows)
+        except BaseException:
+            if writer is not None:
+                writer.close()
+            tmp.unlink(missing_ok=True)
+            raise
+        writer.close()
+        os.replace(tmp, file)
+        written.append(file)
+    log.info(f"Wrote {len(times)} records into {len(written)} Parquet files below {path}")
+    return written
+
+
+def _schema(pa, schema, ds):
+    """Return `schema` with the units and long names of the variables of `ds` as field metadata."""
+    fields = []
+    for field in schema:
+        attrs = ds[field.name].attrs if field.name in ds.variables else {}
+        metadata = {key: str(attrs[key]) for key in ("unit", "units", "long_name") if key in attrs}
+        fields.append(field.with_metadata(metadata) if metadata else field)
+    metadata = {str(key): str(value) for key, value in ds.attrs.items()}
+    return pa.schema(fields, metadata=metadata)
+
+
+def _import_pyarrow():
+    """Return the modules :mod:`pyarrow` and :mod:`pyarrow.parquet`."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError(
+            "Writing Parquet files requires pyarrow (pip install 'oceanpack[parquet]')."
+        ) from error
+    return pa, pq
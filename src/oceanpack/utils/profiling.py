@@ -0,0 +1,198 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+"""Per-stage profiling of the processing chain.
+
+The stages of the chain (reading, cleaning, merging, each processing step, writing)
+are wrapped in :func:`stage`. As long as no profiler is active, this costs a single
+check. Within :func:`profiling`, each stage records its wall and CPU time, the number
+of rows processed, the bytes read and written by the process and the peak resident
+memory, and a JSON report is written when the profiling ends.
+
+Only the standard library is used here, so the CLI can import this module without
+loading the scientific stack.
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import functools
+import json
+import logging
+from pathlib import Path
+import sys
+import time
+
+from oceanpack.utils.memory import peak_rss
+
+log = logging.getLogger(__name__)
+
+#: The active :class:`Profiler` (None if profiling is off)
+_active = None
+
+
+class Profiler:
+    """Collect the measurements of the stages run while the profiler is active.
+
+    Stages may be nested (e.g. ``read_csv`` within ``load_data``); the measurements of
+    an outer stage include those of its inner stages.
+    """
+
+    def __init__(self, name: str = "oceanpack"):
+        self.name = name
+        self.records = []
+        self.started = datetime.now(timezone.utc)  # noqa: UP017 (Python 3.10)
+        self._start = _snapshot()
+        self._end = None
+
+    def stop(self):
+        """Stop the overall measurement."""
+        self._end = _snapshot()
+
+    def summary(self) -> list[dict]:
+        """Return the measurements aggregated per stage, in the order the stages first ran."""
+        stages = {}
+        for record in self.records:
+            total = stages.setdefault(record["name"], {"name": record["name"], "calls": 0})
+            total["calls"] += 1
+            for key in ("wall_time", "cpu_time", "rows", "bytes_read", "bytes_written"):
+                if record[key] is not None:
+                    total[key] = total.get(key, 0) + record[key]
+            if record["peak_rss"] is not None:
+                total["peak_rss"] = max(total.get("peak_rss", 0), record["peak_rss"])
+        for total in stages.values():
+            if total.get("rows") and total.get("wall_time"):
+                total["rows_per_second"] = total["rows"] / total["wall_time"]
+        return list(stages.values())
+
+    def report(self) -> dict:
+        """Return the report with the total and the per-stage measurements."""
+        return {
+            "name": self.name,
+            "command": sys.argv,
+            "started": self.started.isoformat(timespec="seconds"),
+            "total": _difference(self._start, self._end or _snapshot()),
+            "stages": self.summary(),
+        }
+
+    def write(self, directory="logs") -> Path:
+        """Write the report as JSON into `directory` and return the path of the file."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"profile_{self.name}_{self.started:%Y%m%dT%H%M%S_%f}.json"
+        path.write_text(json.dumps(self.report(), indent=2))
+        return path
+
+
+@contextmanager
+def profiling(directory="logs", name: str = "oceanpack", cprofile: bool = False):
+    """Profile the stages run within the context and write the report into `directory`.
+
+    If `cprofile` is set, the function-level statistics of :mod:`cProfile` are dumped
+    next to the report (``.prof``). They can be explored with ``snakeviz`` or turned
+    into a flame graph with ``flameprof``. The profiler is yielded; its attribute
+    ``report_path`` holds the path of the report once the context is left.
+    """
+    global _active
+
+    profiler = Profiler(name)
+    previous, _active = _active, profiler
+    function_profiler = None
+    if cprofile:
+        import cProfile
+
+        function_profiler = cProfile.Profile()
+        function_profiler.enable()
+    try:
+        yield profiler
+    finally:
+        if function_profiler is not None:
+            function_profiler.disable()
+        _active = previous
+        profiler.stop()
+        profiler.report_path = profiler.write(directory)
+        log.info(f"Profile written to {profiler.report_path}")
+        if function_profiler is not None:
+            function_profiler.dump_stats(profiler.report_path.with_suffix(".prof"))
+
+
+@contextmanager
+def stage(name: str, rows: int | None = None):
+    """Measure the code within the context as stage `name` of the active profiler.
+
+    The record of the stage is yielded as dictionary, so the number of rows can also
+    be set once it is known (``record["rows"] = len(df)``). Without an active
+    profiler, nothing is measured.
+    """
+    profiler = _active
+    record = {"name": name, "rows": rows}
+    if profiler is None:
+        yield record
+        return
+    start = _snapshot()
+    try:
+        yield record
+    finally:
+        record.update(_difference(start, _snapshot()))
+        profiler.records.append(record)
+
+
+def profiled(rows=None):
+    """Decorator measuring each call of the decorated method as a stage named after it.
+
+    `rows` is an optional function that receives the instance (``self``) after the call
+    and returns the number of rows processed.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if _active is None:
+                return func(self, *args, **kwargs)
+            with stage(func.__name__) as record:
+                result = func(self, *args, **kwargs)
+                if rows is not None:
+                    record["rows"] = rows(self)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _snapshot() -> dict:
+    """Return the current times, I/O counters and peak memory of the process."""
+    return {
+        "wall_time": time.perf_counter(),
+        "cpu_time": time.process_time(),
+        **_io_counters(),
+        "peak_rss": peak_rss(),
+    }
+
+
+def _difference(start: dict, end: dict) -> dict:
+    """Return the measurements between the snapshots `start` and `end`."""
+    result = {}
+    for key in ("wall_time", "cpu_time", "bytes_read", "bytes_written"):
+        if start[key] is None or end[key] is None:
+            result[key] = None
+        else:
+            result[key] = end[key] - start[key]
+    result["peak_rss"] = end["peak_rss"]
+    return result
+
+
+def _io_counters() -> dict:
+    """Return the bytes read and written by the process so far (None where unavailable).
+
+    On Linux, these are the counters ``rchar`` and ``wchar`` of ``/proc/self/io``,
+    i.e. including reads served from the page cache.
+    """
+    try:
+        with open("/proc/self/io") as f:
+            counters = dict(line.split(":") for line in f)
+        return {"bytes_read": int(counters["rchar"]), "bytes_written": int(counters["wchar"])}
+    except (OSError, KeyError, ValueError):
+        return {"bytes_read": None, "bytes_written": None}
@@ -0,0 +1,198 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+"""Automated quality control tests producing WOCE-style quality flags.
+
+Every test works on plain arrays in O(n) (point-wise or with a sliding window), so it can
+be applied block by block. :func:`quality_control` runs the tests configured in
+:data:`QC_CONFIG` over a dataset, reading it in blocks with a sufficient overlap.
+"""
+
+import copy
+import logging
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from oceanpack.utils.helpers import status_segments
+
+log = logging.getLogger(__name__)
+
+GOOD = 2
+QUESTIONABLE = 3
+BAD = 4
+MISSING = 9
+
+FLAG_ATTRS = {
+    "flag_values": np.array([GOOD, QUESTIONABLE, BAD, MISSING], dtype=np.int8),
+    "flag_meanings": "good questionable bad missing",
+    "conventions": "WOCE quality flags",
+}
+
+#: Default test configuration. ``valid_range`` is checked point-wise (flag 4),
+#: ``spike`` is the maximum deviation from the rolling median over ``spike_window``
+#: (flag 4) and ``stuck`` is the minimum duration of a run of identical values
+#: (flag 3). The ``flow`` section flags the ``affects`` variables with ``flag``
+#: while the flow is below ``min``. The water flow is a 4-20 mA signal, so 4 mA
+#: (the live zero) means no flow.
+QC_CONFIG = {
+    "spike_window": "5min",
+    "variables": {
+        "CO2": {"valid_range": (100.0, 1000.0), "spike": 10.0, "stuck": "10min"},
+        "SBE45Temp": {"valid_range": (-2.5, 40.0), "spike": 0.5, "stuck": "30min"},
+        "SBE45Cond": {"valid_range": (0.0, 70.0), "spike": 1.0, "stuck": "30min"},
+        "CellPress": {"valid_range": (800.0, 1200.0), "spike": 5.0, "stuck": "30min"},
+        "AIN3_mA_Waterflow": {"valid_range": (0.0, 20.0)},
+        "FLOWgas": {"valid_range": (0.0, 1000.0)},
+    },
+    "flow": {
+        "AIN3_mA_Waterflow": {
+            "min": 4.5,
+            "affects": ["CO2", "SBE45Temp", "SBE45Cond"],
+            "flag": QUESTIONABLE,
+        },
+        "FLOWgas": {"min": 20.0, "affects": ["CO2"], "flag": BAD},
+    },
+}
+
+
+def range_test(x, valid_min, valid_max):
+    """Flag values outside [`valid_min`, `valid_max`] as bad.
+
+    Example
+    -------
+    >>> range_test(np.array([1.0, 5.0, 12.0]), 0, 10)
+    array([2, 2, 4], dtype=int8)
+    """
+    x = np.asarray(x, dtype=float)
+    return np.where((x < valid_min) | (x > valid_max), BAD, GOOD).astype(np.int8)
+
+
+def spike_test(time, x, threshold, window="5min"):
+    """Flag values deviating more than `threshold` from the centred rolling median as bad.
+
+    The rolling median over the time `window` is computed by pandas' sliding-window
+    algorithm, i.e. in O(n log w).
+    """
+    series = pd.Series(np.asarray(x, dtype=float), index=pd.DatetimeIndex(time))
+    median = series.rolling(pd.to_timedelta(window), center=True, min_periods=1).median()
+    deviation = np.abs(series.to_numpy() - median.to_numpy())
+    return np.where(deviation > threshold, BAD, GOOD).astype(np.int8)
+
+
+def stuck_test(time, x, duration="10min"):
+    """Flag runs of identical consecutive values lasting at least `duration` as questionable.
+
+    Example
+    -------
+    >>> time = pd.date_range("2020-01-01", periods=6, freq="1min")
+    >>> stuck_test(time, [1.0, 2.0, 2.0, 2.0, 2.0, 3.0], duration="3min")
+    array([2, 3, 3, 3, 3, 2], dtype=int8)
+    """
+    time = np.asarray(time, dtype="datetime64[ns]")
+    starts, stops, _ = status_segments(np.asarray(x, dtype=float))
+    run_duration = time[stops - 1] - time[starts]
+    stuck = run_duration >= pd.to_timedelta(duration).to_timedelta64()
+    return np.repeat(np.where(stuck, QUESTIONABLE, GOOD), stops - starts).astype(np.int8)
+
+
+def flow_test(flow, minimum, flag=BAD):
+    """Flag all samples with a flow below `minimum` (or without flow reading) with `flag`."""
+    flow = np.asarray(flow, dtype=float)
+    return np.where(~(flow >= minimum), flag, GOOD).astype(np.int8)
+
+
+def missing_test(x):
+    """Flag missing (NaN) values."""
+    return np.where(np.isnan(np.asarray(x, dtype=float)), MISSING, GOOD).astype(np.int8)
+
+
+def combine_flags(*flags):
+    """Combine flag arrays by keeping the worst flag of each sample."""
+    return np.maximum.reduce(flags).astype(np.int8)
+
+
+def quality_control(ds: xr.Dataset, config: dict | None = None, block_size: int | None = None):
+    """Run the quality control tests on `ds` and return the flags as ``<variable>_flag``.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Dataset with a ``time`` dimension.
+    config : dict, optional
+        Test configuration in the format of :data:`QC_CONFIG` (the default).
+        Variables missing in `ds` are skipped.
+    block_size : int, optional
+        Number of records processed at once. Each block is extended by an overlap
+        that covers the spike window and the stuck duration, so the results do not
+        depend on the block size. Defaults to the whole dataset.
+
+    Returns
+    -------
+    xr.Dataset
+        The flag variables.
+    """
+    config = copy.deepcopy(QC_CONFIG if config is None else config)
+    tests = {var: opts for var, opts in config["variables"].items() if var in ds.variables}
+    flows = {var: opts for var, opts in config.get("flow", {}).items() if var in ds.variables}
+    needed = sorted(set(tests) | set(flows))
+    if not needed:
+        log.warning("⚠️  Quality control skipped. None of the configured variables were found.")
+        return xr.Dataset()
+
+    halo = max(
+        [pd.to_timedelta(config["spike_window"]) / 2]
+        + [pd.to_timedelta(opts["stuck"]) for opts in tests.values() if "stuck" in opts]
+    )
+    times = ds.indexes["time"]
+    n = len(times)
+    block_size = n if block_size is None else max(int(block_size), 1)
+    flags = {var: np.empty(n, dtype=np.int8) for var in tests}
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        lo = times.searchsorted(times[start] - halo)
+        hi = times.searchsorted(times[stop - 1] + halo, side="right")
+        block = ds[needed].isel(time=slice(lo, hi)).load()
+        block_flags = _flag_block(block, tests, flows, config["spike_window"])
+        for var, values in block_flags.items():
+            flags[var][start:stop] = values[start - lo : stop - lo]
+
+    result = xr.Dataset(coords={"time": ds["time"]})
+    for var, values in flags.items():
+        result[f"{var}_flag"] = (
+            "time",
+            values,
+            dict(FLAG_ATTRS, long_name=f"Quality flag of {var}"),
+        )
+        counts = dict(zip(*np.unique(values, return_counts=True)))
+        log.info(f"QC {var}: " + ", ".join(f"flag {k}: {v}" for k, v in counts.items()))
+    return result
+
+
+def _flag_block(block: xr.Dataset, tests: dict, flows: dict, spike_window):
+    """Apply all configured tests to the (in-memory) `block`."""
+    time = block["time"].values
+    flags = {}
+    for var, opts in tests.items():
+        x = block[var].values
+        var_flags = [missing_test(x)]
+        if "valid_range" in opts:
+            var_flags.append(range_test(x, *opts["valid_range"]))
+        if "spike" in opts:
+            var_flags.append(spike_test(time, x, opts["spike"], window=spike_window))
+        if "stuck" in opts:
+            var_flags.append(stuck_test(time, x, opts["stuck"]))
+        flags[var] = var_flags
+
+    for flow_var, opts in flows.items():
+        flow_flags = flow_test(block[flow_var].values, opts["min"], opts.get("flag", BAD))
+        for var in opts["affects"]:
+            if var in flags:
+                flags[var].append(flow_flags)
+
+    return {var: combine_flags(*var_flags) for var, var_flags in flags.items()}
@@ -0,0 +1,723 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+"""Generation of synthetic OceanPack log files of arbitrary size.
+
+The generated files mimic the Analyzer and NetDI log files (with the ``@SENSOR``,
+``@NAME``, ``@UNIT``, ... header) and the OceanView stream files (``$PSDS0`` records
+with NMEA checksum). The system runs through the states of ``system_states.csv``
+(warming up, operating, zero and span calibrations, standby and wash phases) while the
+ship follows a smooth track. The files also contain the irregularities of real cruise
+data: headers repeated within a file after a restart of the logger, records that
+overlap between consecutive files, and truncated last lines.
+
+The records are generated and formatted chunk by chunk with NumPy and streamed to disk:
+each column is rendered into a matrix of ASCII characters plus a mask of the characters
+to keep, so a whole chunk of lines is assembled by a single boolean indexing.
+"""
+
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from oceanpack.utils.calibration import SPAN1_STATE, ZERO_STATE
+from oceanpack.utils.memory import parse_size
+
+log = logging.getLogger(__name__)
+
+SOURCE_TYPES = ("Analyzer", "NetDI", "Stream")
+
+#: Number of records generated and formatted at once
+CHUNK_SIZE = 100_000
+
+OPERATING_STATE = 5
+WASH_STATE = 3
+STANDBY_STATE = 4
+WARMING_UP_STATE = 19
+
+#: CO2 concentration (ppm) of the span gas
+SPAN_CONCENTRATION = 450.0
+
+_LI840 = {"kzero": 1.038285, "kspan1": 0.958418, "kspan2": 0.280827, "h2o_kzero": 1.019148}
+
+
+# ---------------------------------------------------------------------------------------
+# State machine and signals
+# ---------------------------------------------------------------------------------------
+
+
+def status_schedule(
+    duration,
+    seed: int = 0,
+    zero_interval: str = "6h",
+    span_interval: str = "24h",
+    calibration: str = "5min",
+):
+    """Return the phases of the system state (``STATUS``) for a record of the given `duration`.
+
+    After warming up, the system operates and is zero-calibrated every `zero_interval`;
+    every `span_interval`, the zero calibration is followed by a span calibration. Both
+    last `calibration`. Occasionally, the operation is interrupted by a wash phase or a
+    standby (followed by warming up).
+
+    Returns
+    -------
+    starts : numpy.ndarray
+        Start of each phase in seconds since the beginning of the record.
+    states : numpy.ndarray
+        State of each phase.
+
+    Example
+    -------
+    >>> starts, states = status_schedule("13h", seed=1)
+    >>> states[:6]
+    array([19,  5,  2,  5,  2,  5])
+    """
+    rng = np.random.default_rng(seed)
+    total = pd.to_timedelta(duration).total_seconds()
+    zero_every = pd.to_timedelta(zero_interval).total_seconds()
+    span_every = pd.to_timedelta(span_interval).total_seconds()
+    calibration = pd.to_timedelta(calibration).total_seconds()
+
+    phases = [(0.0, WARMING_UP_STATE)]
+    t = 600.0
+    last_span = 0.0
+    while t < total:
+        phases.append((t, OPERATING_STATE))
+        interruption = rng.random()
+        if interruption < 0.03:
+            t += rng.uniform(0.2, 0.8) * zero_every
+            phases.append((t, WASH_STATE))
+            t += 600.0
+            continue
+        if interruption < 0.06:
+            t += rng.uniform(0.2, 0.8) * zero_every
+            phases.append((t, STANDBY_STATE))
+            t += rng.uniform(1800.0, 3 * 3600.0)
+            phases.append((t, WARMING_UP_STATE))
+            t += 600.0
+            continue
+        t += zero_every
+        phases.append((t, ZERO_STATE))
+        t += calibration
+        if t - last_span >= span_every:
+            phases.append((t, SPAN1_STATE))
+            t += calibration
+            last_span = t
+    starts, states = zip(*phases)
+    return np.array(starts), np.array(states)
+
+
+def _co2_level(state, day):
+    """Return the CO2 concentration the analyzer is exposed to in each `state`."""
+    seawater = 390.0 + 25.0 * np.sin(2 * np.pi * day / 9) + 5.0 * np.sin(2 * np.pi * day)
+    level = np.where(state == OPERATING_STATE, seawater, 420.0)  # ambient air otherwise
+    level = np.where(state == ZERO_STATE, 0.0, level)
+    return np.where(state == SPAN1_STATE, SPAN_CONCENTRATION, level)
+
+
+def _sst(seconds):
+    day = seconds / 86400
+    return 14.0 + 4.0 * np.sin(2 * np.pi * day / 30) + 0.3 * np.sin(2 * np.pi * day)
+
+
+def signals(seconds, schedule, rng) -> dict:
+    """Return the physical signals at `seconds` after the beginning of the record.
+
+    All signals are functions of time (plus noise from `rng`), so a record can be
+    generated in independent chunks.
+    """
+    seconds = np.asarray(seconds, dtype=float)
+    starts, states = schedule
+    n = len(seconds)
+    day = seconds / 86400
+
+    phase = np.searchsorted(starts, seconds, side="right") - 1
+    status = states[phase]
+    since = seconds - starts[phase]
+    previous = states[np.maximum(phase - 1, 0)]
+    operating = status == OPERATING_STATE
+    pumping = ~np.isin(status, [STANDBY_STATE, WASH_STATE])
+
+    # ship track
+    lat = 45.0 + 15.0 * np.sin(2 * np.pi * day / 40)
+    lon = -20.0 + 25.0 * np.sin(2 * np.pi * day / 25 + 1.0)
+    north = 15.0 * 2 * np.pi / 40 * np.cos(2 * np.pi * day / 40) * 60  # nm/day
+    east = 25.0 * 2 * np.pi / 25 * np.cos(2 * np.pi * day / 25 + 1.0) * 60 * np.cos(np.radians(lat))
+
+    # the water reaches the SBE45 about a minute after passing the intake, slightly warmed
+    sst = _sst(seconds) + rng.normal(0, 0.002, n)
+    water_temp = _sst(seconds - 60.0) + 0.15 + rng.normal(0, 0.002, n)
+    salinity = 35.0 + 0.5 * np.sin(2 * np.pi * day / 17) + rng.normal(0, 0.002, n)
+
+    # CO2 relaxes from the level of the previous phase; the analyzer drifts slowly
+    level = _co2_level(status, day)
+    co2 = level + (_co2_level(previous, day) - level) * np.exp(-since / 90.0)
+    offset = 0.3 + 0.05 * day + 0.4 * np.sin(2 * np.pi * day / 7)
+    gain = 1.0 - 0.0005 * day
+    co2 = co2 / gain + offset + rng.normal(0, 0.3, n)
+
+    # raw detector counts consistent with the logged absorptance
+    absorptance = np.maximum(co2, 0) / 4050.0
+    k1, k2 = _LI840["kspan1"], _LI840["kspan2"]
+    zero_absorptance = (-k1 + np.sqrt(k1**2 + 4 * k2 * absorptance)) / (2 * k2)
+    co2_ref = 3_628_000 + rng.normal(0, 200, n)
+    h2o_ref = 2_125_000 + rng.normal(0, 200, n)
+
+    zero_starts = np.where(states == ZERO_STATE, starts, -np.inf)
+    span_starts = np.where(states == SPAN1_STATE, starts, -np.inf)
+    return {
+        "status": status,
+        "operating": operating,
+        "pump": pumping.astype(np.int64),
+        "valves": np.where(
+            operating, 0b101011111, np.where(status == ZERO_STATE, 0b011010111, 0b000000111)
+        ),
+        "lat": lat + rng.normal(0, 2e-6, n),
+        "lon": lon + rng.normal(0, 2e-6, n),
+        "speed": np.hypot(north, east) / 24 + rng.normal(0, 0.05, n),
+        "course": np.degrees(np.arctan2(east, north)) % 360,
+        "sst": sst,
+        "water_temp": water_temp,
+        "salinity": salinity,
+        "conductivity": salinity * (0.9 + 0.021 * water_temp),
+        "co2": co2,
+        "co2abs": absorptance,
+        "co2_raw": np.rint(co2_ref * (1 - zero_absorptance) / _LI840["kzero"]),
+        "co2_ref": np.rint(co2_ref),
+        "h2o": 13.0 + rng.normal(0, 0.05, n),
+        "h2oabs": 0.0864 + rng.normal(0, 2e-5, n),
+        "h2o_dew": 11.4 + rng.normal(0, 0.01, n),
+        "h2o_raw": np.rint(h2o_ref * 0.8964 + rng.normal(0, 100, n)),
+        "h2o_ref": np.rint(h2o_ref),
+        "cell_temp": 51.2 + rng.normal(0, 0.02, n),
+        "cell_press": 1021.0 + rng.normal(0, 0.3, n),
+        "dpress": -11.7 + rng.normal(0, 0.3, n),
+        "voltage": 23.67 + rng.normal(0, 0.01, n),
+        "waterflow": np.where(pumping, 8.1, 0.3) + rng.normal(0, 0.05, n),
+        "gasflow": np.where(pumping, 550.0, 5.0) + rng.normal(0, 2, n),
+        "air_temp": 33.0 + rng.normal(0, 0.05, n),
+        "last_zero": np.maximum.accumulate(zero_starts)[np.minimum(phase, len(starts) - 1)],
+        "last_span": np.maximum.accumulate(span_starts)[np.minimum(phase, len(starts) - 1)],
+    }
+
+
+# ---------------------------------------------------------------------------------------
+# Vectorized formatting
+# ---------------------------------------------------------------------------------------
+
+
+def _digits(values, width):
+    """Return the `width` last decimal digits of the non-negative integers `values`.
+
+    The digits are returned as ASCII characters of shape ``(width, len(values))``.
+    """
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    return np.add(
+        values[None, :] // powers[:, None] % 10, ord("0"), dtype=np.uint8, casting="unsafe"
+    )
+
+
+def _fixed(values, int_digits, decimals, min_digits=1):
+    """Render `values` with `decimals` decimals (and up to `int_digits` integer digits).
+
+    Leading zeros are dropped, but at least `min_digits` integer digits are kept.
+    """
+    values = np.asarray(values, dtype=float)
+    scaled = np.rint(np.abs(values) * 10**decimals).astype(np.int64)
+    integer = scaled // 10**decimals
+    if len(values) and integer.max() >= 10**int_digits:
+        raise ValueError(f"Values up to {integer.max()} exceed {int_digits} integer digits.")
+    length = np.full(len(values), min_digits)
+    for k in range(min_digits, int_digits):
+        length += integer >= 10**k
+
+    digits = _digits(scaled, int_digits + decimals)
+    pieces = [
+        (_ascii("-"), ((values < 0) & (scaled > 0))[None, :]),
+        (digits[:int_digits], np.arange(int_digits)[:, None] >= (int_digits - length)[None, :]),
+    ]
+    if decimals:
+        pieces += [(_ascii("."), None), (digits[int_digits:], None)]
+    return pieces
+
+
+def _padded(*fields):
+    """Render zero-padded integer fields and separators, e.g. ``(year, 4), "-", (month, 2)``."""
+    return [
+        (
+            _ascii(field)
+            if isinstance(field, str)
+            else _digits(np.asarray(field[0], np.int64), field[1]),
+            None,
+        )
+        for field in fields
+    ]
+
+
+def _calendar(times):
+    """Return year, month, day, hour, minute and second of the datetime64 `times`."""
+    times = np.asarray(times, dtype="datetime64[s]")
+    months = times.astype("datetime64[M]")
+    years = times.astype("datetime64[Y]")
+    day = (times.astype("datetime64[D]") - months.astype("datetime64[D]")).astype(np.int64) + 1
+    month = (months - years.astype("datetime64[M]")).astype(np.int64) + 1
+    seconds = (times - times.astype("datetime64[D]")).astype(np.int64)
+    return (
+        years.astype(np.int64) + 1970,
+        month,
+        day,
+        seconds // 3600,
+        seconds // 60 % 60,
+        seconds % 60,
+    )
+
+
+def _date(times):
+    year, month, day, *_ = _calendar(times)
+    return _padded((year, 4), "-", (month, 2), "-", (day, 2))
+
+
+def _clock(times, separator=":"):
+    *_, hour, minute, second = _calendar(times)
+    return _padded((hour, 2), separator, (minute, 2), separator, (second, 2))
+
+
+def _stamp(times):
+    year, month, day, hour, minute, _ = _calendar(times)
+    return _padded((year, 4), "-", (month, 2), "-", (day, 2), " ", (hour, 2), ":", (minute, 2))
+
+
+def _degrees_minutes(degrees):
+    """Convert decimal degrees into the ``dddmm.mmmm`` format of the GPS."""
+    absolute = np.abs(degrees)
+    whole = np.floor(absolute)
+    return np.sign(degrees) * (whole * 100 + (absolute - whole) * 60)
+
+
+def _ascii(text):
+    """Return `text` as column of characters (shape ``(len(text), 1)``), broadcast to all lines."""
+    return np.frombuffer(text.encode("cp1252"), np.uint8)[:, None]
+
+
+def _render(columns, n, prefix="", checksum=False) -> tuple[bytes, np.ndarray]:
+    """Assemble the rendered `columns` to `n` comma-separated lines.
+
+    Each column is either a constant string or a list of pieces ``(chars, keep)``: the
+    characters of all lines (shape ``(width, n)``, or ``(width, 1)`` if equal for all
+    lines) and which of them to keep (None to keep all). The pieces are written into one
+    character matrix, whose kept characters, read line by line, are the text.
+    If `checksum` is set, the NMEA checksum (XOR of all characters between ``$`` and
+    ``*``) is appended as ``*hh``.
+
+    Returns
+    -------
+    text : bytes
+        The lines.
+    offsets : numpy.ndarray
+        Start of each line in `text` (and the end of the last line).
+    """
+    pieces = [(_ascii(prefix), None)] if prefix else []
+    for i, column in enumerate(columns):
+        if i:
+            pieces.append((_ascii(","), None))
+        pieces += [(_ascii(column), None)] if isinstance(column, str) else column
+    width = sum(len(chars) for chars, _ in pieces)
+
+    chars = np.empty((width + 4, n), np.uint8)
+    keep = np.ones((width + 4, n), bool)
+    row = 0
+    for piece, kept in pieces:
+        chars[row : row + len(piece)] = piece
+        if kept is not None:
+            keep[row : row + len(piece)] = kept
+        row += len(piece)
+    if checksum:
+        value = np.bitwise_xor.reduce(np.where(keep[1:width], chars[1:width], 0), axis=0)
+        hex_digits = np.frombuffer(b"0123456789ABCDEF", np.uint8)
+        chars[width] = ord("*")
+        chars[width + 1] = hex_digits[value >> 4]
+        chars[width + 2] = hex_digits[value & 15]
+    else:
+        keep[width : width + 3] = False
+    chars[-1] = ord("\n")
+
+    keep = np.ascontiguousarray(keep.T)
+    offsets = np.zeros(n + 1, np.int64)
+    np.cumsum(keep.sum(axis=1), out=offsets[1:])
+    return np.ascontiguousarray(chars.T)[keep].tobytes(), offsets
+
+
+# ---------------------------------------------------------------------------------------
+# Source types
+# ---------------------------------------------------------------------------------------
+
+
+def _analyzer_columns(times, seconds, s, start):
+    """Return the (name, unit, sensor, rendered values) of the columns of the Analyzer log."""
+    start = np.datetime64(start, "s")
+    zero = start + np.maximum(s["last_zero"], 0).astype("timedelta64[s]")
+    span = start + np.maximum(s["last_span"], 0).astype("timedelta64[s]")
+    columns = [
+        ("DATE", "YYYY-MM-DD", "", _date(times)),
+        ("TIME", "HH:MM:SS", "", _clock(times)),
+        ("FRAC", "MS", "", "0000"),
+        ("SEC", "RUNSEC", "", _fixed(seconds, 10, 0)),
+        ("CO2", "ppm", "LI840", _fixed(s["co2"], 4, 3)),
+        ("CO2abs", "-", "LI840", _fixed(s["co2abs"], 1, 6)),
+        ("H2O", "ppt", "LI840", _fixed(s["h2o"], 3, 4)),
+        ("H2Oabs", "-", "LI840", _fixed(s["h2oabs"], 1, 6)),
+        ("H2Odew", "-", "LI840", _fixed(s["h2o_dew"], 3, 4)),
+        ("CellTemp", "°C", "LI840", _fixed(s["cell_temp"], 3, 4)),
+        ("CellPress", "mbar", "LI840", _fixed(s["cell_press"], 4, 2)),
+        ("VInput", "VDC", "LI840", _fixed(s["voltage"], 2, 6)),
+        ("CO2raw", "-", "LI840", _fixed(s["co2_raw"], 8, 0)),
+        ("CO2ref", "-", "LI840", _fixed(s["co2_ref"], 8, 0)),
+        ("H2Oraw", "-", "LI840", _fixed(s["h2o_raw"], 8, 0)),
+        ("H2Oref", "-", "LI840", _fixed(s["h2o_ref"], 8, 0)),
+        ("H2OzCal", "date", "LI840", "2018-7-31_at_15:45"),
+        ("CO2zCal", "date", "LI840", _stamp(zero)),
+        ("Span1Cal", "date", "LI840", _stamp(span)),
+        ("Span2Cal", "date", "LI840", "2019-04-03 07:40"),
+        ("SWVers", "-", "LI840", ""),
+        ("CO2kzero", "-", "LI840", f"{_LI840['kzero']:.6f}"),
+        ("CO2kspan1", "-", "LI840", f"{_LI840['kspan1']:.6f}"),
+        ("CO2kspan2", "-", "LI840", f"{_LI840['kspan2']:.6f}"),
+        ("H2Okzero", "-", "LI840", f"{_LI840['h2o_kzero']:.6f}"),
+        ("AIN3_mA/Waterflow", "mA/l/min", "AD24_1", _fixed(s["waterflow"], 2, 5)),
+        ("FLOWgas", "ml/min", "Int.Flow", _fixed(s["gasflow"], 4, 6)),
+        ("TempAirInt", "°C", "TCN75A", _fixed(s["air_temp"], 3, 4)),
+        ("DPressInt", "mbar", "HWHSC", _fixed(s["dpress"], 3, 6)),
+        *_gps_columns(times, s),
+        ("waterTemp", "°C", "SS_CTD48", _fixed(s["water_temp"], 3, 6)),
+        ("waterCond", "mS/cm", "SS_CTD48", _fixed(s["conductivity"], 3, 6)),
+        ("pvuaVin", "VDC", "Block USV", "25.219999"),
+        ("pvuaVout", "VDC", "Block USV", "24.790001"),
+        ("pvuaPuff", "on/off", "Block USV", "0"),
+        ("pvuaIout", "A", "Block USV", "0.89"),
+        ("PUMP", "ON/OFF", "", _fixed(s["pump"], 1, 0)),
+    ]
+    columns += [
+        (f"VALVE{i + 1}", "ON/OFF", "", _fixed(s["valves"] >> (8 - i) & 1, 1, 0)) for i in range(9)
+    ]
+    columns.append(("STATUS", "STATE", "", _fixed(s["status"], 2, 0)))
+    return columns
+
+
+def _gps_columns(times, s):
+    return [
+        ("Latitude", "ddmm.mmmm", "GPX16", _fixed(_degrees_minutes(s["lat"]), 4, 4, min_digits=4)),
+        (
+            "Longitude",
+            "dddmm.mmmm",
+            "GPX16",
+            _fixed(_degrees_minutes(s["lon"]), 5, 4, min_digits=4),
+        ),
+        ("Speed", "knots", "GPX16", _fixed(s["speed"], 3, 1)),
+        ("Course", "°", "GPX16", _fixed(s["course"], 3, 1)),
+        ("Magn.Var", "deg", "GPX16", "-2.3"),
+        ("GPS Time", "hhmmss", "GPX16", _clock(times, separator="")),
+    ]
+
+
+def _netdi_columns(times, seconds, s, start):
+    """Return the (name, unit, sensor, rendered values) of the columns of the NetDI log."""
+    return [
+        ("DATE", "YYYY-MM-DD", "", _date(times)),
+        ("TIME", "HH:MM:SS", "", _clock(times)),
+        ("FRAC", "MS", "", "0000"),
+        ("SEC", "RUNSEC", "", _fixed(seconds, 10, 0)),
+        ("SBE45Temp", "°C", "SBE45", _fixed(s["water_temp"], 2, 4)),
+        ("SBE45Cond", "mS/cm", "SBE45", _fixed(s["conductivity"], 2, 4)),
+        ("SBE45Sal", "PSU", "SBE45", _fixed(s["salinity"], 2, 4)),
+        ("AIN0_mA/Waterflow", "mA/l/min", "AD24_0", _fixed(s["waterflow"], 2, 4)),
+        ("SST", "°C", "SBE38", _fixed(s["sst"], 2, 4)),
+        *_gps_columns(times, s),
+        ("Error", "-", "", "0"),
+        ("ANA_state", "STATE", "", _fixed(s["status"], 2, 0)),
+    ]
+
+
+def _stream_columns(times, seconds, s, start):
+    """Return the rendered fields of a ``$PSDS0`` record (see ``oceanview_variables.csv``)."""
+    ddmm = _gps_columns(times, s)
+    return [
+        "$PSDS0",
+        "0",
+        "0",
+        "D",
+        "0",
+        "0",
+        _date(times),
+        _clock(times),
+        "0",
+        _fixed(seconds, 10, 0),
+        _fixed(s["status"], 2, 0),
+        _fixed(s["waterflow"], 2, 2),
+        "24.10",
+        "24.05",
+        "0",
+        "0.89",
+        _fixed(s["water_temp"], 2, 4),
+        _fixed(s["conductivity"], 2, 4),
+        _fixed(s["salinity"], 2, 4),
+        _fixed(s["co2"], 4, 2),
+        _fixed(s["h2o"], 3, 3),
+        _fixed(s["h2o_dew"], 3, 3),
+        _fixed(s["cell_temp"], 3, 2),
+        _fixed(s["cell_press"], 4, 1),
+        _fixed(s["valves"] | s["pump"] << 9, 4, 0),
+        _fixed(s["status"], 2, 0),
+        _fixed(s["co2_raw"], 8, 0),
+        _fixed(s["co2_ref"], 8, 0),
+        _fixed(s["h2o_raw"], 8, 0),
+        _fixed(s["h2o_ref"], 8, 0),
+        "0.000",
+        *(values for *_, values in ddmm),
+    ]
+
+
+def _header(columns, source_type: str) -> bytes:
+    """Return the header of an Analyzer or NetDI log file with the given columns."""
+    names, units, sensors, values = zip(*columns)
+    numeric = [not isinstance(v, str) or _is_number(v) for v in values[4:]]
+
+    def row(tag, value):
+        return ",".join([tag, "", "", "", "", *(value if num else "" for num in numeric)])
+
+    lines = [
+        "SW Build Datum: Mar 20 2019/12:03:57",
+        "NDI Serial: 00000000",
+        f"Internal {source_type} Serial: HGA-2235 27.07.2017",
+        ",".join(["@SENSOR", *sensors]),
+        ",".join(["@NAME", *names]),
+        ",".join(["@UNIT", *units]),
+        row("@A0", "0.000000"),
+        row("@A1", "1.000000"),
+        row("@A2", "0.000000"),
+        row("@MEAN", "1"),
+        "@RATE" + "," * 16,
+    ]
+    return ("\n".join(lines) + "\n").encode("cp1252")
+
+
+def _is_number(text):
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+def render_records(
+    source_type: str, times, schedule, rng, start
+) -> tuple[bytes, np.ndarray, bytes]:
+    """Render the records of `source_type` at `times` into log file lines.
+
+    Returns
+    -------
+    text, offsets
+        The lines and their offsets (see :func:`_render`).
+    header : bytes
+        The file header (empty for stream files).
+    """
+    times = np.asarray(times, dtype="datetime64[s]")
+    seconds = (times - np.datetime64(start, "s")).astype(np.int64)
+    values = signals(seconds, schedule, rng)
+    if source_type == "Stream":
+        text, offsets = _render(
+            _stream_columns(times, seconds, values, start), len(times), checksum=True
+        )
+        return text, offsets, b""
+    columns = (_netdi_columns if source_type == "NetDI" else _analyzer_columns)(
+        times, seconds, values, start
+    )
+    text, offsets = _render([column[3] for column in columns], len(times), prefix="@DATA,")
+    return text, offsets, _header(columns, source_type)
+
+
+# ---------------------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------------------
+
+
+class _LogWriter:
+    """Write lines into a series of log files of about `file_size` bytes each.
+
+    Each new file starts with the header and repeats the last `overlap` lines of the
+    previous file. A fraction `truncate` of the files ends with a truncated line, and a
+    fraction `restarts` of the files contains the header a second time.
+    """
+
+    def __init__(
+        self, directory, prefix, file_size, overlap=30, truncate=0.2, restarts=0.1, seed=0
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.file_size = file_size
+        self.overlap = overlap
+        self.truncate = truncate
+        self.restarts = restarts
+        self.rng = np.random.default_rng(seed)
+        self.files = []
+        self._file = None
+        self._size = 0
+        self._restart_at = None
+        self._tail = []
+        self._last_line = 0
+
+    def write(self, text: bytes, offsets: np.ndarray, times, header: bytes = b""):
+        """Write the lines of `text` (starting at `offsets`), rotating the files as needed."""
+        position, n = 0, len(offsets) - 1
+        while position < n:
+            if self._file is None:
+                self._open(times[position], header)
+            limit = self.file_size if self._restart_at is None else self._restart_at
+            end = (
+                int(np.searchsorted(offsets, offsets[position] + limit - self._size, side="right"))
+                - 1
+            )
+            end = min(max(end, position + 1), n)
+            self._file.write(text[offsets[position] : offsets[end]])
+            self._size += int(offsets[end] - offsets[position])
+            self._last_line = int(offsets[end] - offsets[end - 1])
+            tail_start = offsets[max(end - self.overlap, position)]
+            self._tail = [*self._tail, text[tail_start : offsets[end]]][-self.overlap :]
+            position = end
+            if self._restart_at is not None and self._size >= self._restart_at:
+                self._file.write(header)
+                self._size += len(header)
+                self._restart_at = None
+            if self._size >= self.file_size:
+                self.close()
+
+    def _open(self, time, header):
+        name = f"{self.prefix}_{pd.Timestamp(time):%Y%m%d_%H%M%S}.log"
+        path = self.directory / name
+        self._file = open(path, "wb")
+        self.files.append(path)
+        self._file.write(header)
+        self._size = len(header)
+        if self._tail:
+            tail = b"".join(self._tail).splitlines(keepends=True)[-self.overlap :]
+            self._file.write(b"".join(tail))
+            self._size += sum(len(line) for line in tail)
+        self._restart_at = None
+        if header and self.rng.random() < self.restarts:
+            self._restart_at = int(self.file_size * self.rng.uniform(0.3, 0.7))
+
+    def close(self):
+        """Close the current file, truncating its last line with probability `truncate`."""
+        if self._file is None:
+            return
+        if self._last_line > 1 and self.rng.random() < self.truncate:
+            cut = int(self._last_line * self.rng.uniform(0.1, 0.5))
+            self._file.truncate(self._file.tell() - cut)
+        self._file.close()
+        self._file = None
+
+
+def synthesize(
+    directory,
+    size=None,
+    duration=None,
+    source_types=SOURCE_TYPES,
+    freq: str = "10s",
+    start: str = "2020-01-01",
+    file_size="100MB",
+    overlap: int = 30,
+    truncate: float = 0.2,
+    restarts: float = 0.1,
+    seed: int = 0,
+) -> dict[str, list[Path]]:
+    """Write synthetic log files of the given source types into `directory`.
+
+    The files of each source type are written into a subdirectory named after it
+    (e.g. ``Analyzer/``), so the source type can be inferred when converting them. All
+    source types cover the same period, which is either given as `duration` or chosen
+    such that the files have a total `size`.
+
+    Parameters
+    ----------
+    directory : path-like
+        Output directory.
+    size : int or str, optional
+        Approximate total size of all files (e.g. ``"10GB"``).
+    duration : str, optional
+        Length of the record (e.g. ``"30D"``). Overrides `size`.
+    source_types : sequence of str
+        Any of ``"Analyzer"``, ``"NetDI"`` and ``"Stream"``.
+    freq : str
+        Sampling interval.
+    start : str
+        Time of the first record.
+    file_size : int or str
+        Approximate size of each file.
+    overlap : int
+        Number of records that are repeated at the beginning of the next file.
+    truncate : float
+        Fraction of files whose last line is truncated.
+    restarts : float
+        Fraction of Analyzer and NetDI files in which the header is repeated.
+    seed : int
+        Seed of the random numbers.
+
+    Returns
+    -------
+    dict
+        The written files of each source type.
+    """
+    unknown = set(source_types) - set(SOURCE_TYPES)
+    if unknown:
+        raise ValueError(
+            f"Unknown source types {sorted(unknown)}. Valid options are {list(SOURCE_TYPES)}"
+        )
+    step = pd.to_timedelta(freq)
+    start = pd.Timestamp(start)
+    if duration is not None:
+        n_records = int(pd.to_timedelta(duration) / step)
+    elif size is not None:
+        sample = pd.date_range(start, periods=1000, freq=step).values
+        schedule = status_schedule(step * 1000, seed=seed)
+        rng = np.random.default_rng(seed)
+        per_record = (
+            sum(
+                len(render_records(source, sample, schedule, rng, start)[0])
+                for source in source_types
+            )
+            / 1000
+        )
+        n_records = int(parse_size(size) / per_record)
+    else:
+        raise ValueError("Either size or duration must be given.")
+    schedule = status_schedule(step * n_records, seed=seed)
+    log.info(f"Generate {n_records} records per source type from {start} on")
+
+    files = {}
+    for i, source in enumerate(source_types):
+        rng = np.random.default_rng([seed, i])
+        writer = _LogWriter(
+            Path(directory) / source,
+            prefix=source,
+            file_size=parse_size(file_size),
+            overlap=overlap,
+            truncate=truncate,
+            restarts=restarts,
+            seed=[seed, i, 1],
+        )
+        try:
+            for first in range(0, n_records, CHUNK_SIZE):
+                periods = min(CHUNK_SIZE, n_records - first)
+                times = pd.date_range(start + first * step, periods=periods, freq=step).values
+                text, offsets, header = render_records(source, times, schedule, rng, start)
+                writer.write(text, offsets, times, header=header)
+        finally:
+            writer.close()
+        files[source] = writer.files
+    return files
@@ -0,0 +1,188 @@
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# Author: Markus Ritschel
+# eMail:  git@markusritschel.de
+# Date:   2026-10-19
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#
+"""Detection of new and changed files in a directory tree.
+
+On Linux, the changes are reported by inotify (called via :mod:`ctypes`, so no further
+dependency is needed). Elsewhere, or where inotify is not available (e.g. for some
+network file systems), the directory is scanned periodically. Since log files are
+written while they are watched, :class:`Debouncer` holds back each changed file until
+its size did not change for a while.
+
+Only the standard library is used here.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+from pathlib import Path
+import select
+import struct
+import time
+
+log = logging.getLogger(__name__)
+
+# inotify event masks, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+#: Header of an inotify event: watch descriptor, mask, cookie and length of the name
+_EVENT = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """Report the files below `path` with the given `suffix` whose size or modification time changed.
+
+    The directory tree is scanned each time :meth:`wait` is called.
+    """
+
+    def __init__(self, path, suffix: str = "log"):
+        self.path = Path(path)
+        self.suffix = suffix
+        self._state = self._scan()
+
+    def wait(self, timeout: float) -> set[Path]:
+        """Wait `timeout` seconds and return the files that were created or changed meanwhile."""
+        time.sleep(timeout)
+        state = self._scan()
+        changed = {file for file, stat in state.items() if self._state.get(file) != stat}
+        self._state = state
+        return changed
+
+    def close(self):
+        """Nothing to release; for compatibility with :class:`InotifyWatcher`."""
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        state = {}
+        for file in self.path.glob(f"**/*.{self.suffix}"):
+            try:
+                stat = file.stat()
+            except FileNotFoundError:  # removed meanwhile
+                continue
+            state[file] = (stat.st_size, stat.st_mtime_ns)
+        return state
+
+
+class InotifyWatcher:
+    """Report the files below `path` with the given `suffix` that were created, written or moved there.
+
+    Subdirectories, including those created later, are watched as well. Raises
+    :class:`OSError` if inotify is not available.
+    """
+
+    def __init__(self, path, suffix: str = "log"):
+        self.path = Path(path)
+        self.suffix = suffix
+        try:
+            self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError) as error:
+            raise OSError(f"inotify is not available: {error}") from error
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories = {}
+        try:
+            self._watch_tree(self.path)
+        except OSError:
+            self.close()
+            raise
+
+    def wait(self, timeout: float) -> set[Path]:
+        """Wait up to `timeout` seconds for changes and return the files that were changed."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        changed = set()
+        while ready:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = os.fsdecode(
+                    data[offset + _EVENT.size : offset + _EVENT.size + length].rstrip(b"\0")
+                )
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    log.warning("Too many file events at once. Rescan the directory.")
+                    changed |= set(self.path.glob(f"**/*.{self.suffix}"))
+                elif wd in self._directories and name:
+                    path = self._directories[wd] / name
+                    if mask & IN_ISDIR:
+                        if mask & (IN_CREATE | IN_MOVED_TO):
+                            self._watch_tree(path)
+                            changed |= set(path.glob(f"**/*.{self.suffix}"))
+                    elif path.suffix == f".{self.suffix}":
+                        changed.add(path)
+        return changed
+
+    def close(self):
+        """Close the inotify file descriptor."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _watch_tree(self, directory: Path):
+        for path in [directory, *(p for p in directory.rglob("*") if p.is_dir())]:
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, f"Cannot watch {path}: {os.strerror(errno)}")
+            self._directories[wd] = path
+
+
+def open_watcher(path, suffix: str = "log", polling: bool = False):
+    """Return an :class:`InotifyWatcher` for `path`, or a :class:`PollingWatcher` if `polling`
+    is set or inotify is not available.
+    """
+    if not polling:
+        try:
+            return InotifyWatcher(path, suffix=suffix)
+        except OSError as error:
+            log.warning(f"⚠️  {error}. Poll the directory instead.")
+    return PollingWatcher(path, suffix=suffix)
+
+
+class Debouncer:
+    """Hold back changed files until their size did not change for `settle` seconds."""
+
+    def __init__(self, settle: float = 30.0):
+        self.settle = settle
+        self._pending = {}
+
+    def add(self, files, now: float | None = None):
+        """Register changes of `files`, which restarts their waiting time."""
+        now = time.monotonic() if now is None else now
+        for file in files:
+            self._pending[Path(file)] = (_size(file), now)
+
+    def pop_settled(self, now: float | None = None) -> list[Path]:
+        """Return the files whose size is stable for `settle` seconds (sorted by name) and forget them."""
+        now = time.monotonic() if now is None else now
+        settled = []
+        for file, (size, since) in list(self._pending.items()):
+            current = _size(file)
+            if current is None:  # removed meanwhile
+                del self._pending[file]
+            elif current != size:
+                self._pending[file] = (current, now)
+            elif now - since >= self.settle:
+                settled.append(file)
+                del self._pending[file]
+        return sorted(settled)
+
+
+def _size(file) -> int | None:
+    try:
+        return os.path.getsize(file)
+    except FileNotFoundError:
+        return None
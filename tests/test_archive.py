@@ -0,0 +1,83 @@
+import dask
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+import oceanpack
+from oceanpack.app.models.archive import LRUCache
+from oceanpack.app.models.catalog import CATALOG_NAME, Catalog
+from oceanpack.utils.netcdf import atomic_to_netcdf
+
+
+def _write_days(directory, days, rows=8640):
+    """Write one file per day, replacing existing files atomically, as they may be open."""
+    directory.mkdir(exist_ok=True)
+    for day in days:
+        time = pd.date_range("2020-01-01", periods=rows, freq="10s") + pd.Timedelta(days=day)
+        ds = xr.Dataset(
+            {
+                "CO2": ("time", day + np.linspace(0, 1, rows)),
+                "SBE45Temp": ("time", np.full(rows, 10.0 + day)),
+            },
+            coords={"time": time},
+        )
+        ds.attrs["source_type"] = "Analyzer"
+        atomic_to_netcdf(ds, directory / f"day{day}.nc")
+
+
+def test_lru_cache_evicts_by_size():
+    evicted = []
+    cache = LRUCache(10, sizeof=len, on_evict=lambda key, value: evicted.append(key))
+    cache.get("a", lambda: "1234")
+    cache.get("b", lambda: "1234")
+    cache.get("a", lambda: "")
+    cache.get("c", lambda: "1234")
+    assert list(cache) == ["a", "c"]
+    assert evicted == ["b"]
+    assert cache.get("d", lambda: "x" * 11) == "x" * 11
+    assert list(cache) == ["a", "c"]
+    assert (cache.hits, cache.misses, cache.size) == (1, 4, 8)
+
+
+def test_sel_reads_only_the_chunks_of_the_window(tmp_path):
+    _write_days(tmp_path / "archive", range(5))
+    archive = oceanpack.open_archive(tmp_path / "archive", chunk_size=4320)
+
+    ds = archive.sel(time=slice("2020-01-02 12:00", "2020-01-03 11:59:50"), variables=["CO2"])
+    assert list(ds.data_vars) == ["CO2"]
+    assert dask.is_dask_collection(ds["CO2"])
+    assert ds.sizes["time"] == 8640
+    assert len(archive.files) == 2
+    assert archive.chunks.misses == 0
+
+    np.testing.assert_allclose(ds["CO2"].values[[0, -1]], [1.5, 2.5], atol=1e-3)
+    assert archive.chunks.misses == 2
+    ds["CO2"].load()
+    assert (archive.chunks.misses, archive.chunks.hits) == (2, 2)
+    archive.close()
+
+
+def test_open_files_are_limited_and_changed_files_are_read_again(tmp_path):
+    _write_days(tmp_path / "archive", range(4))
+    archive = oceanpack.open_archive(tmp_path / "archive", max_open_files=2)
+    assert archive.sel(variables=["SBE45Temp"])["SBE45Temp"].values[::8640].tolist() == [
+        10,
+        11,
+        12,
+        13,
+    ]
+    assert len(archive.files) == 2
+
+    _write_days(tmp_path / "archive", [1], rows=10)
+    archive.catalog.update(tmp_path / "archive")
+    ds = archive.sel(time=slice("2020-01-02", "2020-01-02 23:59:50"))
+    assert ds.sizes["time"] == 10
+    archive.close()
+
+
+def test_open_archive_from_catalog(tmp_path):
+    _write_days(tmp_path / "archive", range(2))
+    Catalog(tmp_path / "archive" / CATALOG_NAME).update(tmp_path / "archive")
+    archive = oceanpack.open_archive(tmp_path / "archive" / CATALOG_NAME)
+    assert archive.sel(time=slice("2020-01-02", None)).sizes["time"] == 8640
+    archive.close()
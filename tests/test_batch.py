@@ -0,0 +1,79 @@
+import os
+from pathlib import Path
+import shutil
+import sys
+
+import pytest
+
+from oceanpack.app.controllers.data_controller import BatchController
+from oceanpack.app.models.batch import input_hash, load_manifest
+
+LOG_FILE = Path(__file__).parent / "example_op.log"
+
+MANIFEST = """
+[defaults]
+source_types = ["Analyzer"]
+
+[[cruise]]
+name = "leg1"
+inputs = ["leg1/Analyzer"]
+output = "processed/leg1.nc"
+
+[[cruise]]
+name = "leg2"
+inputs = ["leg2/Analyzer"]
+output = "processed/leg2.nc"
+"""
+
+
+@pytest.fixture
+def archive(tmp_path):
+    for leg in ("leg1", "leg2"):
+        (tmp_path / leg / "Analyzer").mkdir(parents=True)
+        shutil.copy(LOG_FILE, tmp_path / leg / "Analyzer" / LOG_FILE.name)
+    (tmp_path / "batch.toml").write_text(MANIFEST)
+    return tmp_path
+
+
+def test_load_manifest_resolves_paths(archive):
+    jobs = load_manifest(archive / "batch.toml")
+    assert [job["name"] for job in jobs] == ["leg1", "leg2"]
+    assert jobs[0]["inputs"] == [str(archive / "leg1" / "Analyzer")]
+    assert jobs[0]["options"] == {"source_types": ["Analyzer"]}
+
+
+def test_load_manifest_falls_back_to_tomli(archive, monkeypatch):
+    import tomllib
+
+    # Python 3.10 has no tomllib, but tomli with the same API
+    monkeypatch.setitem(sys.modules, "tomllib", None)
+    monkeypatch.setitem(sys.modules, "tomli", tomllib)
+    assert [job["name"] for job in load_manifest(archive / "batch.toml")] == ["leg1", "leg2"]
+
+
+def test_load_manifest_rejects_unknown_options(tmp_path):
+    (tmp_path / "batch.toml").write_text(
+        '[[cruise]]\nname = "a"\ninputs = []\noutput = "a.nc"\nfoo = 1\n'
+    )
+    with pytest.raises(ValueError, match="Unknown options"):
+        load_manifest(tmp_path / "batch.toml")
+
+
+def test_input_hash_changes_with_files(archive):
+    before = input_hash([archive / "leg1"])
+    assert before == input_hash([archive / "leg1"])
+    os.utime(archive / "leg1" / "Analyzer" / LOG_FILE.name, ns=(0, 0))
+    assert before != input_hash([archive / "leg1"])
+
+
+def test_batch_skips_unchanged_jobs_and_records_failures(archive):
+    status = BatchController(archive / "batch.toml", max_workers=2).run()
+    assert status == {"leg1": "done", "leg2": "done"}
+    outputs = {leg: archive / "processed" / f"{leg}.nc" for leg in status}
+    mtimes = {leg: path.stat().st_mtime_ns for leg, path in outputs.items()}
+
+    # leg2's input becomes unreadable: only leg2 is run again, and fails
+    (archive / "leg2" / "Analyzer" / LOG_FILE.name).write_text("garbage\n")
+    status = BatchController(archive / "batch.toml", max_workers=2).run()
+    assert status == {"leg1": "done", "leg2": "failed"}
+    assert outputs["leg1"].stat().st_mtime_ns == mtimes["leg1"]
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from oceanpack.utils.calibration import (
+    calibration_means,
+    coefficient_table,
+    drift_correction,
+    li840_absorptance,
+    recompute_co2,
+)
+
+
+def _make_record(span_concentration=500.0):
+    """Two days at 10 s with a zero and a span calibration every 12 hours and a linear drift."""
+    time = pd.date_range("2020-01-01", periods=2 * 8640, freq="10s")
+    hours = (time - time[0]) / pd.Timedelta("1h")
+    status = np.full(len(time), 5)
+    phase = hours % 12
+    status[phase < 0.1] = 2
+    status[(phase >= 0.1) & (phase < 0.2)] = 1
+
+    offset = 0.1 * hours.to_numpy()
+    gain = 1 + 0.001 * hours.to_numpy()
+    truth = np.where(status == 2, 0.0, np.where(status == 1, span_concentration, 400.0))
+    reading = truth / gain + offset
+    # the first minute of each calibration is still flushed with sample gas
+    for state in (1, 2):
+        starts = np.flatnonzero((status == state) & (np.roll(status, 1) != state))
+        for start in starts:
+            reading[start : start + 6] = 400.0
+    return time, reading, status, offset, gain
+
+
+def test_calibration_means_skip_settling():
+    time, reading, status, _, _ = _make_record()
+    t_zero, zero = calibration_means(time, reading, status, state=2, settle="1min")
+    assert len(zero) == 4
+    hours = (pd.DatetimeIndex(t_zero) - time[0]) / pd.Timedelta("1h")
+    assert np.allclose(zero, 0.1 * hours, atol=0.01)
+
+
+def test_drift_correction_removes_offset_and_gain_drift():
+    time, reading, status, offset, gain = _make_record()
+    corrected, applied_offset, applied_gain = drift_correction(
+        time, reading, status, span_concentration=500.0
+    )
+    operating = status == 5
+    inner = (
+        operating & (time >= time[0] + pd.Timedelta("1h")) & (time <= time[0] + pd.Timedelta("36h"))
+    )
+    assert np.allclose(corrected[inner], 400.0, atol=0.05)
+    assert np.allclose(applied_offset[inner], offset[inner], atol=0.01)
+    assert np.allclose(applied_gain[inner], gain[inner], atol=1e-4)
+
+
+def test_drift_correction_without_calibrations():
+    time = pd.date_range("2020-01-01", periods=10, freq="1min")
+    reading = np.full(10, 400.0)
+    corrected, offset, gain = drift_correction(
+        time, reading, np.full(10, 5), span_concentration=500.0
+    )
+    assert np.array_equal(corrected, reading)
+    assert (offset == 0).all()
+    assert (gain == 1).all()
+
+
+def _make_raw_dataset(n=100):
+    time = pd.date_range("2020-01-01", periods=n, freq="1min")
+    return xr.Dataset(
+        {
+            "CO2raw": ("time", np.linspace(3.20e6, 3.25e6, n)),
+            "CO2ref": ("time", np.full(n, 3.628e6)),
+            "CO2kzero": ("time", np.full(n, 1.038285)),
+            "CO2kspan1": ("time", np.full(n, 0.958418)),
+            "CO2kspan2": ("time", np.full(n, 0.280827)),
+            "CellTemp": ("time", np.full(n, 51.0)),
+            "CellPress": ("time", np.full(n, 1020.0)),
+        },
+        coords={"time": time},
+    )
+
+
+def test_recompute_co2_uses_coefficients_of_each_period():
+    ds = _make_raw_dataset()
+    table = pd.DataFrame(
+        {
+            "start": ["2020-01-01 00:30", "2020-01-01 01:00"],
+            "a1": [4000.0, 4100.0],
+            "a2": [1000.0, 1000.0],
+        }
+    )
+    co2 = recompute_co2(ds, table, block_size=17)
+
+    absorptance = li840_absorptance(
+        ds["CO2raw"].values, ds["CO2ref"].values, 1.038285, 0.958418, 0.280827
+    )
+    x = absorptance * 1013.25 / 1020.0
+    scale = (51.0 + 273.15) / 273.15
+    assert np.isnan(co2[:30]).all()
+    assert np.allclose(co2[30:60], scale * (4000 * x[30:60] + 1000 * x[30:60] ** 2))
+    assert np.allclose(co2[60:], scale * (4100 * x[60:] + 1000 * x[60:] ** 2))
+
+
+def test_recompute_co2_table_overrides_logged_coefficients():
+    ds = _make_raw_dataset()
+    table = pd.DataFrame({"a1": [4000.0], "kzero": [1.0]}, index=["2019-12-31"])
+    co2 = recompute_co2(ds, table)
+    ds["CO2kzero"][:] = 1.0
+    assert np.allclose(co2, recompute_co2(ds, table.drop(columns="kzero")))
+
+
+def test_coefficient_table_requires_polynomial():
+    with pytest.raises(ValueError, match="polynomial"):
+        coefficient_table(pd.DataFrame({"start": ["2020-01-01"], "kzero": [1.0]}))
@@ -0,0 +1,119 @@
+from click.testing import CliRunner
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+import oceanpack
+from oceanpack.app.cli import main
+from oceanpack.app.models.catalog import CATALOG_NAME, Catalog
+
+
+def _dataset(start, periods, source_type, seed=0, **variables):
+    rng = np.random.default_rng(seed)
+    time = pd.date_range(start, periods=periods, freq="10s")
+    ds = xr.Dataset(
+        {name: ("time", value + rng.normal(0, 0.1, periods)) for name, value in variables.items()},
+        coords={"time": time},
+    )
+    ds.attrs["source_type"] = source_type
+    return ds
+
+
+@pytest.fixture
+def converted(tmp_path):
+    """One Analyzer file per day with overlapping records, and one NetDI file with positions."""
+    directory = tmp_path / "converted"
+    (directory / "analyzer").mkdir(parents=True)
+    for day in range(3):
+        start = pd.Timestamp("2020-01-01") + pd.Timedelta(days=day) - pd.Timedelta("5min")
+        _dataset(start, 8670, "Analyzer", seed=day, CO2=400.0, CellPress=1013.0).to_netcdf(
+            directory / "analyzer" / f"day{day}.nc"
+        )
+    netdi = _dataset(
+        "2020-01-01", 3 * 8640, "NetDI", SBE45Temp=10.0, Latitude=5430.0, Longitude=1030.0
+    )
+    netdi.attrs["cruise"] = "MSM-01"
+    netdi.to_netcdf(directory / "netdi.nc")
+    return directory
+
+
+def test_catalog_is_updated_incrementally(converted):
+    catalog = Catalog(converted / CATALOG_NAME)
+    assert catalog.update(converted) == 4
+    assert catalog.update(converted) == 0
+
+    (converted / "analyzer" / "day2.nc").unlink()
+    _dataset("2020-01-02", 10, "Analyzer", CO2=400.0).to_netcdf(converted / "analyzer" / "day1.nc")
+    assert catalog.update(converted) == 1
+    entries = catalog.find(source_type="Analyzer")
+    assert [entry.path.name for entry in entries] == ["day0.nc", "day1.nc"]
+    assert entries[1].n_times == 10
+    catalog.close()
+
+
+def test_find_files_by_window_and_filters(converted):
+    catalog = Catalog(converted / CATALOG_NAME)
+    catalog.update(converted)
+
+    names = [entry.path.name for entry in catalog.find("2020-01-02 12:00", "2020-01-03")]
+    assert names == ["netdi.nc", "day1.nc", "day2.nc"]
+    assert [entry.path.name for entry in catalog.find(end="2020-01-01 06:00")] == [
+        "day0.nc",
+        "netdi.nc",
+    ]
+    assert [entry.path.name for entry in catalog.find(variables=["SBE45Temp"])] == ["netdi.nc"]
+    assert [entry.path.name for entry in catalog.find(cruise="MSM-01")] == ["netdi.nc"]
+
+    [netdi] = catalog.find(bbox=(10, 54, 11, 55))
+    np.testing.assert_allclose(netdi.bbox, (10.5, 54.5, 10.5, 54.5), atol=0.01)
+    assert catalog.find(bbox=(0, 0, 1, 1)) == []
+    catalog.close()
+
+
+def test_open_window(converted):
+    ds = oceanpack.open_dataset(
+        "2020-01-01 23:00", "2020-01-02 06:00", ["CO2", "SBE45Temp"], path=converted
+    )
+    assert sorted(ds.data_vars) == ["CO2", "SBE45Temp"]
+    np.testing.assert_array_equal(
+        ds.indexes["time"], pd.date_range("2020-01-01 23:00", "2020-01-02 06:00", freq="10s")
+    )
+    # the records of the overlap come from the first file
+    overlap = slice(pd.Timestamp("2020-01-01 23:55"), pd.Timestamp("2020-01-01 23:59:50"))
+    with xr.open_dataset(converted / "analyzer" / "day0.nc") as day0:
+        np.testing.assert_array_equal(ds["CO2"].sel(time=overlap), day0["CO2"].sel(time=overlap))
+
+    ds.close()
+    with oceanpack.open_dataset("2021-01-01", path=converted) as empty:
+        assert empty.sizes == {}
+
+
+def test_open_dataset_closes_archive(converted, monkeypatch):
+    from oceanpack.app.models.archive import Archive
+
+    closed = []
+    close = Archive.close
+    monkeypatch.setattr(Archive, "close", lambda self: closed.append(self) or close(self))
+    with oceanpack.open_dataset("2020-01-01 23:00", "2020-01-02 06:00", path=converted) as ds:
+        assert ds.sizes["time"] > 0
+        assert not closed
+    assert len(closed) == 1
+
+
+def test_merge_data_with_directory(converted, tmp_path):
+    output = tmp_path / "merged.nc"
+    args = [
+        "merge-data",
+        str(converted),
+        "--start",
+        "2020-01-02",
+        "--end",
+        "2020-01-02 23:59:50",
+        "--keep-all",
+    ]
+    result = CliRunner().invoke(main, [*args, "-o", str(output)])
+    assert result.exit_code == 0, result.output
+    with xr.open_dataset(output) as ds:
+        assert ds.sizes["time"] == 8640
+        assert {"CO2", "CellPress", "SBE45Temp", "Latitude"} <= set(ds.data_vars)
@@ -0,0 +1,60 @@
+import os
+from pathlib import Path
+import subprocess
+import sys
+
+from click.testing import CliRunner
+import pytest
+
+import oceanpack
+from oceanpack.app.cli import main
+
+HEAVY_MODULES = ["numpy", "pandas", "xarray", "netCDF4", "tqdm", "colorama"]
+IMPORT_BUDGET_US = 300_000
+
+
+def _importtime(code):
+    """Run `code` in a fresh interpreter and return the ``-X importtime`` records by module."""
+    env = dict(os.environ, PYTHONPATH=str(Path(oceanpack.__file__).parents[1]))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    records = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split("|")
+        if cumulative.strip().isdigit():
+            records[module.strip()] = int(cumulative)
+    return records
+
+
+def test_cli_import_is_lightweight():
+    records = _importtime("import oceanpack.app.cli")
+    assert not [module for module in HEAVY_MODULES if module in records]
+    assert records["oceanpack.app.cli"] < IMPORT_BUDGET_US
+
+
+@pytest.mark.parametrize("command", [[], ["--help"], ["process-data", "--help"]])
+def test_cli_help_does_not_import_scientific_stack(command):
+    code = (
+        "import sys\n"
+        "from oceanpack.app.cli import main\n"
+        f"sys.argv = ['oceanpack', *{command!r}]\n"
+        "try:\n"
+        "    main()\n"
+        "except SystemExit:\n"
+        "    pass\n"
+    )
+    records = _importtime(code)
+    assert not [module for module in HEAVY_MODULES[:4] if module in records]
+
+
+def test_cli_without_command_shows_help():
+    result = CliRunner().invoke(main, [])
+    assert result.exit_code == 0
+    assert "process-data" in result.output
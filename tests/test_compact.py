@@ -0,0 +1,110 @@
+from pathlib import Path
+
+from click.testing import CliRunner
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from oceanpack.app.cli import main
+from oceanpack.app.models.filesource import FileSourceModel
+from oceanpack.utils.compact import (
+    VALVES_MISSING,
+    categorize_status,
+    downcast,
+    pack_valves,
+    status_labels,
+    unpack_valves,
+    valve_state,
+)
+
+EXAMPLE = Path(__file__).parent / "example_op.log"
+
+
+def _convert(compact):
+    model = FileSourceModel("Analyzer", compact=compact)
+    model.load_data(EXAMPLE)
+    model.clean_data()
+    model.process_data()
+    return model.ds
+
+
+def test_pack_and_unpack_valves():
+    rng = np.random.default_rng(0)
+    states = {f"VALVE{i}": ("time", rng.integers(0, 2, 100)) for i in range(1, 10)}
+    ds = xr.Dataset({**states, "PUMP": ("time", rng.integers(0, 2, 100).astype(float))})
+    ds["PUMP"][7] = np.nan
+
+    packed = pack_valves(ds)
+    assert packed["VALVES"].dtype == np.uint16
+    assert not set(states) & set(packed.data_vars)
+    assert packed["VALVES"][7] == VALVES_MISSING
+    np.testing.assert_array_equal(
+        valve_state(packed["VALVES"], "VALVE2")[:7], ds["VALVE2"][:7] == 1
+    )
+
+    unpacked = unpack_valves(packed)
+    for name in [*states, "PUMP"]:
+        np.testing.assert_array_equal(unpacked[name].values[:7], ds[name].values[:7])
+        assert np.isnan(unpacked[name][7])
+
+
+def test_status_as_flags():
+    ds = xr.Dataset({"STATUS": ("time", [5, 2, 22])})
+    status = categorize_status(ds)["STATUS"]
+    assert status.dtype == np.uint8
+    assert status.attrs["flag_meanings"].split()[5] == "Operate_default_sea-CO2_analysis"
+    assert list(status_labels(status)) == [
+        "Operate: default sea-CO2 analysis",
+        "Zero calibration, automatic",
+        "Air measurement",
+    ]
+    # missing states cannot be stored as uint8
+    invalid = xr.Dataset({"STATUS": ("time", [5.0, np.nan])})
+    assert categorize_status(invalid)["STATUS"].dtype == np.float64
+
+
+def test_downcast_keeps_the_resolution():
+    ds = xr.Dataset(
+        {
+            "CO2": ("time", np.round(np.linspace(380, 420, 1000), 3)),
+            "Latitude": ("time", np.round(np.linspace(5430, 5431, 1000), 4)),
+            "CO2raw": ("time", np.arange(1000) + 3_000_000),
+        }
+    )
+    compacted = downcast(ds)
+    assert compacted["CO2"].dtype == np.float32
+    np.testing.assert_allclose(compacted["CO2"], ds["CO2"], rtol=0, atol=5e-4)
+    assert compacted["Latitude"].dtype == np.float64
+    assert compacted["CO2raw"].dtype == np.int32
+    assert downcast(ds.chunk({"time": 100}))["CO2"].dtype == np.float32
+
+
+def test_compact_conversion(tmp_path):
+    full, compact = _convert(False), _convert(True)
+    assert compact.nbytes < full.nbytes / 2
+    assert compact["STATUS"].dtype == np.uint8
+    np.testing.assert_array_equal(compact["STATUS"], full["STATUS"])
+    unpacked = unpack_valves(compact)
+    for name in ["PUMP", *(f"VALVE{i}" for i in range(1, 10))]:
+        np.testing.assert_array_equal(unpacked[name], full[name])
+
+    output = tmp_path / "compact.nc"
+    result = CliRunner().invoke(
+        main, ["convert-data", str(EXAMPLE), str(output), "-t", "Analyzer", "--compact"]
+    )
+    assert result.exit_code == 0, result.output
+    with xr.open_dataset(output) as ds:
+        assert ds["VALVES"].dtype == np.uint16
+        assert ds["CO2"].dtype == np.float32
+        assert ds["time"].encoding["dtype"] == np.int64
+        np.testing.assert_array_equal(ds.indexes["time"], full.indexes["time"])
+
+
+def test_switch_states_are_converted():
+    df = pd.DataFrame(
+        {"PUMP": ["ON", "OFF", " on"], "TEXT": ["a", "b", "c"]},
+        index=pd.date_range("2020", periods=3),
+    )
+    df = FileSourceModel._to_numeric(df)
+    assert list(df.columns) == ["PUMP"]
+    assert list(df["PUMP"]) == [1, 0, 1]
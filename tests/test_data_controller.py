@@ -0,0 +1,125 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from oceanpack.app.controllers.data_controller import (
+    DataConversionController,
+    DataMergeController,
+    DataPipelineController,
+    DataProcessingController,
+)
+from oceanpack.utils import helpers
+from oceanpack.utils.netcdf import append_along_time
+
+
+def _make_records(start, periods, seed=0, sst=False):
+    rng = np.random.default_rng(seed)
+    time = pd.date_range(start, periods=periods, freq="10s")
+    hours = (time - pd.Timestamp("2020-01-01")) / pd.Timedelta("1h")
+    status = np.where((hours % 6) < 0.2, 2, 5)
+    records = xr.Dataset(
+        {
+            "CO2": ("time", np.where(status == 5, 400 + rng.normal(0, 0.5, periods), 0.5)),
+            "STATUS": ("time", status),
+            "CellPress": ("time", 1013 + rng.normal(0, 1, periods)),
+            "DPressInt": ("time", rng.normal(-5, 0.5, periods)),
+            "SBE45Temp": ("time", 10 + rng.normal(0, 0.01, periods)),
+        },
+        coords={"time": time},
+    )
+    if sst:
+        # the water reaches the SBE45 two minutes after passing the intake
+        records["SST"] = (
+            "time",
+            10 + np.sin(2 * np.pi * np.asarray(hours) / 2) + rng.normal(0, 0.01, periods),
+        )
+        records["SBE45Temp"] = records["SST"].shift(time=12) + 0.3
+    return records
+
+
+def _process(path, **kwargs):
+    controller = DataProcessingController()
+    controller.load_data(path)
+    controller.process_data(**kwargs)
+    controller.generate_output(path)
+    return controller
+
+
+@pytest.mark.parametrize("sst", [False, True])
+def test_incremental_processing_matches_full_processing(tmp_path, monkeypatch, sst):
+    records = _make_records("2020-01-01", 2 * 8640, sst=sst)
+    path = tmp_path / "merged.nc"
+    append_along_time(records.isel(time=slice(None, 8640)), path)
+    _process(path)
+    append_along_time(records.isel(time=slice(8640, None)), path)
+
+    correlated = [0]
+
+    def sliding_lag(x, *args, **kwargs):
+        correlated[0] = max(correlated[0], len(x))
+        return original(x, *args, **kwargs)
+
+    original = helpers.sliding_lag
+    with monkeypatch.context() as patch:
+        patch.setattr(helpers, "sliding_lag", sliding_lag)
+        controller = _process(path)
+    # only the loaded records are cross-correlated, not the whole record
+    assert (correlated[0] > 0) == sst
+    assert correlated[0] <= controller.model.ds.sizes["time"] < records.sizes["time"]
+
+    # reference: all raw records processed at once
+    append_along_time(records, tmp_path / "full.nc")
+    _process(tmp_path / "full.nc")
+
+    assert controller.model._write_from > pd.Timestamp("2020-01-01 19:00")
+    derived = ["CO2_corrected", "PressEqu", "pCO2_wet_equ", "fCO2_wet_equ", "CO2_flag"]
+    if sst:
+        derived += ["SST_lag", "SST_corrected", "pCO2_wet_sst", "fCO2_wet_sst"]
+    with xr.open_dataset(path) as incremental, xr.open_dataset(tmp_path / "full.nc") as full:
+        xr.testing.assert_equal(incremental["CO2"], records["CO2"])
+        for var in derived:
+            xr.testing.assert_allclose(incremental[var], full[var])
+            assert incremental[var].attrs["processed_until"] == str(records.indexes["time"][-1])
+        appended = incremental.sel(time=slice("2020-01-02", None))
+        for var in ["CO2_corrected", "pCO2_wet_equ", "fCO2_wet_equ"]:
+            assert appended[var].count() > 0.8 * appended.sizes["time"]
+        if sst:
+            assert abs(incremental["SST_lag"].attrs["global_lag"] - 120) < 5
+
+
+def test_changed_configuration_triggers_full_processing(tmp_path):
+    path = tmp_path / "merged.nc"
+    append_along_time(_make_records("2020-01-01", 8640), path)
+    _process(path)
+    controller = _process(path, drift_correction=True)
+    assert controller.model._write_from is None
+
+
+def test_pipeline_matches_stepwise_processing(tmp_path):
+    log_file = Path(__file__).parent / "example_op.log"
+
+    conversion = DataConversionController("Analyzer")
+    conversion.load_data(log_file)
+    conversion.generate_output(tmp_path / "analyzer.nc")
+    merging = DataMergeController()
+    merging.merge([tmp_path / "analyzer.nc"], keep_all=False)
+    merging.generate_output(tmp_path / "merged.nc")
+    _process(tmp_path / "merged.nc")
+
+    pipeline = DataPipelineController(checkpoint_dir=tmp_path / "checkpoints")
+    result = pipeline.run([log_file], tmp_path / "processed.nc", source_types=["Analyzer"])
+
+    assert sorted(p.name for p in (tmp_path / "checkpoints").iterdir()) == [
+        "example_op_Analyzer.nc",
+        "merged.nc",
+    ]
+    with (
+        xr.open_dataset(tmp_path / "merged.nc") as stepwise,
+        xr.open_dataset(tmp_path / "processed.nc") as chained,
+    ):
+        assert set(stepwise.data_vars) == set(chained.data_vars) == set(result.data_vars)
+        for var in ["CO2", "PressEqu", "pCO2_wet_equ", "CO2_flag"]:
+            xr.testing.assert_allclose(stepwise[var], chained[var])
@@ -5,9 +5,12 @@
 # %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
 #
 import numpy as np
+import pandas as pd
+import pytest
 import xarray as xr
 
-from oceanpack.app.models.data_processor import DataProcessor
+from oceanpack.app.models.data_processor import DataProcessor, DataResampler
+from oceanpack.utils.helpers import set_nonoperating_to_nan
 
 
 def _make_ds(**overrides):
@@ -77,6 +80,39 @@ def test_temperature_correction_sst_equals_tequ():
     )
 
 
+def test_float32_chain_matches_float64():
+    rng = np.random.default_rng(0)
+    n = 10_000
+    ds = xr.Dataset(
+        {
+            "CO2": ("time", rng.uniform(300, 500, n)),
+            "CellPress": ("time", rng.uniform(1000, 1030, n)),
+            "DPressInt": ("time", rng.uniform(-5, 5, n)),
+            "SBE45Temp": ("time", rng.uniform(0, 30, n)),
+            "SST": ("time", rng.uniform(0, 30, n)),
+        },
+        coords={"time": pd.date_range("2020-01-01", periods=n, freq="10s")},
+    )
+    results = {}
+    for precision in ("float64", "float32"):
+        proc = DataProcessor(precision=precision)
+        proc.ds = ds.copy()
+        proc.compute_equilibrator_pressure()
+        proc.compute_pCO2_wet_equ()
+        proc.compute_fCO2_wet_equ()
+        proc.compute_fCO2_wet_sst()
+        results[precision] = proc.ds
+    for var in ("pCO2_wet_equ", "fCO2_wet_equ", "fCO2_wet_sst"):
+        assert results["float32"][var].dtype == np.float32
+        assert results["float64"][var].dtype == np.float64
+        np.testing.assert_allclose(
+            results["float32"][var], results["float64"][var], rtol=0, atol=1e-3
+        )
+
+    with pytest.raises(ValueError, match="Unknown precision"):
+        DataProcessor(precision="half")
+
+
 def test_temperature_correction_output_attributes():
     """Output variable must carry correct unit and long_name attributes."""
     proc = _make_processor(400.0, 20.0, 18.0)
@@ -85,3 +121,217 @@ def test_temperature_correction_output_attributes():
     attrs = proc.ds["pCO2_wet_sst"].attrs
     assert attrs.get("unit") == "µatm"
     assert "long_name" in attrs
+
+
+def _make_processed_file(path, n=3 * 24 * 60, freq="1min"):
+    times = pd.date_range("2020-01-01 06:00", periods=n, freq=freq)
+    rng = np.random.default_rng(0)
+    status = np.full(n, 5)
+    status[100:130] = 2  # zero calibration
+    status[2000:2010] = 1  # span calibration
+    ds = xr.Dataset(
+        {
+            "CO2": ("time", rng.normal(400, 5, n), {"unit": "ppm"}),
+            "SBE45Temp": ("time", rng.normal(15, 1, n)),
+            "STATUS": ("time", status),
+        },
+        coords={"time": times},
+    )
+    ds.to_netcdf(path)
+    return ds
+
+
+def test_resampler_matches_pandas_resample(tmp_path):
+    source = _make_processed_file(tmp_path / "processed.nc")
+    output = tmp_path / "resampled.nc"
+    DataResampler(freq="10min", block="1D", buffer="20min").resample(
+        tmp_path / "processed.nc", output
+    )
+
+    df = source.to_dataframe()
+    df = set_nonoperating_to_nan(df, col=["CO2", "SBE45Temp"], buffer="20min", status_var="STATUS")
+    expected = df[["CO2", "SBE45Temp"]].resample("10min").agg(["mean", "median", "std", "count"])
+
+    with xr.open_dataset(output) as result:
+        assert result.sizes["time"] == len(expected)
+        for var in ["CO2", "SBE45Temp"]:
+            for stat in ["mean", "median", "std", "count"]:
+                assert np.allclose(
+                    result[f"{var}_{stat}"].values, expected[(var, stat)].values, equal_nan=True
+                ), f"{var}_{stat}"
+        assert result["CO2_mean"].attrs["unit"] == "ppm"
+
+
+def test_resampler_reduces_flags_and_states(tmp_path):
+    source = _make_processed_file(tmp_path / "processed.nc")
+    rng = np.random.default_rng(1)
+    n = source.sizes["time"]
+    flags = rng.choice([2, 2, 2, 3, 4], n).astype(np.int8)
+    source["CO2_flag"] = ("time", flags, {"flag_values": [2, 3, 4, 9]})
+    source["VALVE1"] = ("time", (np.arange(n) % 10 < 7).astype(float), {"unit": "ON/OFF"})
+    source.to_netcdf(tmp_path / "flags.nc")
+    DataResampler(freq="10min").resample(tmp_path / "flags.nc", tmp_path / "resampled.nc")
+
+    df = source.to_dataframe().astype(float)
+    df = set_nonoperating_to_nan(
+        df, col=["CO2_flag", "VALVE1"], buffer="20min", status_var="STATUS"
+    )
+    with xr.open_dataset(tmp_path / "resampled.nc") as result:
+        assert not {"CO2_flag_mean", "VALVE1_mean", "VALVE1_std"} & set(result.data_vars)
+        expected = df["CO2_flag"].resample("10min").max()
+        np.testing.assert_array_equal(result["CO2_flag_max"], expected)
+        assert result["CO2_flag_max"].attrs["cell_methods"].startswith("time: maximum")
+        expected = (
+            df["VALVE1"].resample("10min").agg(lambda x: x.mode().min() if x.count() else np.nan)
+        )
+        np.testing.assert_array_equal(result["VALVE1_mode"], expected)
+        assert "CO2_mean" in result
+
+
+def test_resampler_block_must_be_multiple_of_window():
+    with pytest.raises(ValueError, match="multiple"):
+        DataResampler(freq="7min", block="1h")
+
+
+def _make_lagged_processor(lag_seconds=90.0, n=6 * 3600):
+    rng = np.random.default_rng(3)
+    seconds = np.arange(n + 600, dtype=float)
+    signal = 15 + np.cumsum(rng.normal(0, 0.01, len(seconds)))
+    times = pd.date_range("2020-01-01", periods=n, freq="1s")
+    t = seconds[300 : 300 + n]
+    proc = DataProcessor()
+    proc.ds = xr.Dataset(
+        {
+            "SST": ("time", np.interp(t, seconds, signal)),
+            "SBE45Temp": ("time", np.interp(t - lag_seconds, seconds, signal) + 0.3),
+        },
+        coords={"time": times},
+    )
+    return proc
+
+
+def test_estimate_intake_lag_recovers_known_lag():
+    proc = _make_lagged_processor(lag_seconds=90.0)
+    proc.estimate_intake_lag(window="1h", step="30min", max_lag="5min")
+    lag = proc.ds["SST_lag"]
+    assert lag.attrs["unit"] == "s"
+    assert abs(lag.attrs["global_lag"] - 90.0) < 2
+    assert np.nanmax(np.abs(lag.values - 90.0)) < 5
+
+
+def test_correct_intake_lag_aligns_sst_with_sbe45():
+    proc = _make_lagged_processor(lag_seconds=90.0)
+    before = np.nanstd(proc.ds["SST"].values - proc.ds["SBE45Temp"].values)
+    proc.correct_intake_lag()
+    after = np.nanstd(proc.ds["SST_corrected"].values - proc.ds["SBE45Temp"].values)
+    assert after < 0.2 * before
+
+
+def test_correct_intake_lag_skipped_without_sst():
+    proc = _make_lagged_processor()
+    proc.ds = proc.ds.drop_vars("SST")
+    proc.correct_intake_lag()
+    assert "SST_lag" not in proc.ds
+
+
+@pytest.mark.parametrize("n", [0, 1])
+def test_estimate_intake_lag_skipped_for_short_records(n):
+    proc = _make_lagged_processor()
+    proc.ds = proc.ds.isel(time=slice(n))
+    proc.estimate_intake_lag()
+    assert "SST_lag" not in proc.ds
+
+
+def test_estimate_intake_lag_skipped_for_duplicate_timestamps(caplog):
+    proc = _make_lagged_processor(n=600)
+    proc.ds = proc.ds.assign_coords(time=proc.ds.indexes["time"].repeat(2)[:600])
+    proc.estimate_intake_lag(window="2min", step="1min", max_lag="30s")
+    assert "SST_lag" not in proc.ds
+    assert "not increasing" in caplog.text
+
+
+def test_estimate_intake_lag_skipped_for_weak_correlation(caplog):
+    proc = _make_lagged_processor()
+    proc.ds["SBE45Temp"] = ("time", np.random.default_rng(0).normal(15, 0.1, proc.ds.sizes["time"]))
+    proc.correct_intake_lag()
+    assert "SST_lag" not in proc.ds
+    assert "SST_corrected" not in proc.ds
+    assert "correlation" in caplog.text
+
+
+def test_quality_control_flags_survive_rerun_of_non_operating_removal():
+    times = pd.date_range("2020-01-01", periods=120, freq="1min")
+    proc = DataProcessor()
+    proc.ds = xr.Dataset(
+        {
+            "CO2": ("time", np.full(120, 400.0) + np.arange(120) % 3),
+            "STATUS": ("time", np.full(120, 5)),
+        },
+        coords={"time": times},
+    )
+    proc.remove_non_operating_phases()
+    proc.apply_quality_control()
+    assert (proc.ds["CO2_flag"].values == 2).all()
+
+    proc.remove_non_operating_phases()
+    assert "CO2_flag_corrected" not in proc.ds.variables
+
+
+def test_to_netcdf_writes_back_only_derived_variables(tmp_path, monkeypatch):
+    path = tmp_path / "merged.nc"
+    times = pd.date_range("2020-01-01", periods=60, freq="1min")
+    xr.Dataset(
+        {
+            "CO2": ("time", np.full(60, 400.0)),
+            "STATUS": ("time", np.r_[np.full(10, 2), np.full(50, 5)]),
+            "SBE45Temp": ("time", np.full(60, 10.0)),
+        },
+        coords={"time": times},
+    ).to_netcdf(path)
+
+    proc = DataProcessor()
+    proc.load_data(path)
+    proc.remove_non_operating_phases()
+
+    written = {}
+
+    def update_variables(ds, path, **kwargs):
+        written["vars"] = set(ds.data_vars)
+        return original(ds, path, **kwargs)
+
+    import oceanpack.utils.netcdf as netcdf
+
+    original = netcdf.update_variables
+    monkeypatch.setattr(netcdf, "update_variables", update_variables)
+    proc.to_netcdf(path)
+
+    assert written == {"vars": {"CO2_corrected"}}
+    with xr.open_dataset(path) as result:
+        assert np.isnan(result["CO2_corrected"][:30]).all()
+        np.testing.assert_array_equal(result["CO2"], 400.0)
+        np.testing.assert_array_equal(result["SBE45Temp"], 10.0)
+
+
+def test_repeated_processing_keeps_the_raw_variables(tmp_path):
+    path = tmp_path / "merged.nc"
+    times = pd.date_range("2020-01-01", periods=60, freq="1min")
+    xr.Dataset(
+        {
+            "CO2": ("time", np.full(60, 400.0), {"unit": "ppm"}),
+            "STATUS": ("time", np.r_[np.full(10, 2), np.full(50, 5)]),
+        },
+        coords={"time": times},
+    ).to_netcdf(path)
+
+    for _ in range(2):
+        proc = DataProcessor()
+        proc.load_data(path)
+        proc.remove_non_operating_phases()
+        proc.apply_quality_control()
+        proc.to_netcdf(path)
+        with xr.open_dataset(path) as result:
+            assert set(result.data_vars) == {"CO2", "STATUS", "CO2_corrected", "CO2_flag"}
+            np.testing.assert_array_equal(result["CO2"], 400.0)
+            assert result["CO2_corrected"].attrs["unit"] == "ppm"
+            assert np.isnan(result["CO2_corrected"][:30]).all()
+            np.testing.assert_array_equal(result["CO2_corrected"][30:], 400.0)
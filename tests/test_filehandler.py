@@ -1,6 +1,10 @@
 import pandas as pd
 
-from oceanpack.app.models.filehandler import AnalyzerFileHandler, FileHandlerInterface
+from oceanpack.app.models.filehandler import (
+    AnalyzerFileHandler,
+    FileHandlerInterface,
+    StreamFileHandler,
+)
 
 
 class TestAnalyzerFileHandler:
@@ -12,6 +16,21 @@ class TestAnalyzerFileHandler:
         assert isinstance(result[0], pd.DataFrame)
 
 
+class TestStreamFileHandler:
+    def test_read_file(self, tmp_path):
+        values = ",".join(["1.5"] * 29)
+        f = tmp_path / "stream.log"
+        f.write_text(
+            f"$PSDS0,0,0,D,0,0,2020-01-01,00:00:00,{values}\n"
+            f"$PSDS0,0,0,D,0,0,2020-01-01,00:00:01,{values}\n"
+        )
+        data, metadata = StreamFileHandler.read_file(f)
+        assert list(data.index) == list(pd.date_range("2020-01-01", periods=2, freq="1s"))
+        assert data.index.name == "time"
+        assert (data["co2"] == 1.5).all()
+        assert "co2" in metadata["name"].values
+
+
 class TestParseHeader:
     def test_psds0_line_breaks_immediately(self, tmp_path):
         f = tmp_path / "stream.log"
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from oceanpack.utils.gridding import BinnedStatistics, grid_track
+
+
+def _make_track(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    times = pd.date_range("2020-01-01", periods=n, freq="1min")
+    return xr.Dataset(
+        {
+            "lon": ("time", np.linspace(-1.0, 1.0, n)),
+            "lat": ("time", np.linspace(50.0, 50.9, n)),
+            "CO2": ("time", rng.normal(400, 5, n)),
+        },
+        coords={"time": times},
+    )
+
+
+def test_binned_statistics_matches_numpy():
+    rng = np.random.default_rng(1)
+    index = rng.integers(0, 5, 1000)
+    values = rng.normal(size=1000)
+    acc = BinnedStatistics(6)
+    for part in np.array_split(np.arange(1000), 7):
+        acc.update(index[part], values[part])
+    result = acc.result()
+
+    for b in range(5):
+        v = values[index == b]
+        assert result["count"][b] == len(v)
+        assert np.isclose(result["mean"][b], v.mean())
+        assert np.isclose(result["std"][b], v.std(ddof=1))
+        assert np.isclose(result["median"][b], np.median(v))
+    assert result["count"][5] == 0
+    assert np.isnan(result["mean"][5])
+
+
+def test_binned_statistics_stores_only_occupied_bins():
+    # far more bins than could be allocated densely
+    nbins = 10**15
+    index = np.array([nbins - 1, 7, 7, 12345678901])
+    values = np.array([1.0, 2.0, 4.0, np.nan])
+    acc = BinnedStatistics(nbins)
+    acc.update(index[:2], values[:2])
+    acc.update(index[2:], values[2:])
+    result = acc.result(dense=False)
+
+    np.testing.assert_array_equal(acc.bins, [7, nbins - 1])
+    np.testing.assert_array_equal(result["count"], [2, 1])
+    np.testing.assert_allclose(result["mean"], [3.0, 1.0])
+    np.testing.assert_allclose(result["median"], [3.0, 1.0])
+    np.testing.assert_allclose(result["std"], [np.sqrt(2.0), np.nan])
+
+
+def test_binned_statistics_invalid_stat():
+    with pytest.raises(ValueError, match="Unknown statistics"):
+        BinnedStatistics(3, stats=["mode"])
+
+
+def test_grid_track_matches_pandas_groupby():
+    ds = _make_track()
+    gridded = grid_track(ds, lon_res=0.25, lat_res=0.25, time_res="1D")
+
+    df = ds.to_dataframe()
+    keys = [
+        df.index.floor("1D"),
+        np.floor((df["lat"] - 50.0) / 0.25).astype(int),
+        np.floor((df["lon"] + 1.0) / 0.25).astype(int),
+    ]
+    expected = df.groupby(keys)["CO2"].agg(["mean", "std", "median", "count"])
+    for (day, ilat, ilon), row in expected.iterrows():
+        cell = dict(time=(day - pd.Timestamp("2020-01-01")).days, lat=ilat, lon=ilon)
+        assert np.isclose(gridded["CO2_mean"][cell], row["mean"])
+        assert np.isclose(gridded["CO2_std"][cell], row["std"], equal_nan=True)
+        assert np.isclose(gridded["CO2_median"][cell], row["median"])
+        assert gridded["CO2_count"][cell] == row["count"]
+    assert int(gridded["CO2_count"].sum()) == ds.sizes["time"]
+
+
+def test_grid_track_grid_is_aligned_to_resolution():
+    gridded = grid_track(_make_track(), lon_res=0.25, lat_res=0.25, stats=["count"])
+    assert gridded["CO2_count"].dims == ("lat", "lon")
+    assert np.allclose(gridded["lon"][:2], [-0.875, -0.625])
+    assert np.allclose(gridded["lon_bnds"][0], [-1.0, -0.75])
+
+
+def test_grid_track_chunked_input_matches_in_memory():
+    ds = _make_track()
+    expected = grid_track(ds, 0.5, 0.5, "12h")
+    result = grid_track(ds.chunk(time=300), 0.5, 0.5, "12h")
+    xr.testing.assert_allclose(result, expected)
@@ -6,6 +6,7 @@
 #
 import warnings
 
+import dask.array as da
 import numpy as np
 import pandas as pd
 import pytest
@@ -20,11 +21,14 @@ from oceanpack.utils.helpers import (
     convert_coordinates,
     find_nearest,
     fugacity,
+    nonoperating_mask,
     order_of_magnitude,
     ppm2uatm,
     pressure2atm,
     pressure2mbar,
     set_nonoperating_to_nan,
+    sliding_lag,
+    status_segments,
     temperature2C,
     temperature2K,
     temperature_correction,
@@ -166,6 +170,30 @@ def test_find_nearest():
     assert find_nearest(items, pivot2) == 5, "Should find 5 as the nearest element for 4.8"
 
 
+def test_find_nearest_batched_unsorted_items():
+    """Indices refer to the original (unsorted) positions of `items`."""
+    items = np.array([5, 1, 9, 3])
+    result = find_nearest(items, [2.1, 8.0, 0.0], full_output=True)
+    assert np.array_equal(result.index, [3, 2, 1])
+    assert np.array_equal(result.value, [3, 9, 1])
+    assert np.allclose(result.distance, [0.9, 1.0, 1.0])
+
+
+def test_find_nearest_tolerance():
+    result = find_nearest(np.arange(10), [2.2, 20.0], tolerance=1, full_output=True)
+    assert np.array_equal(result.index, [2, -1])
+    assert np.isnan(result.value[1])
+    assert np.isnan(result.distance[1])
+
+
+def test_find_nearest_datetime_items():
+    times = pd.date_range("2020-01-01", periods=100, freq="10s").values
+    pivots = pd.to_datetime(["2020-01-01 00:00:04", "2020-01-01 00:05:06", "2020-01-02 00:00:00"])
+    result = find_nearest(times, pivots.values, tolerance="30s", full_output=True)
+    assert np.array_equal(result.index, [0, 31, -1])
+    assert np.isnat(result.value[-1])
+
+
 def test_centered_bins_produces_half_step_boundaries():
     """Bin edges sit half a step below/above each centre; edge count equals N+1."""
     x = np.arange(-90, 91)
@@ -202,11 +230,62 @@ def test_temperature2K_series():
 
 
 def test_temperature2K_dataarray():
-    da = xr.DataArray([10.0, 20.0])
-    result = temperature2K(da)
+    T = xr.DataArray([10.0, 20.0])
+    result = temperature2K(T)
     assert np.allclose(result.values, [283.15, 293.15])
 
 
+def test_temperature2K_numpy_mixed_units():
+    result = temperature2K(np.array([10.0, 283.15, np.nan]))
+    assert np.allclose(result, [283.15, 283.15, np.nan], equal_nan=True)
+
+
+def test_temperature2C_dataarray_keeps_coords():
+    T = xr.DataArray([283.15, 10.0], dims="time", coords={"time": [0, 1]})
+    result = temperature2C(T)
+    assert isinstance(result, xr.DataArray)
+    assert np.allclose(result.values, [10.0, 10.0])
+    assert (result.time == T.time).all()
+
+
+# --- dask-backed input ---
+
+
+def _lazy(values, chunks=2):
+    return xr.DataArray(da.from_array(np.asarray(values, dtype=float), chunks=chunks), dims="time")
+
+
+def test_temperature2K_dask_stays_lazy():
+    result = temperature2K(_lazy([10.0, 20.0, 283.15]))
+    assert isinstance(result.data, da.Array)
+    assert np.allclose(result.values, [283.15, 293.15, 283.15])
+
+
+def test_pressure2atm_dask_stays_lazy():
+    result = pressure2atm(_lazy([1013.25, 1013.25, 2026.5]))
+    assert isinstance(result.data, da.Array)
+    assert np.allclose(result.values, [1.0, 1.0, 2.0])
+
+
+def test_fugacity_dask_matches_numpy():
+    p_equ = [1013.0, 1014.0, 1012.0, 1010.0]
+    sst = [10.0, 12.0, 14.0, 16.0]
+    pCO2 = ppm2uatm(400.0, _lazy(p_equ))
+    result = fugacity(pCO2, _lazy(p_equ), _lazy(sst), xCO2=400.0)
+    expected = fugacity(
+        ppm2uatm(400.0, np.array(p_equ)), np.array(p_equ), np.array(sst), xCO2=400.0
+    )
+    assert isinstance(result.data, da.Array)
+    assert np.allclose(result.values, expected)
+
+
+def test_compute_salinity_array_input():
+    C = np.array([35.67560, 35.67560])
+    result = compute_salinity(C=C, T=8.0583, p=0.357)
+    assert result.shape == (2,)
+    assert np.allclose(result, compute_salinity(C=35.67560, T=8.0583, p=0.357))
+
+
 # --- pressure2mbar ---
 
 def test_pressure2mbar_hpa():
@@ -226,6 +305,18 @@ def test_pressure2mbar_invalid():
         pressure2mbar(1e7)
 
 
+def test_pressure2atm_units_from_attrs():
+    """A ``unit`` attribute takes precedence over the order-of-magnitude heuristic."""
+    p = xr.DataArray([1013.25], attrs={"unit": "mbar"})
+    assert np.allclose(pressure2atm(p).values, 1.0)
+    assert pressure2atm(2.0, units="atm") == 2.0
+
+
+def test_pressure2atm_unknown_units():
+    with pytest.raises(ValueError, match="Unknown pressure units"):
+        pressure2atm(1013.25, units="psi")
+
+
 def test_pressure2atm_invalid():
     with pytest.raises(ValueError, match="hPa, Pa or atm"):
         pressure2atm(1e7)
@@ -293,6 +384,57 @@ def test_fugacity_xCO2_term_has_negligible_effect():
     assert abs(f_with - f_without) < 0.1
 
 
+# --- float32 precision ---
+
+
+@pytest.fixture
+def oceanic_inputs():
+    rng = np.random.default_rng(0)
+    n = 100_000
+    return {
+        "xCO2": rng.uniform(150, 800, n),  # ppm
+        "p_equ": rng.uniform(980, 1040, n),  # hPa
+        "T_equ": rng.uniform(-2, 32, n),  # °C
+        "dT": rng.uniform(-1, 1, n),  # K
+    }
+
+
+def test_float32_deviates_less_than_a_milli_µatm(oceanic_inputs):
+    x, p, T, dT = oceanic_inputs.values()
+    results = {}
+    for precision in ("float64", "float32"):
+        pCO2 = ppm2uatm(x, p, input="dry", T=T, S=35.0, precision=precision)
+        fCO2 = fugacity(pCO2, p, T, xCO2=x, precision=precision)
+        results[precision] = (
+            pCO2,
+            fCO2,
+            temperature_correction(fCO2, T_out=T + dT, T_in=T, precision=precision),
+        )
+    for double, single in zip(results["float64"], results["float32"]):
+        assert single.dtype == np.float32
+        assert np.abs(single - double).max() < 1e-3
+
+
+def test_float32_fugacity_exponent_is_accurate(oceanic_inputs):
+    """The virial exponent is computed without the cancellation of the polynomial in K."""
+    x, p, T, _ = oceanic_inputs.values()
+    exponent = np.log(fugacity(1.0, p, T, xCO2=x))
+    single = np.log(fugacity(np.float32(1.0), p, T, xCO2=x, precision="float32").astype(np.float64))
+    # the remaining deviation is the rounding of exp(...) to float32 (about 6e-8)
+    assert np.abs(single - exponent).max() < 2e-7
+
+
+def test_float64_precision_upcasts_float32_input():
+    assert pressure2atm(np.array([1013.25], dtype=np.float32)).dtype == np.float64
+    assert temperature2K(pd.Series([10.0], dtype=np.float32)).dtype == np.float64
+    assert pressure2mbar(1013) == 1013
+
+
+def test_unknown_precision_raises():
+    with pytest.raises(ValueError, match="Unknown precision"):
+        temperature2C(10.0, precision="float16")
+
+
 # --- set_nonoperating_to_nan ---
 
 def test_set_nonoperating_to_nan_sets_values():
@@ -326,3 +468,48 @@ def test_compress_xarray_dataarray():
     da = xr.DataArray([1.0, 2.0])
     result = compress_xarray(da)
     assert result.encoding.get("zlib") is True
+
+
+def test_nonoperating_mask_buffer_and_overlapping_phases():
+    times = pd.date_range("2020-01-01", periods=12, freq="1min")
+    status = [5, 2, 2, 5, 1, 5, 5, 5, 5, 5, 5, 5]
+    mask = nonoperating_mask(times, status, buffer="2min")
+    assert mask.tolist() == [
+        False,
+        True,
+        True,
+        True,
+        True,
+        True,
+        True,
+        False,
+        False,
+        False,
+        False,
+        False,
+    ]
+
+
+def test_status_segments_empty_input():
+    starts, stops, values = status_segments([])
+    assert len(starts) == len(stops) == len(values) == 0
+
+
+def test_sliding_lag_detects_changing_lag():
+    rng = np.random.default_rng(0)
+    signal = np.cumsum(rng.normal(size=12000))
+    t = np.arange(10000, dtype=float) + 1000
+    lag = np.where(t < 6000, 20.0, 40.0)
+    x = np.interp(t, np.arange(12000), signal)
+    y = np.interp(t - lag, np.arange(12000), signal)
+    x[2000:2300] = np.nan  # gaps are filled before correlating
+    centers, lags, corr = sliding_lag(x, y, window=1000, step=1000, max_lag=100)
+    assert np.allclose(lags[centers < 4500], 20, atol=1.5)
+    assert np.allclose(lags[centers > 5500], 40, atol=1.5)
+    assert np.all(corr > 0.5)
+
+
+def test_sliding_lag_insufficient_data_gives_nan():
+    x = np.full(1000, np.nan)
+    _, lags, _ = sliding_lag(x, np.arange(1000.0), window=500, step=500, max_lag=10)
+    assert np.isnan(lags).all()
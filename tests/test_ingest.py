@@ -0,0 +1,167 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import socket
+import time
+
+from click.testing import CliRunner
+import pytest
+import xarray as xr
+
+from oceanpack.app.cli import main
+from oceanpack.app.controllers.data_controller import IngestController, _DatagramProtocol
+from oceanpack.app.models.filesource import FileSourceModel
+from oceanpack.utils.synth import synthesize
+
+
+@pytest.fixture
+def stream_file(tmp_path):
+    return synthesize(tmp_path / "source", duration="2h", source_types=["Stream"])["Stream"][0]
+
+
+def _free_udp_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _expected(stream_file):
+    model = FileSourceModel("Stream")
+    model.load_data(stream_file)
+    model.clean_data()
+    model.process_data()
+    return model.ds
+
+
+async def _ingest(controller, sender, timeout=10):
+    """Run `controller` until `sender` is done."""
+    serving = asyncio.create_task(controller.serve())
+    try:
+        await asyncio.wait_for(sender(), timeout)
+    finally:
+        serving.cancel()
+        await asyncio.gather(serving, return_exceptions=True)
+
+
+def test_ingest_tcp_and_udp_streams(tmp_path, stream_file):
+    lines = stream_file.read_bytes().splitlines(keepends=True)
+    udp_port = _free_udp_port()
+
+    async def send_all(reader, writer):
+        writer.write(b"".join(lines))
+        await writer.drain()
+        writer.close()
+
+    async def scenario():
+        server = await asyncio.start_server(send_all, "127.0.0.1", 0)
+        tcp_port = server.sockets[0].getsockname()[1]
+        controller = IngestController(
+            tmp_path / "out",
+            tcp=[("127.0.0.1", tcp_port)],
+            udp=[udp_port],
+            flush_rows=100,
+            flush_interval=0.5,
+            retry=60,
+        )
+
+        async def send_udp():
+            while not controller.listening:
+                await asyncio.sleep(0.01)
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                for line in lines[:200]:
+                    sock.sendto(line, ("127.0.0.1", udp_port))
+                    await asyncio.sleep(0)
+            while controller.appended < len(lines) + 200:
+                await asyncio.sleep(0.01)
+
+        async with server:
+            await _ingest(controller, send_udp)
+        return controller
+
+    controller = asyncio.run(scenario())
+    assert controller.dropped == 0
+    assert controller.appended == len(lines) + 200
+
+    expected = _expected(stream_file)
+    tcp_file, udp_file = sorted(
+        (tmp_path / "out").glob("*.nc"), key=lambda path: path.stat().st_size, reverse=True
+    )
+    with xr.open_dataset(tcp_file) as ds:
+        xr.testing.assert_allclose(ds["co2"], expected["co2"])
+        assert ds["co2"].attrs["unit"] == "ppm"
+    with xr.open_dataset(udp_file) as ds:
+        xr.testing.assert_allclose(ds["co2"], expected["co2"].isel(time=slice(200)))
+
+
+def test_full_queue_holds_back_tcp_stream(tmp_path, stream_file):
+    lines = stream_file.read_bytes().splitlines(keepends=True)
+
+    async def send_all(reader, writer):
+        writer.write(b"".join(lines))
+        await writer.drain()
+        writer.close()
+
+    async def scenario():
+        server = await asyncio.start_server(send_all, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        controller = IngestController(
+            tmp_path,
+            tcp=[("127.0.0.1", port)],
+            flush_rows=200,
+            flush_interval=0.5,
+            max_pending=10,
+            retry=60,
+        )
+
+        async def wait_for_all():
+            while controller.appended < len(lines):
+                await asyncio.sleep(0.01)
+
+        async with server:
+            await _ingest(controller, wait_for_all)
+        return controller
+
+    controller = asyncio.run(scenario())
+    assert controller.received == controller.appended == len(lines)
+    assert controller.dropped == 0
+
+
+def test_cancelled_flush_keeps_the_batch():
+    class CountingWriter:
+        written = 0
+
+        def write(self, stream, lines):
+            self.written += len(lines)
+            return len(lines)
+
+    async def scenario():
+        controller = IngestController(".", flush_rows=2)
+        queue = asyncio.Queue()
+        for i in range(2):
+            queue.put_nowait(("a", b"$PSDS0,%d\n" % i))
+        writer = CountingWriter()
+        executor = ThreadPoolExecutor(max_workers=1)
+        executor.submit(time.sleep, 0.2)  # the flush waits in the executor
+        task = asyncio.create_task(controller._consume(queue, writer, executor))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        executor.shutdown(wait=True)
+        return controller, writer
+
+    controller, writer = asyncio.run(scenario())
+    assert writer.written == controller.appended == 2
+
+
+def test_full_queue_drops_udp_records():
+    controller = IngestController(".", udp=[4001])
+    queue = asyncio.Queue(1)
+    protocol = _DatagramProtocol(controller, 4001, queue)
+    protocol.datagram_received(b"$PSDS0,1\r\n$PSDS0,2\r\nnoise\r\n", ("10.0.0.1", 50000))
+    assert queue.get_nowait() == ("10.0.0.1:4001", b"$PSDS0,1\n")
+    assert (controller.received, controller.dropped) == (2, 1)
+
+
+@pytest.mark.parametrize("args", [[], ["--tcp", "localhost"], ["--tcp", "localhost:port"]])
+def test_cli_rejects_invalid_streams(tmp_path, args):
+    result = CliRunner().invoke(main, ["ingest", "-o", str(tmp_path), *args])
+    assert result.exit_code == 2
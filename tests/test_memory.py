@@ -0,0 +1,95 @@
+import shutil
+
+from click.testing import CliRunner
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from oceanpack.app.cli import main
+from oceanpack.app.controllers.data_controller import DataProcessingController
+from oceanpack.app.models.filesource import FileSourceModel
+from oceanpack.utils.memory import MemoryBudget, dataset_bytes_per_row, memory_budget
+from oceanpack.utils.netcdf import append_along_time
+from oceanpack.utils.synth import synthesize
+
+
+@pytest.fixture
+def no_memory_used(monkeypatch):
+    """Make the whole budget available, however much memory the test process uses."""
+    monkeypatch.setattr("oceanpack.utils.memory.current_rss", lambda: 0)
+
+
+def _make_records(periods):
+    time = pd.date_range("2020-01-01", periods=periods, freq="10s")
+    status = np.where(np.arange(periods) % 2160 < 60, 2, 5)
+    return xr.Dataset(
+        {
+            "CO2": ("time", np.where(status == 5, np.linspace(400, 420, periods), 0.5)),
+            "STATUS": ("time", status),
+            "CellPress": ("time", np.full(periods, 1013.0)),
+            "DPressInt": ("time", np.sin(np.arange(periods))),
+            "SBE45Temp": ("time", np.linspace(10, 12, periods)),
+        },
+        coords={"time": time},
+    )
+
+
+def _convert(path, **kwargs):
+    model = FileSourceModel("Analyzer", **kwargs)
+    model.load_data(path)
+    model.clean_data()
+    model.process_data()
+    return model
+
+
+def test_budget_splits_items_into_batches(no_memory_used):
+    budget = MemoryBudget("1kB")
+    assert budget.batches("abcde", [300, 300, 300, 2000, 100]) == [["a", "b", "c"], ["d"], ["e"]]
+    assert budget.batches("ab", [300, 300], copies=2) == [["a"], ["b"]]
+    assert budget.rows(16, share=0.5) == 32
+
+
+def test_dataset_bytes_per_row():
+    assert dataset_bytes_per_row(_make_records(10)) == 6 * 8
+
+
+def test_batched_conversion_matches_conversion_in_memory(tmp_path, no_memory_used):
+    synthesize(tmp_path, duration="1D", source_types=["Analyzer"], file_size="500kB")
+    batched = _convert(tmp_path / "Analyzer", max_memory="2MB")
+    assert batched.df is None
+    assert batched.ds.chunks
+    xr.testing.assert_identical(batched.ds.load(), _convert(tmp_path / "Analyzer").ds)
+
+
+def test_processing_in_chunks_matches_processing_in_memory(tmp_path, no_memory_used):
+    append_along_time(_make_records(8640), tmp_path / "merged.nc")
+    shutil.copy(tmp_path / "merged.nc", tmp_path / "chunked.nc")
+    for path in [tmp_path / "merged.nc", tmp_path / "chunked.nc"]:
+        controller = DataProcessingController()
+        with memory_budget("250kB" if path.stem == "chunked" else "1TB"):
+            controller.load_data(path)
+            assert bool(controller.model.ds.chunks) == (path.stem == "chunked")
+            controller.process_data()
+            controller.generate_output(path)
+
+    with (
+        xr.open_dataset(tmp_path / "merged.nc") as expected,
+        xr.open_dataset(tmp_path / "chunked.nc") as chunked,
+    ):
+        xr.testing.assert_identical(expected, chunked)
+
+
+def test_cli_reports_peak_memory(tmp_path):
+    synthesize(tmp_path, duration="1h", source_types=["Analyzer"])
+    args = ["convert-data", str(tmp_path / "Analyzer"), str(tmp_path / "out.nc")]
+    result = CliRunner().invoke(main, ["--max-memory", "1TB", *args])
+    assert result.exit_code == 0, result.output
+    assert "Peak memory" in result.stderr
+
+
+@pytest.mark.parametrize("size", ["lots", "0"])
+def test_cli_rejects_invalid_budget(size):
+    result = CliRunner().invoke(main, ["--max-memory", size, "convert-data", "in", "out.nc"])
+    assert result.exit_code == 2
+    assert "--max-memory" in result.output
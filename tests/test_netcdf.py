@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from oceanpack.utils.netcdf import append_along_time, atomic_to_netcdf, update_variables
+
+
+def _block(start, n=5):
+    times = pd.date_range(start, periods=n, freq="1s")
+    return xr.Dataset(
+        {"CO2": ("time", np.arange(n, dtype=float)), "STATUS": ("time", np.full(n, 5))},
+        coords={"time": times},
+    )
+
+
+def test_append_along_time_concatenates_blocks(tmp_path):
+    path = tmp_path / "out.nc"
+    first, second = _block("2020-01-01 00:00:00"), _block("2020-01-02 12:00:00.5", n=3)
+    append_along_time(first, path)
+    append_along_time(second, path)
+
+    with xr.open_dataset(path) as result:
+        expected = xr.concat([first, second], dim="time")
+        xr.testing.assert_equal(result.load(), expected)
+
+
+def test_append_along_time_rejects_unknown_variables(tmp_path):
+    path = tmp_path / "out.nc"
+    append_along_time(_block("2020-01-01"), path)
+    with pytest.raises(ValueError, match="do not exist"):
+        append_along_time(_block("2020-01-02").assign(SST=("time", np.zeros(5))), path)
+
+
+def test_update_variables_overwrites_and_adds(tmp_path):
+    path = tmp_path / "data.nc"
+    ds = _block("2020-01-01")
+    ds.to_netcdf(path)
+
+    update = xr.Dataset(
+        {"STATUS": ("time", np.full(5, 2), {"unit": "-"}), "PressEqu": ("time", np.ones(5))},
+        coords={"time": ds["time"]},
+    )
+    update_variables(update, path)
+
+    with xr.open_dataset(path) as result:
+        assert set(result.data_vars) == {"CO2", "STATUS", "PressEqu"}
+        np.testing.assert_array_equal(result["CO2"], ds["CO2"])
+        np.testing.assert_array_equal(result["STATUS"], 2)
+        assert result["STATUS"].attrs["unit"] == "-"
+
+
+def test_atomic_to_netcdf_keeps_target_on_failure(tmp_path):
+    path = tmp_path / "data.nc"
+    _block("2020-01-01").to_netcdf(path)
+    broken = _block("2020-01-01").assign(bad=("time", np.array([object()] * 5)))
+    with pytest.raises(ValueError, match="bad"):
+        atomic_to_netcdf(broken, path)
+
+    assert [p.name for p in tmp_path.iterdir()] == ["data.nc"]
+    with xr.open_dataset(path) as result:
+        assert "bad" not in result
@@ -0,0 +1,85 @@
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from oceanpack.app.models.filehandler import StreamFileHandler
+from oceanpack.utils.nmea import parse_records
+from oceanpack.utils.synth import synthesize
+
+NAMES = ["tag", "date", "time", "a", "b"]
+
+
+def _record(fields: str, checksum=True) -> bytes:
+    body = f"PSDS0,{fields}".encode()
+    if checksum:
+        body += b"*%02X" % reduce(lambda x, y: x ^ y, body)
+    return b"$" + body + b"\r\n"
+
+
+def test_damaged_records_are_rejected():
+    good = _record("2020-01-01,00:00:00,1.5,7")
+    corrupted = _record("2020-01-01,00:00:01,2.5,8").replace(b"2.5", b"2.6")
+    data = b"".join(
+        [
+            good,
+            corrupted,
+            _record("2020-01-01,00:00:02,3.5"),
+            _record("2020-02-30,00:00:03,4.5,9"),
+            b"noise\n",
+            _record("2020-01-01,00:00:04,5.5,10", checksum=False),
+            b"\n",
+        ]
+    )
+    result = parse_records(data, NAMES)
+    assert list(result.data.index) == list(
+        pd.to_datetime(["2020-01-01 00:00:00", "2020-01-01 00:00:04"])
+    )
+    assert result.data.to_dict("list") == {"a": [1.5, 5.5], "b": [7, 10]}
+    assert result.data["b"].dtype == np.int64
+    assert result.counts == {"tag": 1, "checksum": 1, "fields": 1, "time": 1}
+    assert result.rejected["checksum"] == [corrupted]
+
+
+def test_invalid_values_do_not_spoil_the_column():
+    data = b"".join(
+        _record(f"2020-01-01,00:00:0{k},{a},{b}")
+        for k, (a, b) in enumerate([("1.25", "-3"), ("x!", ""), ("2", "+40")])
+    )
+    result = parse_records(data, NAMES)
+    np.testing.assert_array_equal(result.data["a"], [1.25, np.nan, 2.0])
+    np.testing.assert_array_equal(result.data["b"], [-3.0, np.nan, 40.0])
+
+
+@pytest.mark.parametrize("decimals", [None, 0, 3])
+def test_numbers_are_parsed_like_float(decimals):
+    rng = np.random.default_rng(0)
+    values = rng.choice([-1, 1], 500) * rng.uniform(1, 1000, 500) * 10.0 ** rng.integers(-3, 4, 500)
+    # up to 18 digits, as in float64 values written with their 15 significant digits
+    texts = [repr(float(f"{v:.15g}")) if decimals is None else f"{v:.{decimals}f}" for v in values]
+    data = b"".join(_record(f"2020-01-01,00:00:00,{text},0") for text in texts)
+    result = parse_records(data, NAMES, block_size=1000)
+    np.testing.assert_array_equal(result.data["a"], [float(text) for text in texts])
+
+
+def test_read_file_quarantines_damaged_records(tmp_path):
+    [path] = synthesize(tmp_path, duration="1h", source_types=["Stream"], truncate=0)["Stream"]
+    lines = path.read_bytes().splitlines(keepends=True)
+    expected = pd.read_csv(
+        path, names=StreamFileHandler.read_oceanview_variables()["name"], encoding="cp1252"
+    )
+    lines[10] = lines[10].replace(b",", b";", 1)
+    path.write_bytes(b"".join(lines))
+
+    data, _ = StreamFileHandler.read_file(path)
+    assert len(data) == len(lines) - 1
+    assert (data["co2"].to_numpy() == expected["co2"].drop(index=10).to_numpy()).all()
+    assert (
+        data["gps_time"].to_numpy() == expected["gps_time"].drop(index=10).str[:6].astype(int)
+    ).all()
+    assert (tmp_path / "Stream" / f"{path.name}.quarantine").read_bytes() == lines[10]
+
+    # a second read replaces the quarantine file
+    StreamFileHandler.read_file(path)
+    assert (tmp_path / "Stream" / f"{path.name}.quarantine").read_bytes() == lines[10]
@@ -0,0 +1,84 @@
+import sys
+
+from click.testing import CliRunner
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from oceanpack.app.cli import main
+from oceanpack.app.models.filesource import FileSourceModel
+from oceanpack.utils.parquet import write_parquet
+from oceanpack.utils.synth import synthesize
+
+
+def _dataset(periods=3 * 8640, freq="10s"):
+    time = pd.date_range("2020-01-01 12:00", periods=periods, freq=freq)
+    ds = xr.Dataset(
+        {
+            "CO2": ("time", np.linspace(400, 410, periods), {"unit": "ppm"}),
+            "STATUS": ("time", np.where(np.arange(periods) % 1000 < 50, 2, 5).astype(np.int64)),
+        },
+        coords={"time": time},
+    )
+    ds.attrs["source_type"] = "Analyzer"
+    return ds
+
+
+def test_write_parquet_partitions_by_day(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    ds = _dataset().chunk({"time": 5000})
+    files = write_parquet(ds, tmp_path / "out", cruise="MSM-01", row_group_rows=4000)
+    assert [file.relative_to(tmp_path / "out").parent.as_posix() for file in files] == [
+        f"cruise=MSM-01/date=2020-01-0{day}" for day in range(1, 5)
+    ]
+
+    metadata = pq.ParquetFile(files[1]).metadata
+    assert metadata.num_rows == 8640
+    assert metadata.num_row_groups == 3
+    schema = pq.read_schema(files[1])
+    assert str(schema.field("time").type) == "timestamp[us]"
+    assert schema.field("CO2").metadata == {b"unit": b"ppm"}
+    assert schema.metadata[b"source_type"] == b"Analyzer"
+    assert "RLE_DICTIONARY" in metadata.row_group(0).column(2).encodings
+
+    table = pq.read_table(tmp_path / "out", filters=[("date", "=", "2020-01-02")])
+    np.testing.assert_array_equal(table["CO2"].to_numpy(), ds["CO2"].sel(time="2020-01-02").values)
+    assert pq.read_table(tmp_path / "out").num_rows == ds.sizes["time"]
+
+
+def test_write_parquet_replaces_only_the_written_days(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    ds = _dataset()
+    write_parquet(ds, tmp_path)
+    write_parquet(ds.sel(time="2020-01-02").isel(time=slice(10)), tmp_path)
+    assert pq.read_table(tmp_path / "date=2020-01-02").num_rows == 10
+    assert pq.read_table(tmp_path / "date=2020-01-03").num_rows == 8640
+    assert not list(tmp_path.rglob(".*.tmp"))
+
+
+def test_convert_data_to_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    [path] = synthesize(tmp_path / "source", duration="1D", source_types=["Stream"], truncate=0)[
+        "Stream"
+    ]
+    result = CliRunner().invoke(
+        main, ["convert-data", str(path), str(tmp_path / "out"), "--format", "parquet"]
+    )
+    assert result.exit_code == 0, result.output
+    table = pq.read_table(tmp_path / "out").sort_by("time")
+    model = FileSourceModel("Stream")
+    model.load_data(path)
+    model.clean_data()
+    model.process_data()
+    np.testing.assert_array_equal(table["co2"].to_numpy(), model.ds["co2"].values)
+    np.testing.assert_array_equal(
+        table["time"].to_numpy(), model.ds.indexes["time"].values.astype("datetime64[us]")
+    )
+
+
+def test_missing_pyarrow_is_reported(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    monkeypatch.setitem(sys.modules, "pyarrow.parquet", None)
+    with pytest.raises(ImportError, match="requires pyarrow"):
+        write_parquet(_dataset(10), tmp_path)
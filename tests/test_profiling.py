@@ -0,0 +1,66 @@
+import json
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from oceanpack.app.cli import main
+from oceanpack.utils import profiling
+from oceanpack.utils.profiling import stage
+
+
+def test_stage_without_profiler_is_not_recorded():
+    with stage("idle", rows=3) as record:
+        pass
+    assert profiling._active is None
+    assert "wall_time" not in record
+
+
+def test_profiling_aggregates_stages(tmp_path):
+    with profiling.profiling(tmp_path, name="test") as profiler:
+        for _ in range(3):
+            with stage("read", rows=10) as record:
+                (tmp_path / "data.txt").write_text("x" * 1000)
+                record["rows"] = 20
+
+    report = json.loads(profiler.report_path.read_text())
+    assert profiler.report_path.parent == tmp_path
+    [read] = report["stages"]
+    assert read["name"] == "read"
+    assert read["calls"] == 3
+    assert read["rows"] == 60
+    assert read["wall_time"] >= 0
+    assert read["peak_rss"] > 0
+    assert read["bytes_written"] >= 3000
+    assert report["total"]["wall_time"] >= read["wall_time"]
+
+
+def test_cli_profile_writes_report(tmp_path):
+    log_file = Path(__file__).parent / "example_op.log"
+    result = CliRunner().invoke(
+        main,
+        [
+            "--profile",
+            "--profile-dir",
+            str(tmp_path / "logs"),
+            "--cprofile",
+            "convert-data",
+            "-t",
+            "Analyzer",
+            str(log_file),
+            str(tmp_path / "out.nc"),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    [report_path] = (tmp_path / "logs").glob("profile_convert-data_*.json")
+    assert report_path.with_suffix(".prof").exists()
+    stages = {s["name"]: s for s in json.loads(report_path.read_text())["stages"]}
+    assert list(stages) == [
+        "parse_header",
+        "read_csv",
+        "concat",
+        "clean_data",
+        "to_numeric",
+        "to_xarray",
+        "to_netcdf",
+    ]
+    assert stages["read_csv"]["rows"] == stages["to_netcdf"]["rows"] > 0
@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from oceanpack.utils.qc import (
+    BAD,
+    GOOD,
+    MISSING,
+    QUESTIONABLE,
+    flow_test,
+    quality_control,
+    spike_test,
+    stuck_test,
+)
+
+
+def _make_dataset(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    times = pd.date_range("2020-01-01", periods=n, freq="1s")
+    return xr.Dataset(
+        {
+            "CO2": ("time", 400 + rng.normal(0, 0.5, n)),
+            "SBE45Temp": ("time", 10 + rng.normal(0, 0.01, n)),
+            "AIN3_mA_Waterflow": ("time", np.full(n, 12.0)),
+            "FLOWgas": ("time", np.full(n, 100.0)),
+        },
+        coords={"time": times},
+    )
+
+
+def test_spike_test_matches_pandas_loop():
+    ds = _make_dataset(n=600)
+    x = ds["CO2"].values.copy()
+    x[[100, 350]] += [30, -25]
+    flags = spike_test(ds["time"].values, x, threshold=10, window="1min")
+
+    series = pd.Series(x, index=ds.indexes["time"])
+    expected = np.array(
+        [
+            abs(x[i] - series[t - pd.Timedelta("30s") : t + pd.Timedelta("30s")].median()) > 10
+            for i, t in enumerate(series.index)
+        ]
+    )
+    assert np.array_equal(flags == BAD, expected)
+    assert np.flatnonzero(flags == BAD).tolist() == [100, 350]
+
+
+def test_stuck_test_ignores_nan_runs():
+    time = pd.date_range("2020-01-01", periods=5, freq="1h")
+    flags = stuck_test(time, [np.nan, np.nan, np.nan, 1.0, 2.0], duration="1h")
+    assert (flags == GOOD).all()
+
+
+def test_flow_test_flags_missing_flow():
+    assert flow_test([0.5, 2.0, np.nan], 1.0, flag=QUESTIONABLE).tolist() == [3, 2, 3]
+
+
+def test_quality_control_flags():
+    ds = _make_dataset()
+    ds["CO2"][10] = np.nan
+    ds["CO2"][20] = 2000.0
+    ds["CO2"][1000:1700] = 410.0
+    ds["AIN3_mA_Waterflow"][3000:3100] = 4.1  # live zero of the 4-20 mA signal
+    ds["FLOWgas"][4000:4010] = 0.0
+
+    flags = quality_control(ds)
+    co2 = flags["CO2_flag"].values
+    assert co2[10] == MISSING
+    assert co2[20] == BAD
+    assert (co2[1000:1700] == QUESTIONABLE).all()
+    assert (co2[3000:3100] == QUESTIONABLE).all()
+    assert (flags["SBE45Temp_flag"].values[3000:3100] == QUESTIONABLE).all()
+    assert (co2[4000:4010] == BAD).all()
+    assert (flags["SBE45Temp_flag"].values[4000:4010] == GOOD).all()
+    assert list(flags["CO2_flag"].attrs["flag_values"]) == [2, 3, 4, 9]
+
+
+@pytest.mark.parametrize("block_size", [7, 333, 1000])
+def test_quality_control_blocks_match_full(block_size):
+    ds = _make_dataset(n=3000)
+    ds["CO2"][1000:1700] = 410.0
+    ds["CO2"][[50, 1500, 2999]] = 500.0
+    full = quality_control(ds)
+    blocked = quality_control(ds, block_size=block_size)
+    xr.testing.assert_identical(full, blocked)
+
+
+def test_quality_control_runtime():
+    ds = _make_dataset(n=86400 * 7)
+    start = time.perf_counter()
+    quality_control(ds)
+    assert time.perf_counter() - start < 5
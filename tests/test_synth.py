@@ -0,0 +1,65 @@
+from functools import reduce
+
+from click.testing import CliRunner
+import numpy as np
+import pandas as pd
+
+from oceanpack.app.cli import main
+from oceanpack.app.models.filesource import FileSourceModel
+from oceanpack.utils.synth import status_schedule, synthesize
+
+
+def test_status_schedule_has_regular_calibrations():
+    starts, states = status_schedule("3D", seed=0)
+    zero_starts = starts[states == 2]
+    assert states[0] == 19
+    assert len(zero_starts) >= 10
+    assert (np.diff(starts) > 0).all()
+
+
+def test_stream_checksums_are_valid(tmp_path):
+    [path] = synthesize(tmp_path, duration="1D", source_types=["Stream"], truncate=0)["Stream"]
+    lines = path.read_bytes().splitlines()
+    assert len(lines) == 8640
+    for line in lines:
+        body, checksum = line[1:].rsplit(b"*", 1)
+        assert reduce(lambda a, b: a ^ b, body) == int(checksum, 16)
+
+
+def test_files_overlap_and_last_line_is_truncated(tmp_path):
+    files = synthesize(
+        tmp_path,
+        duration="2D",
+        source_types=["Analyzer"],
+        file_size="2MB",
+        overlap=5,
+        truncate=1,
+        restarts=0,
+    )["Analyzer"]
+    assert len(files) > 1
+    first, second = (path.read_text("cp1252").splitlines() for path in files[:2])
+    records = [line for line in second if line.startswith("@DATA")]
+    assert records[:4] == first[-5:-1]
+    assert records[4].startswith(first[-1])
+    assert records[4] != first[-1]
+    last = files[-1].read_text("cp1252").splitlines()
+    assert len(last[-1].split(",")) < len(last[-2].split(","))
+
+
+def test_analyzer_files_can_be_converted(tmp_path):
+    synthesize(tmp_path, duration="12h", source_types=["Analyzer"], file_size="500kB", restarts=1)
+    model = FileSourceModel(None)
+    model.load_data(tmp_path / "Analyzer")
+    model.clean_data()
+    model.process_data()
+    assert model.ds.sizes["time"] == 4320
+    assert model.ds.indexes["time"][0] == pd.Timestamp("2020-01-01")
+    operating = model.ds["CO2"].where(model.ds["STATUS"] == 5)
+    assert 350 < float(operating.mean()) < 500
+
+
+def test_cli_synth(tmp_path):
+    result = CliRunner().invoke(main, ["synth", str(tmp_path), "--duration", "1h", "-t", "NetDI"])
+    assert result.exit_code == 0, result.output
+    assert "NetDI: 1 files" in result.output
+    assert [p.name for p in tmp_path.iterdir()] == ["NetDI"]
@@ -0,0 +1,108 @@
+import shutil
+import sys
+
+import pytest
+import xarray as xr
+
+from oceanpack.app.controllers.data_controller import DataConversionController, WatchController
+from oceanpack.utils.synth import synthesize
+from oceanpack.utils.watch import Debouncer, InotifyWatcher, PollingWatcher
+
+
+@pytest.fixture
+def log_files(tmp_path):
+    return synthesize(
+        tmp_path / "source", duration="6h", source_types=["Analyzer"], file_size="300kB", truncate=0
+    )["Analyzer"]
+
+
+def test_debouncer_waits_until_size_is_stable(tmp_path):
+    file = tmp_path / "a.log"
+    file.write_text("1\n")
+    debouncer = Debouncer(settle=10)
+    debouncer.add([file], now=0)
+    assert debouncer.pop_settled(now=5) == []
+    file.write_text("1\n2\n")
+    assert debouncer.pop_settled(now=12) == []
+    assert debouncer.pop_settled(now=21) == []
+    assert debouncer.pop_settled(now=22) == [file]
+    assert debouncer.pop_settled(now=40) == []
+
+
+def test_polling_watcher_reports_new_and_changed_files(tmp_path):
+    (tmp_path / "old.log").write_text("1\n")
+    (tmp_path / "other.txt").write_text("1\n")
+    watcher = PollingWatcher(tmp_path)
+    assert watcher.wait(0) == set()
+    (tmp_path / "old.log").write_text("1\n2\n")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "new.log").write_text("1\n")
+    assert watcher.wait(0) == {tmp_path / "old.log", tmp_path / "sub" / "new.log"}
+
+
+@pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is only available on Linux"
+)
+def test_inotify_watcher_reports_files_in_new_directories(tmp_path):
+    watcher = InotifyWatcher(tmp_path)
+    try:
+        assert watcher.wait(0) == set()
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "a.log").write_text("1\n")
+        changed = watcher.wait(1)
+        (tmp_path / "sub" / "b.log").write_text("1\n")
+        (tmp_path / "sub" / "b.txt").write_text("1\n")
+        changed |= watcher.wait(1)
+    finally:
+        watcher.close()
+    assert changed == {tmp_path / "sub" / "a.log", tmp_path / "sub" / "b.log"}
+
+
+def test_convert_appends_only_new_records(tmp_path, log_files):
+    store = tmp_path / "store.nc"
+    first, second, *rest = log_files
+    watched = tmp_path / "watched"
+    watched.mkdir()
+
+    controller = WatchController(watched, store, source_type="Analyzer")
+    n_first = controller.convert([shutil.copy(first, watched)])
+    assert n_first > 0
+    assert controller.convert([watched / first.name]) == 0
+
+    # a file whose last line is still being written
+    content = second.read_bytes()
+    (watched / second.name).write_bytes(content[:-1])
+    n_partial = controller.convert([watched / second.name])
+    assert not controller.store.is_converted(watched / second.name)
+    (watched / second.name).write_bytes(content)
+    assert controller.convert([watched / second.name]) == 1
+    assert controller.store.is_converted(watched / second.name)
+    controller.store.close()
+
+    # after a restart, converted files are known
+    controller = WatchController(watched, store)
+    assert controller.store.is_converted(watched / first.name)
+    controller.convert([shutil.copy(file, watched) for file in rest])
+    controller.store.close()
+
+    expected = DataConversionController("Analyzer")
+    expected.load_data(tmp_path / "source" / "Analyzer")
+    with xr.open_dataset(store) as ds:
+        assert ds.sizes["time"] == expected.model.ds.sizes["time"] > n_first + n_partial
+        xr.testing.assert_allclose(ds["CO2"], expected.model.ds["CO2"])
+
+
+def test_convert_skips_removed_files(tmp_path, caplog):
+    controller = WatchController(tmp_path, tmp_path / "store.nc", source_type="Analyzer")
+    with caplog.at_level("INFO"):
+        assert controller.convert([tmp_path / "removed.log"]) == 0
+    controller.store.close()
+    assert "Cannot convert" in caplog.text
+    assert "after the last change" not in caplog.text
+
+
+def test_run_converts_existing_files(tmp_path, log_files):
+    controller = WatchController(log_files[0].parent, tmp_path / "store.nc", settle=0, polling=True)
+    controller.run(interval=0.01, duration=0.5)
+    with xr.open_dataset(tmp_path / "store.nc") as ds:
+        assert ds.sizes["time"] == 2160